@@ -0,0 +1,59 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Counters and cached payloads must not leak between tests."""
+    cache.clear()
+    yield
+
+
+# Separate local databases standing in for read replicas in recipe_api.test_replicas.
+REPLICA_TEST_ALIASES = ('replica_1', 'replica_2')
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    from django.conf import settings
+    from django.db import connections
+
+    default = settings.DATABASES['default']
+    for alias in REPLICA_TEST_ALIASES:
+        test = {**default.get('TEST', {}), 'MIRROR': None}
+        if default['ENGINE'] != 'django.db.backends.sqlite3':
+            test['NAME'] = f"{test.get('NAME') or 'test_' + default['NAME']}_{alias}"
+        settings.DATABASES[alias] = {**default, 'TEST': test}
+    connections.settings = connections.configure_settings(settings.DATABASES)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--no-query-check', action='store_true',
+        help="Don't fail tests whose requests repeat a query or run too many (see recipe_api.querycheck).",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_check(max_queries=None, repeat_threshold=None, enabled=True): '
+        'thresholds of the per-request query check for this test',
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """Fails a test when a request it makes has an N+1 or runs too many queries."""
+    from recipe_api.querycheck import QueryRecorder
+
+    marker = item.get_closest_marker('query_check')
+    options = dict(marker.kwargs) if marker else {}
+    if item.config.getoption('--no-query-check') or not options.pop('enabled', True):
+        return (yield)
+    with QueryRecorder() as recorder:
+        result = yield
+    problems = recorder.problems(**options)
+    if problems:
+        pytest.fail('Query problems:\n' + '\n'.join(problems), pytrace=False)
+    return result
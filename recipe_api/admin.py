@@ -2,7 +2,9 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     CuisineType, DietaryPreference, Recipe, Tag, FavoriteRecipe,
-    Rating, Comment, Follow, Notification, RecipeShare
+    Rating, Comment, Follow, Notification, RecipeShare,
+    Ingredient, RecipeIngredient, FeedEntry, NotificationEvent,
+    SimilarRecipe, SimilarityJob, RecommendedRecipe, RecipeActivityBucket, TrendingRecipe
 )
 from users.models import CustomUser as User
 
@@ -49,6 +51,20 @@ class RecipeAdmin(admin.ModelAdmin):
     raw_id_fields = ('user',)  # For better performance with many users
     filter_horizontal = ('cuisine_types', 'dietary_preferences')  # Nice widget for ManyToMany
 
+# Ingredient Admin
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+# RecipeIngredient Admin
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'ingredient', 'quantity', 'unit', 'raw_text')
+    list_filter = ('unit',)
+    search_fields = ('raw_text', 'ingredient__name', 'recipe__title')
+    raw_id_fields = ('recipe', 'ingredient')
+
 # Tag Admin
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -92,18 +108,66 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('follower__username', 'following__username')
     raw_id_fields = ('follower', 'following')
 
+# FeedEntry Admin
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'recipe', 'author', 'created_at')
+    search_fields = ('owner__username', 'author__username', 'recipe__title')
+    raw_id_fields = ('owner', 'recipe', 'author')
+
 # Notification Admin
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('recipient', 'sender', 'notification_type', 'is_read', 'created_at')
+    list_display = ('recipient', 'sender', 'notification_type', 'actor_count', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('recipient__username', 'sender__username', 'message')
     raw_id_fields = ('recipient', 'sender', 'recipe')
 
+# NotificationEvent Admin
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'sender', 'notification_type', 'created_at')
+    list_filter = ('notification_type',)
+    raw_id_fields = ('recipient', 'sender', 'recipe')
+
 # RecipeShare Admin
 @admin.register(RecipeShare)
 class RecipeShareAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe', 'share_type', 'recipient_email', 'shared_at')
     list_filter = ('share_type', 'shared_at')
     search_fields = ('user__username', 'recipe__title', 'recipient_email')
-    raw_id_fields = ('user', 'recipe')
\ No newline at end of file
+    raw_id_fields = ('user', 'recipe')
+
+# SimilarRecipe Admin
+@admin.register(SimilarRecipe)
+class SimilarRecipeAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'rank', 'similar', 'score')
+    search_fields = ('recipe__title', 'similar__title')
+    raw_id_fields = ('recipe', 'similar')
+
+# SimilarityJob Admin
+@admin.register(SimilarityJob)
+class SimilarityJobAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'full', 'recipes_updated')
+    list_filter = ('full',)
+
+# RecommendedRecipe Admin
+@admin.register(RecommendedRecipe)
+class RecommendedRecipeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'rank', 'recipe', 'score')
+    search_fields = ('user__username', 'recipe__title')
+    raw_id_fields = ('user', 'recipe')
+
+# RecipeActivityBucket Admin
+@admin.register(RecipeActivityBucket)
+class RecipeActivityBucketAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'hour', 'points')
+    list_filter = ('hour',)
+    raw_id_fields = ('recipe',)
+
+# TrendingRecipe Admin
+@admin.register(TrendingRecipe)
+class TrendingRecipeAdmin(admin.ModelAdmin):
+    list_display = ('rank', 'recipe', 'score', 'computed_at')
+    ordering = ('rank',)
+    raw_id_fields = ('recipe',)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class RecipeApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe_api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import checks, signals  # noqa: F401
+        from . import instrumentation, querycheck
+        connection_created.connect(instrumentation.install_execute_wrapper)
+        connection_created.connect(querycheck.install_execute_wrapper)
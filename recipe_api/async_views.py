@@ -0,0 +1,208 @@
+"""
+Async variants of the read-heavy endpoints, for ASGI deployments.
+
+DRF views are synchronous, so under an ASGI server every request to them
+is handed to a worker thread for its whole duration. The views here are
+native Django async views: queries go through the async ORM
+(``aget``, ``async for``, ``acount``) and the cache through its ``a*``
+methods, and everything in between runs on the event loop.
+
+``AsyncAPIView`` keeps the DRF behaviour clients see: the configured
+authentication (``aauthenticate`` when the class has one), permission
+classes, a DRF ``Request`` for query params and absolute URLs, DRF
+exception responses and the JSON renderer. Serializers only read fields
+and prefetched relations that were loaded before they run; a lazy query
+would raise ``SynchronousOnlyOperation`` instead of blocking the loop.
+Other methods (``POST`` to the recipe list) fall back to the sync view.
+
+``recipe_sharing.asgi_urls`` routes the endpoints to these views and
+``recipe_sharing.asgi`` selects that URLconf.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import facets, response_cache
+from .models import Notification, Recipe
+from .pagination import KeysetPagination
+from .search import get_search_backend
+from .serializers import NotificationSerializer, RecipeSerializer
+from .views import (
+    NotificationView, RecipeDetailView, RecipeListCreateView, RecipeSearchView, UserRecipesView,
+)
+
+
+class AsyncAPIView(View):
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    # Sync view serving the methods without an async handler.
+    sync_view = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None:
+            if self.sync_view is not None:
+                return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+        self.request = Request(request, authenticators=[])
+        try:
+            await self.initial(self.request)
+            response = await handler(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(response)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        raise exceptions.MethodNotAllowed(request.method)
+
+    async def initial(self, request):
+        user, auth = None, None
+        for authenticator in (cls() for cls in self.authentication_classes):
+            if hasattr(authenticator, 'aauthenticate'):
+                result = await authenticator.aauthenticate(request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                user, auth = result
+                break
+        request.user, request.auth = user or AnonymousUser(), auth
+        for permission in (cls() for cls in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if self.authentication_classes and user is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # Like APIView: 401 with a challenge when the first authenticator has one, else 403.
+            header = None
+            if self.authentication_classes:
+                header = self.authentication_classes[0]().authenticate_header(self.request)
+            if header:
+                exc.auth_header = header
+            else:
+                exc.status_code = 403
+        response = api_settings.EXCEPTION_HANDLER(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        return response
+
+    def finalize_response(self, response):
+        if not isinstance(response, Response):
+            return response
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = JSONRenderer.media_type
+        response.renderer_context = {'view': self, 'request': self.request, 'response': response}
+        return response.render()
+
+    def serialize(self, serializer_class, instance, many=False):
+        return serializer_class(instance, many=many, context={'request': self.request, 'view': self}).data
+
+    async def paginated(self, queryset, serializer_class):
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(queryset, self.request, view=self)
+        return page, paginator.get_paginated_response(self.serialize(serializer_class, page, many=True))
+
+
+class AsyncRecipeListView(AsyncAPIView):
+    permission_classes = RecipeListCreateView.permission_classes
+    sync_view = RecipeListCreateView
+
+    async def get(self, request):
+        ordering = RecipeListCreateView.orderings.get(
+            request.query_params.get('ordering'), RecipeListCreateView.orderings['newest']
+        )
+        filters = facets.parse_filters(request.query_params)
+
+        async def build():
+            queryset = facets.apply_filters(Recipe.objects.public().for_list().order_by(*ordering), filters)
+            page, response = await self.paginated(queryset, RecipeSerializer)
+            data = response.data
+            if request.query_params.get('facets') == 'true':
+                data['facets'] = await sync_to_async(facets.facet_counts)(filters)
+            return data
+
+        if not response_cache.is_enabled():
+            return Response(await build())
+        return await response_cache.acached_response(request, await response_cache.alist_key(request), build)
+
+
+class AsyncRecipeDetailView(AsyncAPIView):
+    permission_classes = RecipeDetailView.permission_classes
+
+    async def get(self, request, pk):
+        async def build():
+            try:
+                recipe = await Recipe.objects.with_relations().aget(pk=pk)
+            except Recipe.DoesNotExist:
+                raise Http404('No %s matches the given query.' % Recipe._meta.object_name)
+            return self.serialize(RecipeSerializer, recipe)
+
+        if not response_cache.is_enabled():
+            return Response(await build())
+        return await response_cache.acached_response(request, await response_cache.adetail_key(pk), build)
+
+
+class AsyncRecipeSearchView(AsyncAPIView):
+    permission_classes = RecipeSearchView.permission_classes
+
+    async def get(self, request):
+        query = request.query_params.get('q', '')
+        paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+
+        def rank():
+            # The search backends are synchronous; run them and the page slice in one hop.
+            ranked_ids = get_search_backend().search(query)
+            page = paginator.paginate_queryset(ranked_ids, request, view=self)
+            return page, page if page is not None else list(ranked_ids)
+
+        page, recipe_ids = await sync_to_async(rank)()
+        recipes = await Recipe.objects.for_list().ain_bulk(recipe_ids)
+        ranked = [recipes[pk] for pk in recipe_ids if pk in recipes and recipes[pk].is_public]
+        data = self.serialize(RecipeSerializer, ranked, many=True)
+        if page is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data)
+
+
+class AsyncUserRecipesView(AsyncAPIView):
+    permission_classes = UserRecipesView.permission_classes
+
+    async def get(self, request, user_id):
+        queryset = Recipe.objects.public().for_list().filter(user_id=user_id).order_by('-created_at', '-id')
+        return (await self.paginated(queryset, RecipeSerializer))[1]
+
+
+class AsyncNotificationView(AsyncAPIView):
+    permission_classes = NotificationView.permission_classes
+
+    async def get(self, request):
+        notifications = Notification.objects.filter(recipient_id=request.user.id)
+        is_read = request.query_params.get('is_read')
+        if is_read in ('true', 'false'):
+            notifications = notifications.filter(is_read=is_read == 'true')
+        queryset = notifications.order_by('-created_at', '-id')
+        return (await self.paginated(queryset, NotificationSerializer))[1]
+
+
+# URL name -> async variant, see recipe_sharing.asgi_urls.
+ASYNC_VIEWS = {
+    'recipe-list': AsyncRecipeListView,
+    'recipe-detail': AsyncRecipeDetailView,
+    'recipe-search': AsyncRecipeSearchView,
+    'user-recipes': AsyncUserRecipesView,
+    'notifications': AsyncNotificationView,
+}
@@ -0,0 +1,125 @@
+"""
+Bulk import and export of recipes as JSON Lines (one JSON object per line).
+
+Imports are read from the request stream and handled in chunks of
+``RECIPE_BULK_CHUNK_SIZE`` rows: each row is validated with
+``RecipeImportSerializer``, the valid rows of a chunk are written with one
+``bulk_create`` plus one insert per many-to-many through table, and the
+work normally done by the ``Recipe`` post_save handlers (ingredient
+parsing, search indexing, feed fan-out, cache invalidation) is done once
+per chunk. Each chunk commits on its own, so a long import never holds one
+huge transaction.
+
+Exports iterate over a server-side cursor and serialize one chunk at a
+time, so memory use does not grow with the number of recipes.
+"""
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import facets
+from . import feed
+from . import response_cache
+from .ingredients import sync_recipe_ingredients_bulk
+from .models import CuisineType, DietaryPreference, Recipe
+from .search import get_search_backend
+from .serializers import RecipeImportSerializer, RecipeSerializer
+
+
+def chunk_size():
+    return getattr(settings, 'RECIPE_BULK_CHUNK_SIZE', 500)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_lines(stream):
+    """Yield ``(line_number, data, error)`` for each non-blank line of a JSON Lines stream."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except (UnicodeDecodeError, ValueError):
+            yield line_number, None, {'non_field_errors': ['Invalid JSON.']}
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield line_number, data, None
+
+
+def import_recipes(stream, user, context=None):
+    """
+    Create recipes owned by ``user`` from a JSON Lines stream.
+
+    Returns ``(created_ids, errors)`` where ``errors`` lists
+    ``{'line': n, 'errors': {...}}`` for every rejected row.
+    """
+    context = dict(context or {})
+    context['preloaded'] = {
+        CuisineType: CuisineType.objects.in_bulk(),
+        DietaryPreference: DietaryPreference.objects.in_bulk(),
+    }
+    created_ids, errors = [], []
+    for chunk in chunked(parse_lines(stream), chunk_size()):
+        valid = []
+        for line_number, data, error in chunk:
+            if error is None:
+                serializer = RecipeImportSerializer(data=data, context=context)
+                if serializer.is_valid():
+                    valid.append(serializer.validated_data)
+                    continue
+                error = serializer.errors
+            errors.append({'line': line_number, 'errors': error})
+        if valid:
+            created_ids.extend(write_recipes(valid, user))
+    return created_ids, errors
+
+
+def write_recipes(rows, user):
+    """Insert validated rows and return the new recipe ids."""
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                **{name: value for name, value in row.items() if name not in ('cuisine_types', 'dietary_preferences')},
+            )
+            for row in rows
+        ])
+        Recipe.cuisine_types.through.objects.bulk_create([
+            Recipe.cuisine_types.through(recipe_id=recipe.pk, cuisinetype_id=cuisine.pk)
+            for recipe, row in zip(recipes, rows)
+            for cuisine in set(row.get('cuisine_types', []))
+        ])
+        Recipe.dietary_preferences.through.objects.bulk_create([
+            Recipe.dietary_preferences.through(recipe_id=recipe.pk, dietarypreference_id=preference.pk)
+            for recipe, row in zip(recipes, rows)
+            for preference in set(row.get('dietary_preferences', []))
+        ])
+        sync_recipe_ingredients_bulk(recipes)
+        backend = get_search_backend()
+        for recipe in recipes:
+            backend.index_recipe(recipe, tag_names=[])
+        feed.publish_recipes(recipes)
+        response_cache.invalidate(lists=True)
+        facets.invalidate()
+    return [recipe.pk for recipe in recipes]
+
+
+def export_recipes(queryset, context=None):
+    """Yield the recipes of ``queryset`` serialized as JSON Lines, one chunk at a time."""
+    size = chunk_size()
+    recipes = queryset.with_relations().order_by('pk').iterator(chunk_size=size)
+    for chunk in chunked(recipes, size):
+        data = RecipeSerializer(chunk, many=True, context=context or {}).data
+        yield ''.join(json.dumps(row, cls=JSONEncoder) + '\n' for row in data)
@@ -0,0 +1,37 @@
+"""
+System checks, run by ``manage.py check`` and when a server starts.
+"""
+from django.core.cache import caches
+from django.core.checks import Warning, register
+
+from recipe_sharing.cache import is_shared
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Warn about features that coordinate workers through a cache that is not shared by them."""
+    from . import instrumentation, replicas, response_cache, throttling
+    features = [
+        ('RATE_LIMITS', throttling.limit_setting('ALIAS'), 'each worker counts requests on its own'),
+        ('INSTRUMENTATION', instrumentation.metrics_setting('ALIAS'), '/metrics/ only reports the worker serving it'),
+    ]
+    if response_cache.is_enabled():
+        # Comment pages (COMMENT_CACHE) live in the same alias.
+        features.append((
+            'RESPONSE_CACHE', response_cache.cache_setting('ALIAS'),
+            'other workers serve stale recipe and comment payloads after an edit until they expire',
+        ))
+    if replicas.replication_setting('REPLICAS'):
+        features.append((
+            'DATABASE_REPLICATION', replicas.replication_setting('ALIAS'),
+            "other workers can serve a user's reads from a replica right after their write",
+        ))
+    return [
+        Warning(
+            f"{setting}['ALIAS'] ({alias!r}) is a process-local cache, so {consequence}.",
+            hint='Set REDIS_URL to share the cache between workers.',
+            id='recipe_api.W001',
+        )
+        for setting, alias, consequence in features
+        if not is_shared(caches[alias])
+    ]
@@ -0,0 +1,126 @@
+"""
+Comment threads and the denormalized ``Recipe.comment_count``.
+
+The counter is adjusted with an F() UPDATE whenever a comment is created
+or deleted; ``reconcile_comment_counts`` rebuilds it from the table.
+
+``GET /recipes/<pk>/comments/`` pages through the ``comment_recipe_recent``
+index newest first with ``KeysetPagination`` and joins only the author's
+id and username. Each page is cached together with the window of
+``(created_at, id)`` keys it covers, including the gap up to its cursor and
+any open end. A per-recipe index lists those windows, so creating,
+editing or deleting a comment drops only the cached pages whose window
+contains that comment's key. Every other page of the thread stays cached.
+A new comment has the newest key and so only touches the first page.
+Pages are shared by all users, so the view first checks that the recipe
+is public or the requester's own.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import response_cache
+from .models import Comment, Recipe
+
+DEFAULTS = {
+    # Bounds how long a page can outlive a lost update of the page index.
+    'TIMEOUT': 60 * 5,
+}
+
+
+def comment_setting(name):
+    return getattr(settings, 'COMMENT_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def apply_comment_delta(recipe_id, delta):
+    Recipe.objects.filter(pk=recipe_id).update(comment_count=F('comment_count') + delta)
+
+
+def reconcile_comment_counts(recipes=None):
+    """Recompute ``comment_count`` of ``recipes`` (default: all) from the ``Comment`` table."""
+    if recipes is None:
+        recipes = Recipe.objects.all()
+    counts = (
+        Comment.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+        .annotate(total=Count('pk')).values('total')
+    )
+    return recipes.update(comment_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+def thread(recipe_id):
+    return (
+        Comment.objects.filter(recipe_id=recipe_id)
+        .select_related('user')
+        .only('id', 'recipe_id', 'content', 'created_at', 'updated_at', 'user__id', 'user__username')
+        .order_by('-created_at', '-id')
+    )
+
+
+def comment_key(comment):
+    return (comment.created_at, comment.pk)
+
+
+def page_window(paginator):
+    """
+    ``(low, high)`` keys a newest-first ``KeysetPagination`` page covers, with
+    ``None`` for an end that reaches the start or the end of the thread.
+    """
+    cursor = tuple(paginator.cursor_key) if paginator.cursor_key else None
+    first = comment_key(paginator.first_item) if paginator.first_item else None
+    last = comment_key(paginator.last_item) if paginator.last_item else None
+    if paginator.reverse:
+        # Fetched towards newer comments, starting after the cursor.
+        return cursor, first if paginator.has_previous else None
+    return last if paginator.has_next else None, cursor
+
+
+def index_key(recipe_id):
+    return f'comments:{recipe_id}:pages'
+
+
+def page_key(recipe_id, request):
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    return f'comments:{recipe_id}:page:{query}'
+
+
+def cached_page(request, recipe_id, build):
+    """The cached page for ``request``, or ``build()`` (returning ``(data, window)``) on a miss."""
+    cache = response_cache.get_cache()
+    key = page_key(recipe_id, request)
+    data = cache.get(key)
+    if data is None:
+        data, window = build()
+        timeout = comment_setting('TIMEOUT')
+        cache.set(key, data, timeout)
+        pages = cache.get(index_key(recipe_id)) or {}
+        pages[key] = window
+        cache.set(index_key(recipe_id), pages, timeout)
+    return data
+
+
+def _contains(window, key):
+    low, high = window
+    return (low is None or low <= key) and (high is None or key <= high)
+
+
+def _invalidate(recipe_id, key):
+    cache = response_cache.get_cache()
+    pages = cache.get(index_key(recipe_id))
+    if not pages:
+        return
+    stale = [page for page, window in pages.items() if _contains(window, key)]
+    if stale:
+        cache.delete_many(stale)
+        for page in stale:
+            del pages[page]
+        cache.set(index_key(recipe_id), pages, comment_setting('TIMEOUT'))
+
+
+def invalidate(comment):
+    """Drop the cached pages that show ``comment``, now and again on commit."""
+    recipe_id, key = comment.recipe_id, comment_key(comment)
+    _invalidate(recipe_id, key)
+    transaction.on_commit(lambda: _invalidate(recipe_id, key))
@@ -0,0 +1,142 @@
+"""
+Faceted filtering of the public recipe list.
+
+Query parameters:
+
+* ``meal_type=dinner,lunch``: any of the listed meal types;
+* ``cuisine_types`` and ``dietary_preferences``: comma-separated ids are
+  ORed and repeating the parameter ANDs the groups, so
+  ``cuisine_types=1,2&cuisine_types=3`` means (1 or 2) and 3;
+* ``max_prep_time`` and ``max_cook_time`` in minutes.
+
+Every many-to-many group is a semi-join on the through table, so matching
+several values never duplicates rows.
+
+With ``facets=true`` the list also returns how many recipes match each
+facet value. Each facet is counted with a single grouped query, and only
+the filters of the *other* facets apply, so alternative values stay
+visible. The counts are cached per filter combination under a version of
+their own, bumped only when a recipe is created or deleted or one of the
+faceted columns (``FIELDS`` and the many-to-many groups) changes; ratings,
+comments and edits of other columns keep the cached counts.
+"""
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from . import response_cache
+from .models import Recipe
+
+M2M_COLUMNS = {
+    'cuisine_types': 'cuisinetype_id',
+    'dietary_preferences': 'dietarypreference_id',
+}
+TIME_FIELDS = {
+    'max_prep_time': 'prep_time',
+    'max_cook_time': 'cook_time',
+}
+# Recipe columns the counts depend on, besides the many-to-many groups.
+FIELDS = ('meal_type', 'prep_time', 'cook_time', 'is_public')
+NAMESPACE = 'recipes:facets'
+# Limits offered as max_prep_time / max_cook_time facet values.
+TIME_BUCKETS = (15, 30, 60, 120)
+
+
+def _values(params, name):
+    return [value.strip() for raw in params.getlist(name) for value in raw.split(',') if value.strip()]
+
+
+def _ids(raw, name):
+    try:
+        return tuple(sorted({int(value) for value in raw.split(',') if value.strip()}))
+    except ValueError:
+        raise ValidationError({name: ['Expected comma-separated ids.']})
+
+
+def parse_filters(params):
+    """Normalized facet filters from the query string; raises ``ValidationError`` on bad values."""
+    filters = {}
+    meal_types = set(_values(params, 'meal_type'))
+    unknown = meal_types - {value for value, _ in Recipe.MEAL_TYPES}
+    if unknown:
+        raise ValidationError({'meal_type': [f'Unknown meal type "{value}".' for value in sorted(unknown)]})
+    if meal_types:
+        filters['meal_type'] = sorted(meal_types)
+    for name in M2M_COLUMNS:
+        groups = {_ids(raw, name) for raw in params.getlist(name)} - {()}
+        if groups:
+            filters[name] = sorted(groups)
+    for name in TIME_FIELDS:
+        value = params.get(name, '').strip()
+        if not value:
+            continue
+        if not value.isdigit():
+            raise ValidationError({name: ['Expected a number of minutes.']})
+        filters[name] = int(value)
+    return filters
+
+
+def apply_filters(queryset, filters, exclude=None):
+    for name, value in filters.items():
+        if name == exclude:
+            continue
+        if name == 'meal_type':
+            queryset = queryset.filter(meal_type__in=value)
+        elif name in M2M_COLUMNS:
+            through = getattr(Recipe, name).through
+            for group in value:
+                matching = through.objects.filter(**{f'{M2M_COLUMNS[name]}__in': group}).values('recipe_id')
+                queryset = queryset.filter(pk__in=matching)
+        else:
+            queryset = queryset.filter(**{f'{TIME_FIELDS[name]}__lte': value})
+    return queryset
+
+
+def _ranked(rows):
+    return sorted(rows, key=lambda row: (-row['count'], row['value']))
+
+
+def compute_counts(filters):
+    public = Recipe.objects.public().order_by()
+    counts = {}
+    rows = apply_filters(public, filters, 'meal_type').values('meal_type').annotate(count=Count('pk'))
+    counts['meal_type'] = _ranked({'value': row['meal_type'], 'count': row['count']} for row in rows)
+    for name, column in M2M_COLUMNS.items():
+        recipes = apply_filters(public, filters, name).values('pk')
+        rows = (
+            getattr(Recipe, name).through.objects.filter(recipe_id__in=recipes)
+            .values(column).annotate(count=Count('recipe_id')).order_by()
+        )
+        counts[name] = _ranked({'value': row[column], 'count': row['count']} for row in rows)
+    for name, field in TIME_FIELDS.items():
+        totals = apply_filters(public, filters, name).aggregate(**{
+            str(bound): Count('pk', filter=Q(**{f'{field}__lte': bound})) for bound in TIME_BUCKETS
+        })
+        counts[name] = [{'value': bound, 'count': totals[str(bound)]} for bound in TIME_BUCKETS]
+    return counts
+
+
+def facets_key(filters):
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    version = response_cache.get_version(NAMESPACE)
+    return f'{NAMESPACE}:v{version}:{digest}'
+
+
+def invalidate():
+    """Discard the cached counts, immediately and again on commit like ``response_cache.invalidate``."""
+    response_cache.bump_version(NAMESPACE)
+    transaction.on_commit(lambda: response_cache.bump_version(NAMESPACE))
+
+
+def facet_counts(filters):
+    """Counts per value of every facet for ``filters``, from the cache when possible."""
+    cache = response_cache.get_cache()
+    key = facets_key(filters)
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute_counts(filters)
+        cache.set(key, counts, response_cache.cache_setting('TIMEOUT'))
+    return counts
@@ -0,0 +1,192 @@
+"""
+Home feed built from ``Follow`` relationships.
+
+Publishing a public recipe pushes a ``FeedEntry`` into the timeline of each
+of the author's followers (fan-out-on-write), so reading a feed is an index
+range scan on ``(owner, created_at)``. Authors with more than
+``FEED_FANOUT_MAX_FOLLOWERS`` followers are not fanned out; their recipes
+are pulled when the feed is read and merged into the materialized entries.
+Timelines are trimmed to ``FEED_MAX_ENTRIES``.
+
+The choice reads ``CustomUser.follower_count``, which the ``Follow``
+signals adjust with F() UPDATEs. ``manage.py reconcile_follower_counts``
+rebuilds it from the table and, with ``--backfill-feeds``, seeds the
+timelines of follows made before the feed existed; run it once when
+deploying the feed and whenever the counter is suspected to drift.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import FeedEntry, Follow, Recipe
+from users.models import CustomUser
+
+FANOUT_CHUNK_SIZE = 1000
+
+
+def fanout_max_followers():
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)
+
+
+def max_entries():
+    return getattr(settings, 'FEED_MAX_ENTRIES', 500)
+
+
+def backfill_size():
+    return getattr(settings, 'FEED_BACKFILL_ON_FOLLOW', 20)
+
+
+def is_fanout_author(author_id):
+    return CustomUser.objects.filter(pk=author_id, follower_count__lte=fanout_max_followers()).exists()
+
+
+def reconcile_follower_counts(users=None):
+    """Recompute ``follower_count`` of ``users`` (default: all) from the ``Follow`` table."""
+    if users is None:
+        users = CustomUser.objects.all()
+    counts = (
+        Follow.objects.filter(following=OuterRef('pk')).order_by().values('following')
+        .annotate(total=Count('pk')).values('total')
+    )
+    return users.update(follower_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+def follower_id_chunks(author_id):
+    follower_ids = (
+        Follow.objects.filter(following_id=author_id)
+        .order_by('follower_id')
+        .values_list('follower_id', flat=True)
+    )
+    last_id = 0
+    while True:
+        chunk = list(follower_ids.filter(follower_id__gt=last_id)[:FANOUT_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def publish_recipe(recipe):
+    """Push a public recipe into its author's followers' timelines. Returns the entries written."""
+    return publish_recipes([recipe])
+
+
+def publish_recipes(recipes):
+    """Like ``publish_recipe`` for many recipes, reading each author's followers once."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        if recipe.is_public:
+            by_author[recipe.user_id].append(recipe)
+    written = 0
+    for author_id, author_recipes in by_author.items():
+        if not is_fanout_author(author_id):
+            continue
+        for chunk in follower_id_chunks(author_id):
+            FeedEntry.objects.bulk_create(
+                [
+                    FeedEntry(owner_id=owner_id, recipe_id=recipe.pk, author_id=author_id, created_at=recipe.created_at)
+                    for owner_id in chunk
+                    for recipe in author_recipes
+                ],
+                ignore_conflicts=True,
+            )
+            trim_feeds(chunk)
+            written += len(chunk) * len(author_recipes)
+    return written
+
+
+def unpublish_recipe(recipe_id):
+    FeedEntry.objects.filter(recipe_id=recipe_id).delete()
+
+
+def follow_added(follower_id, author_id):
+    """Seed a new follower's timeline with the author's latest recipes."""
+    if not is_fanout_author(author_id):
+        return
+    recipes = (
+        Recipe.objects.public()
+        .filter(user_id=author_id)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:backfill_size()]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(owner_id=follower_id, recipe_id=recipe_id, author_id=author_id, created_at=created_at)
+            for recipe_id, created_at in recipes
+        ],
+        ignore_conflicts=True,
+    )
+    trim_feeds([follower_id])
+
+
+def follow_removed(follower_id, author_id):
+    FeedEntry.objects.filter(owner_id=follower_id, author_id=author_id).delete()
+
+
+def trim_feeds(owner_ids):
+    """Trim the timelines among ``owner_ids`` that grew past the limit.
+
+    Timelines may overshoot the limit by 10% before they are trimmed so the
+    DELETE is amortized over many writes.
+    """
+    limit = max_entries()
+    overflowing = (
+        FeedEntry.objects.filter(owner_id__in=owner_ids)
+        .values('owner_id')
+        .annotate(total=Count('pk'))
+        .filter(total__gt=limit + limit // 10)
+        .values_list('owner_id', flat=True)
+    )
+    for owner_id in overflowing:
+        trim_feed(owner_id, limit)
+
+
+def trim_feed(owner_id, limit):
+    cutoff = list(
+        FeedEntry.objects.filter(owner_id=owner_id)
+        .order_by('-created_at', '-recipe_id')
+        .values_list('created_at', 'recipe_id')[limit:limit + 1]
+    )
+    if not cutoff:
+        return 0
+    created_at, recipe_id = cutoff[0]
+    deleted, _ = FeedEntry.objects.filter(owner_id=owner_id).filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, recipe_id__lte=recipe_id)
+    ).delete()
+    return deleted
+
+
+def pulled_author_ids(user):
+    """Followed authors whose recipes are read on demand instead of fanned out."""
+    return list(
+        CustomUser.objects.filter(followers__follower=user, follower_count__gt=fanout_max_followers())
+        .values_list('id', flat=True)
+    )
+
+
+def read_feed(user, page_size, after=None):
+    """
+    Return ``(recipes, last_key, has_more)`` for one page of ``user``'s feed.
+    ``after`` is the ``(created_at, recipe_id)`` key of the last recipe on
+    the previous page.
+    """
+    entries = FeedEntry.objects.filter(owner=user)
+    pulled = Recipe.objects.public().filter(user_id__in=pulled_author_ids(user))
+    if after is not None:
+        created_at, recipe_id = after
+        entries = entries.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, recipe_id__lt=recipe_id), created_at__lte=created_at
+        )
+        pulled = pulled.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=recipe_id), created_at__lte=created_at
+        )
+    candidates = set(entries.order_by('-created_at', '-recipe_id').values_list('created_at', 'recipe_id')[:page_size + 1])
+    candidates.update(pulled.order_by('-created_at', '-id').values_list('created_at', 'id')[:page_size + 1])
+    keys = sorted(candidates, reverse=True)
+    has_more = len(keys) > page_size
+    keys = keys[:page_size]
+    recipes = Recipe.objects.for_list().in_bulk([recipe_id for _, recipe_id in keys])
+    page = [recipes[recipe_id] for _, recipe_id in keys if recipe_id in recipes and recipes[recipe_id].is_public]
+    return page, (keys[-1] if keys else None), has_more
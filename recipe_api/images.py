@@ -0,0 +1,156 @@
+"""
+Background processing of uploaded images.
+
+When a ``Recipe.photo`` or ``CustomUser.profile_picture`` is saved with a
+new upload, the file is handed to a ``ProcessPoolExecutor`` once the
+transaction commits. A worker decodes it once with Pillow
+(``recipe_api.thumbnails``), drops all metadata and renders thumbnails at
+``IMAGE_PIPELINE['WIDTHS']``. Results are stored under content-hashed
+names (``recipe_photos/<hash>.webp``, ``recipe_photos/<hash>_480w.webp``),
+hashed over the upload and the rendering settings, whose content never
+changes, so they can be served with a far-future
+``Cache-Control: immutable``. The image field is then pointed at the
+processed original, the names are recorded in ``<field>_variants`` and the
+raw upload, which may carry EXIF location data, is deleted. The image
+fields are in ``CHANGED_FIELDS``, so a stale instance saved afterwards does
+not write the raw upload's name back.
+
+With ``EAGER`` the work runs inline when the transaction commits; tests use
+this.
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.dispatch import receiver
+
+from . import response_cache
+from .models import Recipe
+from .thumbnails import render_variants
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WIDTHS': (160, 480, 1080),
+    'MAX_DIMENSION': 2048,
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    # Worker processes; None means one per CPU.
+    'WORKERS': None,
+    'EAGER': False,
+}
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def image_setting(name):
+    return getattr(settings, 'IMAGE_PIPELINE', {}).get(name, DEFAULTS[name])
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=image_setting('WORKERS'))
+        return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'IMAGE_PIPELINE' and _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def needs_processing(instance, field_name):
+    image = getattr(instance, field_name)
+    return bool(image) and getattr(instance, variants_field(field_name)).get('src') != image.name
+
+
+def schedule(instance, field_name):
+    """Process ``instance.<field_name>`` after commit if it holds a new upload."""
+    if not needs_processing(instance, field_name):
+        return
+    model = instance._meta.concrete_model
+    pk, source_name = instance.pk, getattr(instance, field_name).name
+    transaction.on_commit(lambda: submit(model, pk, field_name, source_name))
+
+
+def submit(model, pk, field_name, source_name):
+    storage = model._meta.get_field(field_name).storage
+    try:
+        with storage.open(source_name, 'rb') as source:
+            data = source.read()
+    except OSError:
+        logger.warning("Uploaded image %s is missing", source_name)
+        return
+    args = (data, tuple(image_setting('WIDTHS')), image_setting('MAX_DIMENSION'), image_setting('FORMAT'), image_setting('QUALITY'))
+    if image_setting('EAGER'):
+        store_variants(model, pk, field_name, source_name, render_variants(*args))
+        return
+    future = get_executor().submit(render_variants, *args)
+    future.add_done_callback(lambda done: _store_result(model, pk, field_name, source_name, done))
+
+
+def _store_result(model, pk, field_name, source_name, future):
+    # Runs on the executor's result thread, which has its own connections.
+    try:
+        store_variants(model, pk, field_name, source_name, future.result())
+    except Exception:
+        logger.exception("Processing %s failed", source_name)
+    finally:
+        connections.close_all()
+
+
+def store_variants(model, pk, field_name, source_name, result):
+    """Save rendered variants and point the row at them, unless a newer upload replaced the source."""
+    digest, variants = result
+    storage = model._meta.get_field(field_name).storage
+    directory = posixpath.dirname(source_name)
+    extension = EXTENSIONS[image_setting('FORMAT')]
+    names = {}
+    for label, content in variants.items():
+        suffix = '' if label == 'original' else f'_{label}'
+        name = posixpath.join(directory, f'{digest}{suffix}.{extension}')
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(content))
+        names[label] = name
+    src = names.pop('original')
+    updated = model._base_manager.filter(pk=pk, **{field_name: source_name}).update(**{
+        field_name: src,
+        variants_field(field_name): {'src': src, 'sizes': names},
+    })
+    if not updated:
+        return
+    if source_name != src:
+        storage.delete(source_name)
+    if issubclass(model, Recipe):
+        response_cache.invalidate([pk])
+
+
+def srcset(image, variants, request=None):
+    """Map ``'<width>w'`` labels and ``'original'`` to URLs, or ``None`` until the image is processed."""
+    if not image or variants.get('src') != image.name:
+        return None
+
+    def url(name):
+        location = image.storage.url(name)
+        return request.build_absolute_uri(location) if request is not None else location
+
+    urls = {label: url(name) for label, name in variants['sizes'].items()}
+    urls['original'] = url(variants['src'])
+    return urls
@@ -0,0 +1,179 @@
+"""
+Parsing of the free-form ``Recipe.ingredients`` text into structured rows.
+
+Each line such as ``"1 1/2 cups rolled oats"`` becomes a ``RecipeIngredient``
+with a quantity, a normalized unit and a link to a shared ``Ingredient``.
+The ingredient to recipe rows double as the index used by the pantry
+endpoint.
+"""
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+ParsedIngredient = namedtuple('ParsedIngredient', ['quantity', 'unit', 'name', 'raw_text'])
+
+UNIT_ALIASES = {
+    'g': 'g', 'gram': 'g', 'grams': 'g', 'gr': 'g',
+    'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'mg': 'mg',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml', 'millilitre': 'ml', 'millilitres': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'cup': 'cup', 'cups': 'cup', 'c': 'cup',
+    'tbsp': 'tbsp', 'tbs': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch',
+    'dash': 'dash', 'dashes': 'dash',
+    'clove': 'clove', 'cloves': 'clove',
+    'can': 'can', 'cans': 'can',
+    'slice': 'slice', 'slices': 'slice',
+    'bunch': 'bunch', 'bunches': 'bunch',
+    'handful': 'handful', 'handfuls': 'handful',
+    'piece': 'piece', 'pieces': 'piece',
+}
+
+UNICODE_FRACTIONS = {
+    '¼': '1/4', '½': '1/2', '¾': '3/4', '⅓': '1/3', '⅔': '2/3',
+    '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8',
+}
+
+QUANTITY_RE = re.compile(
+    r'^\s*(?P<quantity>\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)'
+    r'(?:\s*(?:-|–|to)\s*(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?))?\s*'
+)
+LINE_SPLIT_RE = re.compile(r'[\n;]+')
+BULLET_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+NAME_STOPWORDS = {'of', 'a', 'an', 'the', 'fresh', 'large', 'small', 'medium', 'chopped', 'diced', 'sliced', 'minced'}
+
+
+def parse_quantity(text):
+    text = text.strip().replace(',', '.')
+    try:
+        if ' ' in text:
+            whole, fraction = text.split()
+            value = Fraction(int(whole)) + Fraction(fraction)
+        else:
+            value = Fraction(text)
+    except (ValueError, ZeroDivisionError):
+        return None
+    try:
+        return Decimal(value.numerator) / Decimal(value.denominator)
+    except InvalidOperation:
+        return None
+
+
+def singularize(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith('oes'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_name(text):
+    """Reduce an ingredient description to its canonical name, e.g. "Eggs, beaten" -> "egg"."""
+    text = PARENTHETICAL_RE.sub(' ', text.lower()).split(',')[0]
+    words = [word for word in re.findall(r"[a-z][a-z'-]*", text) if word not in NAME_STOPWORDS]
+    if not words:
+        return ''
+    words[-1] = singularize(words[-1])
+    return ' '.join(words)[:100]
+
+
+def parse_ingredient_line(line):
+    raw_text = BULLET_RE.sub('', line).strip()
+    text = raw_text
+    for symbol, replacement in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, ' ' + replacement)
+    quantity = None
+    match = QUANTITY_RE.match(text)
+    if match:
+        quantity = parse_quantity(match.group('quantity'))
+        text = text[match.end():]
+    unit = ''
+    parts = text.split(None, 1)
+    if parts and parts[0].lower().rstrip('.') in UNIT_ALIASES:
+        unit = UNIT_ALIASES[parts[0].lower().rstrip('.')]
+        text = parts[1] if len(parts) > 1 else ''
+    return ParsedIngredient(quantity, unit, normalize_name(text), raw_text[:255])
+
+
+def parse_ingredients(text):
+    parsed = []
+    for line in LINE_SPLIT_RE.split(text or ''):
+        if not line.strip():
+            continue
+        item = parse_ingredient_line(line)
+        if item.name:
+            parsed.append(item)
+    return parsed
+
+
+def resolve_ingredient_ids(names):
+    """Map ingredient names to ids, creating missing ``Ingredient`` rows in bulk."""
+    names = set(names)
+    if not names:
+        return {}
+    existing = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - existing.keys()
+    if missing:
+        Ingredient.objects.bulk_create([Ingredient(name=name) for name in missing], ignore_conflicts=True)
+        existing.update(Ingredient.objects.filter(name__in=missing).values_list('name', 'id'))
+    return existing
+
+
+def build_recipe_ingredients(recipe_id, parsed, ingredient_ids):
+    rows = []
+    seen = set()
+    for position, item in enumerate(parsed):
+        ingredient_id = ingredient_ids[item.name]
+        if ingredient_id in seen:
+            continue
+        seen.add(ingredient_id)
+        rows.append(RecipeIngredient(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            quantity=item.quantity,
+            unit=item.unit,
+            raw_text=item.raw_text,
+            position=position,
+        ))
+    return rows
+
+
+def sync_recipe_ingredients(recipe):
+    """Replace the structured ingredients of one recipe from its text."""
+    parsed = parse_ingredients(recipe.ingredients)
+    ingredient_ids = resolve_ingredient_ids(item.name for item in parsed)
+    rows = build_recipe_ingredients(recipe.pk, parsed, ingredient_ids)
+    RecipeIngredient.objects.filter(recipe_id=recipe.pk).delete()
+    RecipeIngredient.objects.bulk_create(rows)
+    Recipe.objects.filter(pk=recipe.pk).update(ingredient_count=len(rows))
+    recipe.ingredient_count = len(rows)
+
+
+def sync_recipe_ingredients_bulk(recipes):
+    """Like ``sync_recipe_ingredients`` for a chunk of recipes, with a fixed number of queries."""
+    parsed_by_recipe = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    ingredient_ids = resolve_ingredient_ids(
+        item.name for parsed in parsed_by_recipe.values() for item in parsed
+    )
+    rows = []
+    counts = {}
+    for recipe_id, parsed in parsed_by_recipe.items():
+        recipe_rows = build_recipe_ingredients(recipe_id, parsed, ingredient_ids)
+        counts[recipe_id] = len(recipe_rows)
+        rows.extend(recipe_rows)
+    RecipeIngredient.objects.filter(recipe_id__in=counts).delete()
+    RecipeIngredient.objects.bulk_create(rows)
+    for recipe in recipes:
+        recipe.ingredient_count = counts[recipe.pk]
+    Recipe.objects.bulk_update(recipes, ['ingredient_count'])
+    return len(rows)
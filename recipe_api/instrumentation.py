@@ -0,0 +1,322 @@
+"""
+Request metrics per endpoint.
+
+``InstrumentationMiddleware`` measures every request and files it under
+the URL name it resolved to (``recipe-list``, ``notifications``, ...;
+``unresolved`` for 404s). It records four histograms:
+
+* total latency;
+* the number of SQL queries, counted by an execute wrapper that is added
+  to every connection when it opens, so reads routed to a replica and
+  queries run by async views in a worker thread are counted too;
+* the time spent in those queries;
+* the time spent in ``to_representation`` of serializers that use
+  ``TimedSerializerMixin``, including the queries it triggers.
+
+It also counts responses by status class. Each process collects the
+counts in memory and adds them to the ``ALIAS`` cache at most every
+``FLUSH_INTERVAL`` seconds, in one pipelined round trip on Redis. A flush
+that fails is logged and its counts are dropped; the request is served
+regardless. ``/metrics/`` reports in the Prometheus text format what the
+cache holds, which covers every worker only when the cache is shared
+(``REDIS_URL``); with locmem each worker reports itself, and ``manage.py
+check`` warns about it. Scrapers authenticate with ``Authorization:
+Bearer <TOKEN>``; admins can use their JWT.
+
+With ``SERVER_TIMING`` on, responses carry a ``Server-Timing`` header
+with the same breakdown for browser dev tools. Requests slower than
+``SLOW_REQUEST_MS`` are logged with their SQL (without parameters), for
+a ``SLOW_SAMPLE_RATE`` fraction of them. ``manage.py
+bench_instrumentation`` measures the added latency per request.
+"""
+import bisect
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.permissions import BasePermission
+
+from recipe_sharing.cache import incr_many
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 10,
+    'TOKEN': None,
+    'SERVER_TIMING': False,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_SAMPLE_RATE': 0.1,
+    'MAX_CAPTURED_QUERIES': 50,
+}
+
+PREFIX = 'recipe_sharing'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# name -> (help, buckets, whether values are seconds)
+HISTOGRAMS = {
+    'request_duration_seconds': ('Request latency by URL name.', SECONDS_BUCKETS, True),
+    'request_queries': ('SQL queries per request by URL name.', QUERY_BUCKETS, False),
+    'request_sql_seconds': ('Time spent in SQL per request by URL name.', SECONDS_BUCKETS, True),
+    'request_serialize_seconds': ('Time spent serializing per request by URL name.', SECONDS_BUCKETS, True),
+}
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+SERIES_KEY = 'metrics:series'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_setting(name):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[metrics_setting('ALIAS')]
+
+
+class RequestMetrics:
+    """What one request spent, filled in while it runs."""
+    __slots__ = ('queries', 'sql_time', 'serialize_time', 'serializing', 'statements', 'capture')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        # (sql, seconds) of the first MAX_CAPTURED_QUERIES queries, for the slow-request log.
+        self.statements = []
+        self.capture = metrics_setting('MAX_CAPTURED_QUERIES')
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.queries += 1
+        metrics.sql_time += elapsed
+        if len(metrics.statements) < metrics.capture:
+            metrics.statements.append((sql, elapsed))
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """``connection_created`` receiver; reconnecting the same wrapper keeps a single copy."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """Adds the outermost ``to_representation`` call to the request's serializer time."""
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - start
+            metrics.serializing = False
+
+
+class Registry:
+    """
+    Counts of this process not yet added to the shared cache. Cache values
+    are integers (``incr``), so sums of seconds are kept in microseconds.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._series = set()
+        self._flushed_at = time.monotonic()
+
+    def observe(self, view, status_code, duration, metrics):
+        values = {
+            'request_duration_seconds': duration,
+            'request_queries': metrics.queries,
+            'request_sql_seconds': metrics.sql_time,
+            'request_serialize_seconds': metrics.serialize_time,
+        }
+        status_class = f'{status_code // 100}xx'
+        with self._lock:
+            for name, value in values.items():
+                _, buckets, seconds = HISTOGRAMS[name]
+                self._pending[f'metrics:{name}:{view}:{bisect.bisect_left(buckets, value)}'] += 1
+                self._pending[f'metrics:{name}:{view}:sum'] += round(value * 1_000_000) if seconds else value
+                self._pending[f'metrics:{name}:{view}:count'] += 1
+            self._pending[f'metrics:responses_total:{view}:{status_class}'] += 1
+            self._series.add(view)
+
+    def due(self):
+        return time.monotonic() - self._flushed_at >= metrics_setting('FLUSH_INTERVAL')
+
+    def take(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = time.monotonic()
+            return pending, set(self._series)
+
+    def flush(self):
+        pending, series = self.take()
+        cache = get_cache()
+        try:
+            if pending:
+                incr_many(cache, pending)
+            # Every flush re-adds this process's views, in case another process
+            # overwrote a concurrent update of the index.
+            known = cache.get(SERIES_KEY, set())
+            if not series <= known:
+                cache.set(SERIES_KEY, known | series, None)
+        except Exception:
+            logger.exception("Could not flush %d metric counters", len(pending))
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._series.clear()
+
+
+registry = Registry()
+
+
+def label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"')
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All workers' metrics in the Prometheus text exposition format."""
+    registry.flush()
+    cache = get_cache()
+    views = sorted(cache.get(SERIES_KEY, set()))
+    keys = [
+        f'metrics:{name}:{view}:{suffix}'
+        for name, (_, buckets, _) in HISTOGRAMS.items() for view in views
+        for suffix in [*range(len(buckets) + 1), 'sum', 'count']
+    ] + [f'metrics:responses_total:{view}:{status_class}' for view in views for status_class in STATUS_CLASSES]
+    values = cache.get_many(keys)
+
+    lines = []
+    for name, (help_text, buckets, seconds) in HISTOGRAMS.items():
+        lines += [f'# HELP {PREFIX}_{name} {help_text}', f'# TYPE {PREFIX}_{name} histogram']
+        for view in views:
+            count = values.get(f'metrics:{name}:{view}:count', 0)
+            if not count:
+                continue
+            cumulative = 0
+            for i, bound in enumerate([*buckets, '+Inf']):
+                cumulative += values.get(f'metrics:{name}:{view}:{i}', 0)
+                lines.append(f'{PREFIX}_{name}_bucket{{view="{label(view)}",le="{bound}"}} {cumulative}')
+            total = values.get(f'metrics:{name}:{view}:sum', 0)
+            lines.append(f'{PREFIX}_{name}_sum{{view="{label(view)}"}} {number(total / 1_000_000 if seconds else total)}')
+            lines.append(f'{PREFIX}_{name}_count{{view="{label(view)}"}} {count}')
+    lines += [f'# HELP {PREFIX}_responses_total Responses by URL name and status class.',
+              f'# TYPE {PREFIX}_responses_total counter']
+    for view in views:
+        for status_class in STATUS_CLASSES:
+            count = values.get(f'metrics:responses_total:{view}:{status_class}')
+            if count:
+                lines.append(f'{PREFIX}_responses_total{{view="{label(view)}",status="{status_class}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Accepts ``Authorization: Bearer <INSTRUMENTATION['TOKEN']>``; other headers fall through to JWT."""
+    def authenticate(self, request):
+        token = metrics_setting('TOKEN')
+        parts = get_authorization_header(request).split()
+        if token and len(parts) == 2 and parts[0] == b'Bearer' and constant_time_compare(parts[1], token.encode()):
+            return AnonymousUser(), MetricsTokenAuthentication
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="metrics"'
+
+
+class HasMetricsToken(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth is MetricsTokenAuthentication
+
+
+def server_timing(duration, metrics):
+    return (
+        f'total;dur={duration * 1000:.1f}, '
+        f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries", '
+        f'serialize;dur={metrics.serialize_time * 1000:.1f}'
+    )
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not metrics_setting('ENABLED'):
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if self.finish(request, response, time.perf_counter() - start, metrics):
+            registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        if not metrics_setting('ENABLED'):
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        if self.finish(request, response, time.perf_counter() - start, metrics):
+            await sync_to_async(registry.flush)()
+        return response
+
+    def finish(self, request, response, duration, metrics):
+        """Record the request; returns whether this process should flush its counts."""
+        match = request.resolver_match
+        view = (match.view_name or match.url_name) if match else 'unresolved'
+        registry.observe(view, response.status_code, duration, metrics)
+        if metrics_setting('SERVER_TIMING'):
+            response['Server-Timing'] = server_timing(duration, metrics)
+        if duration * 1000 >= metrics_setting('SLOW_REQUEST_MS') and random.random() < metrics_setting('SLOW_SAMPLE_RATE'):
+            statements = '\n'.join(f'  {seconds * 1000:8.2f} ms  {sql}' for sql, seconds in metrics.statements)
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, serializing %.0f ms\n%s",
+                request.method, request.path, view, duration * 1000, metrics.queries,
+                metrics.sql_time * 1000, metrics.serialize_time * 1000, statements,
+            )
+        return registry.due()
@@ -0,0 +1,144 @@
+"""
+In-process load generation for the ``bench_*`` commands.
+
+``wsgi_client`` and ``asgi_client`` send GET requests straight to Django's
+WSGI and ASGI handlers, so the whole middleware, URL routing and view stack
+runs but server and network overhead are left out. ``run_load`` keeps
+``concurrency`` requests in flight and reports throughput and latency.
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import reverse
+
+from .models import Notification, Recipe
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))] * 1000
+
+
+def read_paths(user):
+    """One request to each read-heavy endpoint, for a user set up by ``populate``."""
+    return [
+        reverse('recipe-list'),
+        reverse('recipe-detail', args=[Recipe.objects.filter(user=user).values_list('pk', flat=True)[0]]),
+        reverse('recipe-search') + '?q=bench',
+        reverse('user-recipes', args=[user.pk]),
+        reverse('notifications'),
+    ]
+
+
+def populate(user, total):
+    """``total`` public recipes and 50 notifications for ``user``."""
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user, title=f'Bench recipe {i}', description='', ingredients='salt, pepper',
+            instructions='Cook', prep_time=5, servings=1, meal_type='dinner',
+        )
+        for i in range(total)
+    ])
+    Notification.objects.bulk_create([
+        Notification(recipient=user, sender=user, notification_type='like', message=f'Liked {recipe.title}')
+        for recipe in recipes[:50]
+    ])
+
+
+def run_load(client, paths, requests, concurrency):
+    """Send ``requests`` GETs cycling through ``paths``; returns ``(seconds, timings, statuses)``."""
+    timings, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        async with semaphore:
+            start = time.perf_counter()
+            status = await client(path)
+            timings.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def main():
+        await asyncio.gather(*(one(paths[i % len(paths)]) for i in range(requests)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, timings, statuses
+
+
+def summary(requests, elapsed, timings, statuses):
+    return (
+        f'{requests / elapsed:8.1f} req/s  p50 {percentile(timings, 0.5):8.2f} ms  '
+        f'p99 {percentile(timings, 0.99):8.2f} ms  statuses {dict(sorted(statuses.items()))}'
+    )
+
+
+def wsgi_client(token, threads):
+    """One WSGI worker with ``threads`` threads, like gunicorn's gthread worker."""
+    handler = WSGIHandler()
+    pool = ThreadPoolExecutor(max_workers=threads)
+
+    def call(path):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+            'SCRIPT_NAME': '', 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'testserver',
+            'HTTP_AUTHORIZATION': f'Bearer {token}', 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        try:
+            b''.join(response)
+        finally:
+            # Sends request_finished, which closes or returns the DB connection.
+            response.close()
+        return int(status[0].split()[0])
+
+    async def client(path):
+        return await asyncio.get_running_loop().run_in_executor(pool, call, path)
+
+    return client
+
+
+def asgi_client(token):
+    """One ASGI application on the benchmark's event loop, like a single uvicorn worker."""
+    application = ASGIHandler()
+
+    async def client(path):
+        url = urlsplit(path)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+            'query_string': url.query.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+        done = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                done.set()
+
+        await application(scope, receive, send)
+        done.set()
+        return status[0]
+
+    return client
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe_api.ingredients import sync_recipe_ingredients_bulk
+from recipe_api.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Parse Recipe.ingredients into structured RecipeIngredient rows, streaming recipes in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--only-missing", action="store_true",
+            help="Skip recipes that already have structured ingredients.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only("id", "ingredients").order_by("pk")
+        if options["only_missing"]:
+            recipes = recipes.filter(ingredient_count=0)
+        last_pk = 0
+        total_recipes = total_rows = 0
+        while True:
+            chunk = list(recipes.filter(pk__gt=last_pk)[:options["chunk_size"]])
+            if not chunk:
+                break
+            with transaction.atomic():
+                total_rows += sync_recipe_ingredients_bulk(chunk)
+            total_recipes += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f"Processed {total_recipes} recipes")
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {total_rows} ingredients for {total_recipes} recipes"
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from recipe_api.loadtest import asgi_client, populate, read_paths, run_load, summary, wsgi_client
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the read endpoints as sync views behind Django's WSGI "
+        "handler (one worker with --threads threads, like gunicorn gthread) and as async "
+        "views behind its ASGI handler (one event loop, like a single uvicorn worker), with "
+        "--concurrency requests in flight. The handlers are driven in-process, so server "
+        "and network overhead are excluded. Creates its data in the configured database and "
+        "deletes it afterwards; the async side may open one connection per in-flight request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled.")
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.create_user(
+            username="bench-asgi", email="bench-asgi@example.com", password=None
+        )
+        try:
+            populate(user, options["recipes"])
+            token = str(AccessToken.for_user(user))
+            paths = read_paths(user)
+            overrides = {"ALLOWED_HOSTS": ["testserver"]}
+            if not options["cache"]:
+                overrides["RESPONSE_CACHE"] = {"ENABLED": False}
+            results = {}
+            with override_settings(**overrides):
+                with override_settings(ROOT_URLCONF="recipe_sharing.urls"):
+                    results["WSGI sync"] = run_load(
+                        wsgi_client(token, options["threads"]), paths, options["requests"], options["concurrency"]
+                    )
+                with override_settings(ROOT_URLCONF="recipe_sharing.asgi_urls"):
+                    results["ASGI async"] = run_load(
+                        asgi_client(token), paths, options["requests"], options["concurrency"]
+                    )
+            for name, result in results.items():
+                self.stdout.write(f"{name:<11} {summary(options['requests'], *result)}")
+        finally:
+            user.delete()
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from recipe_api.loadtest import asgi_client, populate, read_paths, run_load, summary, wsgi_client
+from users.models import CustomUser
+
+# Environment of each connection mode, read by the DATABASES settings.
+MODES = {
+    "fresh": {"DATABASE_POOL": "false", "DATABASE_CONN_MAX_AGE": "0"},
+    "persistent": {"DATABASE_POOL": "false", "DATABASE_CONN_MAX_AGE": "600"},
+    "pool": {"DATABASE_POOL": "true"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second on the read endpoints with a new database connection "
+        "per request, persistent connections and the psycopg pool, under concurrent load "
+        "(see recipe_api.loadtest). Each mode runs in a child process configured through "
+        "the DATABASE_* environment variables. Creates its data in the configured database "
+        "and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+        parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--user", type=int, help="Run one mode for this benchmark user (internal).")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            self.run_mode(CustomUser.objects.get(pk=options["user"]), options)
+            return
+        user = CustomUser.objects.create_user(
+            username="bench-db-pool", email="bench-db-pool@example.com", password=None
+        )
+        try:
+            populate(user, options["recipes"])
+            for mode in options["modes"]:
+                command = [
+                    sys.executable, "-m", "django", "bench_db_pool", "--user", str(user.pk),
+                    "--server", options["server"], "--requests", str(options["requests"]),
+                    "--concurrency", str(options["concurrency"]), "--threads", str(options["threads"]),
+                ]
+                env = {**os.environ, **MODES[mode]}
+                result = subprocess.run(command, env=env, capture_output=True, text=True)
+                output = result.stdout.strip() or result.stderr.strip().splitlines()[-1]
+                self.stdout.write(f"{mode:<11} {output}")
+        finally:
+            user.delete()
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def run_mode(self, user, options):
+        token = str(AccessToken.for_user(user))
+        if options["server"] == "asgi":
+            client, urlconf = asgi_client(token), "recipe_sharing.asgi_urls"
+        else:
+            client, urlconf = wsgi_client(token, options["threads"]), "recipe_sharing.urls"
+        # Measure the database, not the response cache.
+        with override_settings(ALLOWED_HOSTS=["testserver"], RESPONSE_CACHE={"ENABLED": False}, ROOT_URLCONF=urlconf):
+            paths = read_paths(user)
+            result = run_load(client, paths, options["requests"], options["concurrency"])
+        database = settings.DATABASES["default"]
+        pool = database.get("OPTIONS", {}).get("pool")
+        config = f"pool {pool['min_size']}-{pool['max_size']}" if pool else f"CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}"
+        self.stdout.write(f"{summary(options['requests'], *result)}  ({config})")
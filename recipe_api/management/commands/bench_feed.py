@@ -0,0 +1,90 @@
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe_api.feed import read_feed
+from recipe_api.models import Follow, Recipe
+from users.models import CustomUser
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a skewed (Zipf) follower graph and compare publish and feed read "
+        "latency against a pull query. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--follows-per-user", type=int, default=50)
+        parser.add_argument("--recipes", type=int, default=2000)
+        parser.add_argument("--reads", type=int, default=500)
+        parser.add_argument("--zipf", type=float, default=1.1, help="Skew of author popularity.")
+        parser.add_argument("--page-size", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        with transaction.atomic():
+            users = self.create_graph(rng, options)
+            weights = [1 / (rank + 1) ** options["zipf"] for rank in range(len(users))]
+
+            publish = []
+            for i in range(options["recipes"]):
+                author = rng.choices(users, weights)[0]
+                start = time.perf_counter()
+                Recipe.objects.create(
+                    user_id=author, title=f"Bench {i}", description="", ingredients="salt",
+                    instructions="Cook", prep_time=5, servings=1, meal_type="dinner",
+                )
+                publish.append(time.perf_counter() - start)
+
+            materialized, pull = [], []
+            for reader in rng.sample(users, min(options["reads"], len(users))):
+                user = CustomUser(pk=reader)
+                start = time.perf_counter()
+                read_feed(user, options["page_size"])
+                materialized.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                following = Follow.objects.filter(follower_id=reader).values("following_id")
+                list(Recipe.objects.for_list().filter(user_id__in=following, is_public=True)
+                     .order_by("-created_at", "-id")[:options["page_size"]])
+                pull.append(time.perf_counter() - start)
+
+            for label, timings in (("publish", publish), ("feed read", materialized), ("pull read", pull)):
+                self.stdout.write(
+                    f"{label:>10}: p50 {percentile(timings, 0.5):8.2f} ms  p99 {percentile(timings, 0.99):8.2f} ms"
+                )
+            transaction.set_rollback(True)
+
+    def create_graph(self, rng, options):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f"bench-feed-{i}", email=f"bench-feed-{i}@example.com")
+            for i in range(options["users"])
+        ])
+        users = list(
+            CustomUser.objects.filter(username__startswith="bench-feed-").order_by("pk").values_list("pk", flat=True)
+        )
+        weights = [1 / (rank + 1) ** options["zipf"] for rank in range(len(users))]
+        follows = set()
+        for follower in users:
+            for following in rng.choices(users, weights, k=options["follows_per_user"]):
+                if following != follower:
+                    follows.add((follower, following))
+        Follow.objects.bulk_create(
+            [Follow(follower_id=a, following_id=b) for a, b in follows], batch_size=5000
+        )
+        counts = Counter(following for _, following in follows)
+        CustomUser.objects.bulk_update(
+            [CustomUser(pk=pk, follower_count=count) for pk, count in counts.items()],
+            ["follower_count"], batch_size=1000,
+        )
+        self.stdout.write(f"{len(follows)} follows, most followed author has {counts.most_common(1)[0][1]} followers")
+        return users
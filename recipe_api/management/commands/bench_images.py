@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from recipe_api.images import image_setting
+from recipe_api.thumbnails import render_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure image pipeline throughput: the images in dummy_profile_pics are scaled up "
+        "to camera size and copied (each copy slightly different) until --images are "
+        "available, then rendered serially and in process pools. Nothing is stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=2000)
+        parser.add_argument("--size", type=int, nargs=2, default=[3000, 2000], metavar=("WIDTH", "HEIGHT"))
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+        parser.add_argument("--source-dir", default=os.path.join(settings.BASE_DIR, "dummy_profile_pics"))
+
+    def handle(self, *args, **options):
+        uploads = self.build_uploads(options["source_dir"], options["images"], tuple(options["size"]))
+        render_args = (
+            tuple(image_setting("WIDTHS")), image_setting("MAX_DIMENSION"),
+            image_setting("FORMAT"), image_setting("QUALITY"),
+        )
+        megabytes = sum(len(data) for data in uploads) / 1e6
+        self.stdout.write(f"{len(uploads)} uploads, {megabytes:.1f} MB")
+
+        sample = uploads[:max(1, len(uploads) // 20)]
+        start = time.perf_counter()
+        for data in sample:
+            render_variants(data, *render_args)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"in-process   {len(sample) / elapsed:8.1f} images/s (sample of {len(sample)})")
+
+        for workers in options["workers"]:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                start = time.perf_counter()
+                output = sum(
+                    len(content)
+                    for _, variants in executor.map(render_variants, uploads, *[[arg] * len(uploads) for arg in render_args], chunksize=8)
+                    for content in variants.values()
+                )
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{workers:>3} workers  {len(uploads) / elapsed:8.1f} images/s  "
+                f"{output / 1e6:.1f} MB written"
+            )
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def build_uploads(self, source_dir, total, size):
+        sources = []
+        for name in sorted(os.listdir(source_dir)):
+            with Image.open(os.path.join(source_dir, name)) as image:
+                sources.append(image.convert("RGB").resize(size))
+        uploads = []
+        for i in range(total):
+            image = sources[i % len(sources)].copy()
+            image.putpixel((i % size[0], 0), (i % 256, 0, 0))
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=90)
+            uploads.append(buffer.getvalue())
+        return uploads
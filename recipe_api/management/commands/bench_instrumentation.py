@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from recipe_api.loadtest import percentile, populate, read_paths, run_load, wsgi_client
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency InstrumentationMiddleware adds to the read endpoints: runs "
+        "alternating rounds with instrumentation off and on (Server-Timing included) and "
+        "fails if the mean difference per request exceeds --budget microseconds. Creates "
+        "its data in the configured database and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=4000, help="Requests per mode.")
+        parser.add_argument("--rounds", type=int, default=40)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--budget", type=float, default=250, help="Allowed overhead in microseconds.")
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.create_user(
+            username="bench-instrumentation", email="bench-instrumentation@example.com", password=None
+        )
+        modes = {
+            "off": {"ENABLED": False},
+            "on": {"ENABLED": True, "SERVER_TIMING": True, "SLOW_SAMPLE_RATE": 0},
+        }
+        timings = {mode: [] for mode in modes}
+        try:
+            populate(user, options["recipes"])
+            client = wsgi_client(str(AccessToken.for_user(user)), threads=max(1, options["concurrency"]))
+            per_round = max(1, options["requests"] // options["rounds"])
+            with override_settings(ALLOWED_HOSTS=["testserver"], RESPONSE_CACHE={"ENABLED": False}):
+                paths = read_paths(user)
+                # Alternate the modes so drift (warm-up, other load) hits both alike.
+                for _ in range(options["rounds"]):
+                    for mode, overrides in modes.items():
+                        with override_settings(INSTRUMENTATION=overrides):
+                            timings[mode] += run_load(client, paths, per_round, options["concurrency"])[1]
+        finally:
+            user.delete()
+
+        mean = {mode: sum(values) / len(values) * 1_000_000 for mode, values in timings.items()}
+        for mode, values in timings.items():
+            self.stdout.write(
+                f"{mode:<4} mean {mean[mode]:9.1f} us  p50 {percentile(values, 0.5):8.2f} ms  "
+                f"p99 {percentile(values, 0.99):8.2f} ms"
+            )
+        overhead = mean["on"] - mean["off"]
+        self.stdout.write(
+            f"overhead {overhead:.1f} us per request ({overhead / mean['off']:.1%}), budget {options['budget']:.0f} us"
+        )
+        if overhead > options["budget"]:
+            raise CommandError("Instrumentation overhead is over budget.")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+
+from recipe_api.models import Recipe
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare OFFSET (page number) and keyset pagination latency on the public "
+        "recipe list at shallow and deep pages. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", nargs="+", type=int, default=[1, 100, 1_000, 10_000])
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with transaction.atomic():
+            self.populate(max(options["pages"]) * page_size)
+            queryset = Recipe.objects.public().only("id", "created_at", "title").order_by("-created_at", "-id")
+            # The cursor a client would hold after reading the previous page.
+            self.cursors = {
+                page: queryset.values_list("created_at", "id")[(page - 1) * page_size - 1]
+                for page in options["pages"] if page > 1
+            }
+            for page in options["pages"]:
+                offset = self.best_of(options["repeat"], lambda: list(Paginator(queryset, page_size).page(page)))
+                keyset = self.best_of(options["repeat"], lambda: list(self.keyset_page(queryset, page, page_size)))
+                self.stdout.write(
+                    f"page {page:>6}  offset+count: {offset * 1000:8.2f} ms  keyset: {keyset * 1000:8.2f} ms"
+                )
+            transaction.set_rollback(True)
+
+    def keyset_page(self, queryset, page, page_size):
+        if page == 1:
+            return queryset[:page_size]
+        created_at, pk = self.cursors[page]
+        return queryset.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        )[:page_size]
+
+    def best_of(self, repeat, func):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def populate(self, total):
+        user = CustomUser.objects.create_user(
+            username="bench-pagination", email="bench-pagination@example.com", password=None
+        )
+        for start in range(0, total, 5000):
+            Recipe.objects.bulk_create([
+                Recipe(
+                    user=user, title=f"Recipe {i}", description="", ingredients="salt",
+                    instructions="Cook", prep_time=5, servings=1, meal_type="dinner",
+                )
+                for i in range(start, min(total, start + 5000))
+            ])
@@ -0,0 +1,86 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from recipe_api.models import Recipe
+from recipe_api.search import get_search_backend
+from users.models import CustomUser
+
+WORDS = (
+    "chicken beef tofu salmon rice pasta noodle garlic onion tomato basil "
+    "spinach feta egg butter lemon ginger chili curry coconut mushroom "
+    "potato carrot pepper honey oat yogurt almond vanilla chocolate"
+).split()
+QUERIES = ["chicken", "garlic tomato", "coconut curry", "choc", "lemon ging"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search latency of the icontains scan with the search index. "
+        "Synthetic recipes are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        for size in options["sizes"]:
+            with transaction.atomic():
+                self.populate(size, rng)
+                get_search_backend().rebuild()
+                scan = self.time_queries(self.scan, options)
+                indexed = self.time_queries(self.indexed, options)
+                self.stdout.write(
+                    f"{size:>9} recipes  icontains: {scan * 1000:8.2f} ms  index: {indexed * 1000:8.2f} ms"
+                )
+                transaction.set_rollback(True)
+            get_search_backend().reset()
+
+    def populate(self, size, rng):
+        user = CustomUser.objects.create_user(
+            username="bench-search", email="bench-search@example.com", password=None
+        )
+        batch = []
+        for i in range(size):
+            batch.append(Recipe(
+                user=user,
+                title=" ".join(rng.sample(WORDS, 3)),
+                description=" ".join(rng.choices(WORDS, k=20)),
+                ingredients="\n".join(rng.sample(WORDS, 8)),
+                instructions="Cook it.",
+                prep_time=10,
+                servings=2,
+                meal_type="dinner",
+            ))
+            if len(batch) == 5000:
+                Recipe.objects.bulk_create(batch)
+                batch = []
+        Recipe.objects.bulk_create(batch)
+
+    def scan(self, query, page_size):
+        recipes = Recipe.objects.filter(
+            title__icontains=query, is_public=True
+        ) | Recipe.objects.filter(
+            description__icontains=query, is_public=True
+        )
+        return list(Paginator(recipes.order_by("-id"), page_size).page(1))
+
+    def indexed(self, query, page_size):
+        page = Paginator(get_search_backend().search(query), page_size).page(1)
+        return list(Recipe.objects.in_bulk(list(page)).values())
+
+    def time_queries(self, func, options):
+        timings = []
+        for _ in range(options["repeat"]):
+            for query in QUERIES:
+                start = time.perf_counter()
+                func(query, options["page_size"])
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        return timings[len(timings) // 2]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = "Precompute the nearest neighbours served by /recipes/<pk>/similar/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every recipe instead of the changed ones.")
+        parser.add_argument("--k", type=int, default=None, help="Neighbours kept per recipe.")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        job = build_similar_recipes(full=options["full"], k=options["k"], chunk_size=options["chunk_size"])
+        kind = "Full" if job.full else "Incremental"
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind} run updated similar recipes of {job.recipes_updated} recipes in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.recommendations import evaluate, load_interactions, synthetic_interactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold out part of each user's favorites and ratings, train on the rest and report "
+        "precision@k against the popularity fallback and training time for growing samples of users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of each user's entries held out.")
+        parser.add_argument("--sizes", type=float, nargs="+", default=[0.25, 0.5, 1.0], help="Fractions of users.")
+        parser.add_argument("--factors", type=int, default=None)
+        parser.add_argument("--iterations", type=int, default=None)
+        parser.add_argument(
+            "--synthetic-users", type=int, default=0,
+            help="Evaluate on generated taste groups instead of the database.",
+        )
+        parser.add_argument("--recipes", type=int, default=5000, help="Recipes in the synthetic catalogue.")
+        parser.add_argument("--per-user", type=int, default=20, help="Favorites per synthetic user.")
+
+    def handle(self, *args, **options):
+        if options["synthetic_users"]:
+            interactions = synthetic_interactions(options["synthetic_users"], options["recipes"], options["per_user"])
+        else:
+            interactions = load_interactions()
+        k = options["k"]
+        self.stdout.write(f"{'users':>8} {'recipes':>8} {'entries':>9} {'train s':>8} {f'P@{k}':>7} {'popular':>8}")
+        for size in options["sizes"]:
+            sample = interactions.sample_users(size) if size < 1 else interactions
+            result = evaluate(
+                sample, k=k, fraction=options["holdout"], factors=options["factors"], iterations=options["iterations"]
+            )
+            self.stdout.write(
+                f"{result['users']:>8} {result['recipes']:>8} {result['interactions']:>9} "
+                f"{result['train_seconds']:>8.2f} {result['precision']:>7.3f} {result['popularity_precision']:>8.3f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Done"))
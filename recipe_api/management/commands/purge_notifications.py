@@ -0,0 +1,41 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipe_api.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications older than the retention period in batches, optionally archiving them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--archive", metavar="PATH", help="Append purged rows to this JSON Lines file.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by("pk")
+        archive = open(options["archive"], "a") if options["archive"] else None
+        total = 0
+        try:
+            while True:
+                with transaction.atomic():
+                    batch = list(expired.values(
+                        "id", "recipient_id", "sender_id", "notification_type", "recipe_id",
+                        "message", "actor_count", "created_at",
+                    )[:options["batch_size"]])
+                    if not batch:
+                        break
+                    if archive:
+                        for row in batch:
+                            archive.write(json.dumps(row, default=str) + "\n")
+                    Notification.objects.filter(pk__in=[row["id"] for row in batch]).delete()
+                total += len(batch)
+        finally:
+            if archive:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(f"Purged {total} notifications"))
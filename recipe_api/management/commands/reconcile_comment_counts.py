@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.comments import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute Recipe.comment_count from the Comment table."
+
+    def handle(self, *args, **options):
+        total = reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled comment counts for {total} recipes"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe_api.feed import follow_added, reconcile_follower_counts
+from recipe_api.models import Follow
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute CustomUser.follower_count from the Follow table. With --backfill-feeds, "
+        "also seed the home feed of every existing follow, as a new follow would."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--backfill-feeds", action="store_true")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(
+                CustomUser.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                total += reconcile_follower_counts(CustomUser.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+            last_pk = pks[-1]
+        self.stdout.write(self.style.SUCCESS(f"Reconciled follower counts for {total} users"))
+
+        if not options["backfill_feeds"]:
+            return
+        # Counts first: follow_added only seeds feeds of authors that are fanned out.
+        last_pk = 0
+        seeded = 0
+        while True:
+            follows = list(
+                Follow.objects.filter(pk__gt=last_pk).order_by("pk")
+                .values_list("pk", "follower_id", "following_id")[:chunk_size]
+            )
+            if not follows:
+                break
+            for _, follower_id, author_id in follows:
+                follow_added(follower_id, author_id)
+            seeded += len(follows)
+            last_pk = follows[-1][0]
+        self.stdout.write(self.style.SUCCESS(f"Backfilled home feeds for {seeded} follows"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe_api.models import Recipe
+from recipe_api.ratings import reconcile_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute Recipe rating_count, rating_sum and rating_score from the Rating table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(
+                Recipe.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                total += reconcile_rating_aggregates(Recipe.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+            last_pk = pks[-1]
+        self.stdout.write(self.style.SUCCESS(f"Reconciled rating aggregates for {total} recipes"))
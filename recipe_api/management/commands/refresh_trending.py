@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Materialize the trending recipes from the decayed hourly activity counters."
+
+    def handle(self, *args, **options):
+        count = refresh_trending()
+        self.stdout.write(self.style.SUCCESS(f"Trending list rebuilt with {count} recipes"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.notifications import NotificationWorker, get_queue
+
+
+class Command(BaseCommand):
+    help = "Drain queued interaction events into coalesced notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process pending events and exit.")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        worker = NotificationWorker(get_queue(), batch_size=options["batch_size"])
+        if options["once"]:
+            processed = worker.run_until_empty()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} events"))
+            return
+        self.stdout.write("Notification worker started")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stopped.set()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipe_api.recommendations import train_recommendations
+
+
+class Command(BaseCommand):
+    help = "Fit the collaborative filtering model and rewrite the candidates served by /recipes/for_you/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--factors", type=int, default=None)
+        parser.add_argument("--iterations", type=int, default=None)
+        parser.add_argument("--candidates", type=int, default=None, help="Recipes stored per user.")
+
+    def handle(self, *args, **options):
+        stats = train_recommendations(
+            candidates=options["candidates"], factors=options["factors"], iterations=options["iterations"]
+        )
+        self.stdout.write(
+            f"{stats['interactions']} interactions from {stats['users']} users on {stats['recipes']} recipes, "
+            f"trained in {stats['train_seconds']:.1f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recommendations written in {stats['total_seconds']:.1f}s"))
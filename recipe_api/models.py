@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
+from recipe_sharing.db.models import DenormalizedFieldsMixin
 from users.models import CustomUser as User
 
 
@@ -15,7 +19,36 @@ class DietaryPreference(models.Model):
     def __str__(self):
         return self.name
 
-class Recipe(models.Model):
+def default_rating_score():
+    # Bayesian score of a recipe without ratings is the prior mean.
+    return float(getattr(settings, 'RATING_PRIOR_MEAN', 3.0))
+
+class RecipeQuerySet(models.QuerySet):
+    # Columns rendered by RecipeSerializer; list views defer everything else.
+    LIST_FIELDS = (
+        'id', 'title', 'description', 'ingredients', 'instructions',
+        'prep_time', 'cook_time', 'servings', 'created_at', 'updated_at',
+        'photo', 'photo_variants', 'meal_type', 'is_public', 'rating_count', 'rating_sum', 'rating_score',
+        'comment_count',
+    )
+
+    def public(self):
+        return self.filter(is_public=True)
+
+    def visible_to(self, user):
+        """Public recipes and, for a signed-in user, their own."""
+        if not user.is_authenticated:
+            return self.public()
+        return self.filter(models.Q(is_public=True) | models.Q(user=user))
+
+    def with_relations(self):
+        """Prefetch the many-to-many fields serialized with every recipe."""
+        return self.prefetch_related('cuisine_types', 'dietary_preferences')
+
+    def for_list(self):
+        return self.with_relations().only(*self.LIST_FIELDS)
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     MEAL_TYPES = (
         ('breakfast', 'Breakfast'),
         ('lunch', 'Lunch'),
@@ -35,14 +68,80 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     photo = models.ImageField(upload_to='recipe_photos/', blank=True, null=True)
+    # Written by recipe_api.images once the uploaded photo has been processed.
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     meal_type = models.CharField(max_length=20, choices=MEAL_TYPES)
     cuisine_types = models.ManyToManyField(CuisineType, blank=True)
     dietary_preferences = models.ManyToManyField(DietaryPreference, blank=True)
     is_public = models.BooleanField(default=True)
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained by recipe_api.ratings; see reconcile_ratings to rebuild.
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_score = models.FloatField(default=default_rating_score, editable=False)
+    # Maintained by recipe_api.comments.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    objects = RecipeQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_public=True), name='recipe_public_recent'),
+            models.Index(fields=['user', '-created_at', '-id'], name='recipe_user_recent'),
+            models.Index(fields=['-rating_score', '-id'], name='recipe_top_rated'),
+            # Faceted list filters (see recipe_api.facets) on public recipes.
+            models.Index(
+                fields=['meal_type', '-created_at', '-id'], condition=models.Q(is_public=True),
+                name='recipe_public_meal_recent',
+            ),
+            models.Index(
+                fields=['meal_type', '-rating_score', '-id'], condition=models.Q(is_public=True),
+                name='recipe_public_meal_top_rated',
+            ),
+            models.Index(fields=['prep_time'], condition=models.Q(is_public=True), name='recipe_public_prep_time'),
+            models.Index(fields=['cook_time'], condition=models.Q(is_public=True), name='recipe_public_cook_time'),
+        ]
+    
+    # Columns maintained with UPDATE statements elsewhere; see DenormalizedFieldsMixin.
+    DENORMALIZED_FIELDS = (
+        'ingredient_count', 'rating_count', 'rating_sum', 'rating_score', 'photo_variants', 'comment_count',
+    )
+    CHANGED_FIELDS = ('photo',)
+    # The columns recipe_api.facets counts by; their changes discard the cached counts.
+    TRACKED_FIELDS = ('meal_type', 'prep_time', 'cook_time', 'is_public')
     
     def __str__(self):
         return self.title
 
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+class Ingredient(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    
+    def __str__(self):
+        return self.name
+
+class RecipeIngredient(models.Model):
+    """One parsed line of ``Recipe.ingredients``."""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='recipe_ingredients')
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True)
+    unit = models.CharField(max_length=20, blank=True)
+    raw_text = models.CharField(max_length=255)
+    position = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('recipe', 'ingredient')
+        indexes = [models.Index(fields=['ingredient', 'recipe'], name='recipe_ingredient_lookup')]
+        ordering = ['position']
+    
+    def __str__(self):
+        return f"{self.raw_text} ({self.recipe_id})"
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     recipes = models.ManyToManyField(Recipe, related_name='tags')
@@ -50,6 +149,25 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+class RecipeSearchDocument(models.Model):
+    """
+    Weighted tsvector of a public recipe, only created on PostgreSQL.
+    Rows are removed by the search signal handlers rather than by cascade so
+    deleting a recipe on other databases never touches this table.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='search_document'
+    )
+    vector = SearchVectorField()
+
+    class Meta:
+        required_db_vendor = 'postgresql'
+        indexes = [GinIndex(fields=['vector'], name='recipe_search_vector_gin')]
+
+    def __str__(self):
+        return f"Search document for recipe {self.recipe_id}"
+
 class FavoriteRecipe(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='favorited_by')
@@ -74,6 +192,13 @@ class Rating(models.Model):
     def __str__(self):
         return f"{self.user.username}'s rating for {self.recipe.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored score so updates can adjust Recipe aggregates by the difference.
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='comments')
@@ -81,6 +206,9 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['recipe', '-created_at', '-id'], name='comment_recipe_recent')]
+    
     def __str__(self):
         return f"Comment by {self.user.username} on {self.recipe.title}"
 
@@ -95,6 +223,24 @@ class Follow(models.Model):
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
 
+class FeedEntry(models.Model):
+    """A recipe materialized into the home feed of one of its author's followers."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # Copy of recipe.created_at so the timeline is read from this table alone.
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('owner', 'recipe')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-recipe'], name='feed_owner_timeline'),
+            models.Index(fields=['owner', 'author'], name='feed_owner_author'),
+        ]
+    
+    def __str__(self):
+        return f"Recipe {self.recipe_id} in {self.owner_id}'s feed"
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
         ('like', 'Like'),
@@ -110,10 +256,30 @@ class Notification(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # Number of distinct senders coalesced into this notification, and their ids.
+    actor_count = models.PositiveIntegerField(default=1)
+    sender_ids = models.JSONField(default=list, editable=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recipient_recent'),
+            models.Index(fields=['recipient', 'is_read', '-created_at', '-id'], name='notification_unread'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} notification for {self.recipient.username}"
 
+class NotificationEvent(models.Model):
+    """Outbox row for an interaction that still has to become a Notification."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Pending {self.notification_type} for {self.recipient_id}"
+
 class RecipeShare(models.Model):
     SHARE_TYPES = (
         ('email', 'Email'),
@@ -130,3 +296,69 @@ class RecipeShare(models.Model):
     def __str__(self):
         return f"{self.user.username} shared {self.recipe.title}"
 
+class SimilarRecipe(models.Model):
+    """One of the precomputed nearest neighbours of a recipe, see recipe_api.similarity."""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_recipes')
+    similar = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        unique_together = ('recipe', 'similar')
+        indexes = [models.Index(fields=['recipe', 'rank'], name='similar_recipe_lookup')]
+    
+    def __str__(self):
+        return f"Recipe {self.similar_id} similar to {self.recipe_id} (#{self.rank})"
+
+class SimilarityJob(models.Model):
+    """A run of build_similar_recipes; the last finished run is the watermark of the next one."""
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False)
+    recipes_updated = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Similarity {'full' if self.full else 'incremental'} run at {self.started_at}"
+
+class RecommendedRecipe(models.Model):
+    """
+    A "for you" candidate written by recipe_api.recommendations. Rows
+    without a user rank the popular recipes served to cold-start users.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='recommendations')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recommended_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        unique_together = ('user', 'recipe')
+        indexes = [models.Index(fields=['user', 'rank'], name='recommended_recipe_lookup')]
+    
+    def __str__(self):
+        return f"Recipe {self.recipe_id} for {self.user_id or 'everyone'} (#{self.rank})"
+
+class RecipeActivityBucket(models.Model):
+    """Weighted interactions with a recipe during one hour, see recipe_api.trending."""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    hour = models.DateTimeField()
+    points = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('recipe', 'hour')
+        indexes = [models.Index(fields=['hour'], name='recipe_activity_hour')]
+    
+    def __str__(self):
+        return f"{self.points} points for recipe {self.recipe_id} at {self.hour}"
+
+class TrendingRecipe(models.Model):
+    """A row of the materialized trending list, rebuilt by ``manage.py refresh_trending``."""
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField()
+    rank = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [models.Index(fields=['rank'], name='trending_rank')]
+    
+    def __str__(self):
+        return f"#{self.rank} trending: recipe {self.recipe_id}"
@@ -0,0 +1,335 @@
+"""
+Asynchronous notification pipeline.
+
+Views call ``notify()`` which only enqueues a lightweight event. A worker
+drains the queue in batches, coalesces events for the same recipient,
+type and recipe ("12 people liked your recipe") and writes them with a
+single ``bulk_create``/``bulk_update``.
+
+Two queues are provided, selected with ``NOTIFICATIONS['QUEUE']``:
+
+* ``OutboxQueue`` stores events in the ``NotificationEvent`` table in the
+  same transaction as the interaction and is drained by the
+  ``run_notification_worker`` management command.
+* ``LocalQueue`` keeps events in process memory and drains them from a
+  daemon thread; with ``autostart=False`` it is the stand-in used in tests,
+  which call ``drain()`` directly.
+
+The unread count of each user is cached and adjusted on insert and on
+mark-read, so the badge endpoint does not touch the notifications table
+on a cache hit. Changes that cannot be applied to a cached value (no
+counter yet, mark all read) move the counter to a new generation instead,
+so a COUNT racing them cannot store a stale result.
+"""
+import logging
+import queue
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, NotificationEvent, Recipe
+from users.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# ``id`` is the outbox row of the event, if any.
+Event = namedtuple(
+    'Event', ['recipient_id', 'sender_id', 'notification_type', 'recipe_id', 'created_at', 'id'], defaults=[None]
+)
+
+DEFAULTS = {
+    'QUEUE': 'recipe_api.notifications.OutboxQueue',
+    'QUEUE_OPTIONS': {},
+    'BATCH_SIZE': 500,
+    # Unread notifications younger than this absorb new events of the same kind.
+    'COALESCE_WINDOW': timedelta(hours=1),
+    # Bounds drift of the cached unread counters (cascade deletes, a COUNT
+    # racing an increment); a recount is one indexed query.
+    'UNREAD_COUNT_TIMEOUT': 60 * 5,
+}
+
+MESSAGES = {
+    'like': ('{sender} liked your recipe "{recipe}"', '{count} people liked your recipe "{recipe}"'),
+    'comment': ('{sender} commented on your recipe "{recipe}"', '{count} people commented on your recipe "{recipe}"'),
+    'follow': ('{sender} started following you', '{count} people started following you'),
+    'recipe_update': ('{sender} updated "{recipe}"', '{sender} updated "{recipe}"'),
+}
+
+
+def notification_setting(name):
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, DEFAULTS[name])
+
+
+def format_message(notification_type, count, sender, recipe):
+    single, many = MESSAGES[notification_type]
+    return (single if count == 1 else many).format(count=count, sender=sender, recipe=recipe)
+
+
+class LocalQueue:
+    """In-process queue drained by a daemon thread, or by ``drain()`` when ``autostart`` is off."""
+
+    def __init__(self, autostart=True, poll_interval=1.0):
+        self.autostart = autostart
+        self.poll_interval = poll_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        transaction.on_commit(lambda: self._put(event))
+
+    def _put(self, event):
+        self._queue.put(event)
+        if self.autostart and self._thread is None:
+            self.start()
+
+    def get_batch(self, size):
+        batch = []
+        while len(batch) < size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def ack(self, batch):
+        pass
+
+    def drain(self):
+        """Process everything queued so far in the calling thread."""
+        return NotificationWorker(self).run_until_empty()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            worker = NotificationWorker(self)
+            self._thread = threading.Thread(target=worker.run_forever, name='notification-worker', daemon=True)
+            self._thread.start()
+
+
+class OutboxQueue:
+    """Events stored in ``NotificationEvent`` rows, written in the caller's transaction."""
+
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+
+    def put(self, event):
+        NotificationEvent.objects.create(**event._asdict())
+
+    def get_batch(self, size):
+        rows = NotificationEvent.objects.order_by('pk')
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            rows = rows.select_for_update(skip_locked=True)
+        return [
+            Event(row.recipient_id, row.sender_id, row.notification_type, row.recipe_id, row.created_at, row.pk)
+            for row in rows[:size]
+        ]
+
+    def ack(self, batch):
+        NotificationEvent.objects.filter(pk__in=[event.id for event in batch]).delete()
+
+    def drain(self):
+        return NotificationWorker(self).run_until_empty()
+
+
+class NotificationWorker:
+    def __init__(self, event_queue, batch_size=None):
+        self.queue = event_queue
+        self.batch_size = batch_size or notification_setting('BATCH_SIZE')
+        self.stopped = threading.Event()
+
+    def run_once(self):
+        """Process one batch. Returns the number of events consumed."""
+        with transaction.atomic():
+            batch = self.queue.get_batch(self.batch_size)
+            if not batch:
+                return 0
+            write_notifications(batch)
+            self.queue.ack(batch)
+        return len(batch)
+
+    def run_until_empty(self):
+        total = 0
+        while True:
+            processed = self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Notification batch failed")
+                processed = 0
+            finally:
+                close_old_connections()
+            if processed < self.batch_size:
+                # Let the next burst accumulate so it is written (and coalesced) as one batch.
+                self.stopped.wait(self.queue.poll_interval)
+
+
+def coalesce(events):
+    """Group events by (recipient, type, recipe), keeping the distinct senders in order."""
+    groups = OrderedDict()
+    for event in events:
+        if event.recipient_id == event.sender_id:
+            continue
+        key = (event.recipient_id, event.notification_type, event.recipe_id)
+        senders = groups.setdefault(key, OrderedDict())
+        senders.setdefault(event.sender_id, event.created_at)
+    return groups
+
+
+def write_notifications(events):
+    """Turn a batch of events into as few Notification rows as possible."""
+    groups = coalesce(events)
+    if not groups:
+        return [], []
+    cutoff = timezone.now() - notification_setting('COALESCE_WINDOW')
+    existing = {}
+    recent = Notification.objects.filter(
+        recipient_id__in={recipient_id for recipient_id, _, _ in groups},
+        notification_type__in={notification_type for _, notification_type, _ in groups},
+        is_read=False,
+        created_at__gte=cutoff,
+    ).order_by('created_at')
+    for notification in recent:
+        existing[(notification.recipient_id, notification.notification_type, notification.recipe_id)] = notification
+
+    usernames = dict(CustomUser.objects.filter(
+        pk__in={sender_id for senders in groups.values() for sender_id in senders}
+    ).values_list('pk', 'username'))
+    titles = dict(Recipe.objects.filter(
+        pk__in={recipe_id for _, _, recipe_id in groups if recipe_id}
+    ).values_list('pk', 'title'))
+
+    created, updated = [], []
+    for (recipient_id, notification_type, recipe_id), senders in groups.items():
+        last_sender = next(reversed(senders))
+        notification = existing.get((recipient_id, notification_type, recipe_id))
+        if notification is not None:
+            # Rows written before sender_ids existed only know their last sender.
+            known = set(notification.sender_ids) or {notification.sender_id}
+            new_senders = [sender_id for sender_id in senders if sender_id not in known]
+            notification.actor_count += len(new_senders)
+            notification.sender_ids = [*known, *new_senders]
+            notification.sender_id = last_sender
+            # created_at stays: the inbox pages by (created_at, id) and mark_read(up_to_id)
+            # relies on that order following the ids.
+            updated.append(notification)
+        else:
+            notification = Notification(
+                recipient_id=recipient_id,
+                sender_id=last_sender,
+                notification_type=notification_type,
+                recipe_id=recipe_id,
+                actor_count=len(senders),
+                sender_ids=list(senders),
+            )
+            created.append(notification)
+        notification.message = format_message(
+            notification_type, notification.actor_count, usernames.get(last_sender, 'Someone'), titles.get(recipe_id, '')
+        )
+    Notification.objects.bulk_create(created)
+    Notification.objects.bulk_update(updated, ['actor_count', 'sender_ids', 'sender', 'message'])
+    new_unread = Counter(notification.recipient_id for notification in created)
+    transaction.on_commit(lambda: [adjust_unread_count(user_id, delta) for user_id, delta in new_unread.items()])
+    return created, updated
+
+
+def unread_count_key(user_id, generation):
+    return f'notifications:unread:{user_id}:g{generation}'
+
+
+def unread_generation_key(user_id):
+    return f'notifications:unread:{user_id}:generation'
+
+
+def unread_generation(user_id):
+    return cache.get(unread_generation_key(user_id), 0)
+
+
+def invalidate_unread_count(user_id):
+    """
+    Move the user's counter to a new generation. A COUNT that is still in
+    flight then stores its result under the old key, which nobody reads.
+    """
+    key = unread_generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def unread_count(user_id):
+    key = unread_count_key(user_id, unread_generation(user_id))
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.add(key, count, notification_setting('UNREAD_COUNT_TIMEOUT'))
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Atomically shift a cached counter. Without one, a COUNT may be running
+    that misses this change, so the generation moves on and the next read
+    counts again.
+    """
+    if not delta:
+        return
+    key = unread_count_key(user_id, unread_generation(user_id))
+    try:
+        if cache.incr(key, delta) < 0:
+            invalidate_unread_count(user_id)
+    except ValueError:
+        invalidate_unread_count(user_id)
+
+
+def mark_read(user_id, up_to_id=None):
+    """Mark all, or all up to ``up_to_id``, of a user's notifications read with one UPDATE."""
+    notifications = Notification.objects.filter(recipient_id=user_id, is_read=False)
+    if up_to_id is not None:
+        notifications = notifications.filter(pk__lte=up_to_id)
+    updated = notifications.update(is_read=True)
+    if up_to_id is None:
+        # Not 0: notifications created between the UPDATE and the commit are unread.
+        transaction.on_commit(lambda: invalidate_unread_count(user_id))
+    else:
+        transaction.on_commit(lambda: adjust_unread_count(user_id, -updated))
+    return updated
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = import_string(notification_setting('QUEUE'))(**notification_setting('QUEUE_OPTIONS'))
+    return _queue
+
+
+@receiver(setting_changed)
+def reset_queue(setting, **kwargs):
+    global _queue
+    if setting == 'NOTIFICATIONS':
+        _queue = None
+
+
+def notify(recipient_id, sender_id, notification_type, recipe_id=None):
+    if recipient_id == sender_id:
+        return
+    get_queue().put(Event(recipient_id, sender_id, notification_type, recipe_id, timezone.now()))
@@ -0,0 +1,198 @@
+import base64
+import json
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last item on a page into an opaque cursor."""
+    payload = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list):
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def decode_timestamp_cursor(cursor):
+    """Decode a ``(created_at, id)`` cursor produced by ``encode_cursor``."""
+    try:
+        created_at, pk = decode_cursor(cursor)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if created_at is None:
+        raise NotFound('Invalid cursor')
+    return created_at, pk
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from the PostgreSQL planner statistics, or an exact count
+    on databases that cannot explain in JSON.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    try:
+        plan = json.loads(queryset.explain(format='json'))
+    except (ValueError, TypeError):
+        return queryset.count()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the ordering of the queryset, e.g.
+    ``('-created_at', '-id')``. The ordering must end with a unique column.
+
+    Each page is fetched with ``WHERE (created_at, id) < (last seen values)``
+    so page 10,000 costs the same index range scan as page 1. No COUNT is
+    issued unless the client asks for ``?count=exact`` or ``?count=estimate``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.order(queryset, request)
+        self.count = self.get_count(queryset, request)
+        return self.page_results(list(self.seek(queryset, request)[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, using the async ORM."""
+        queryset = self.order(queryset, request)
+        self.count = await self.aget_count(queryset, request)
+        return self.page_results([item async for item in self.seek(queryset, request)[:self.page_size + 1]])
+
+    def order(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        ordering = [str(field) for field in queryset.query.order_by] or list(self.default_ordering)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        return queryset.order_by(*ordering)
+
+    def seek(self, queryset, request):
+        """Filter ``queryset`` to the rows after the cursor, reversed when paging backwards."""
+        reverse = False
+        # Sort key of the cursor, if any, for views that cache pages by key range.
+        self.cursor_key = None
+        self.has_cursor = False
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = decode_cursor(cursor)
+            if not values or values[0] not in (0, 1):
+                raise NotFound('Invalid cursor')
+            reverse, self.cursor_key = bool(values[0]), self.parse_values(queryset.model, values[1:])
+            queryset = queryset.filter(self.seek_filter(self.cursor_key, forward=not reverse))
+            self.has_cursor = True
+        self.reverse = reverse
+        return queryset.reverse() if reverse else queryset
+
+    def page_results(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.first_item = results[0] if results else None
+        self.last_item = results[-1] if results else None
+        return results
+
+    def parse_values(self, model, values):
+        if len(values) != len(self.fields):
+            raise NotFound('Invalid cursor')
+        try:
+            return [
+                model._meta.pk.to_python(value) if name == 'pk' else model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except ValidationError:
+            raise NotFound('Invalid cursor')
+
+    def seek_filter(self, values, forward):
+        condition = None
+        for i, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[i]})
+            for (previous_name, _), previous_value in zip(self.fields[:i], values[:i]):
+                clause &= Q(**{previous_name: previous_value})
+            condition = clause if condition is None else condition | clause
+        # Redundant range on the leading column so the index range scan is bounded.
+        name, descending = self.fields[0]
+        lookup = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.acount()
+        if mode == 'estimate':
+            return await sync_to_async(estimate_count)(queryset)
+        return None
+
+    def item_cursor(self, item, reverse):
+        values = [getattr(item, name) for name, _ in self.fields]
+        return encode_cursor(int(reverse), *values)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_item is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.item_cursor(self.last_item, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_item is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.item_cursor(self.first_item, True))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Only present with ?count=exact or ?count=estimate.'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,264 @@
+"""
+N+1 and duplicate-query detection.
+
+While a ``QueryRecorder`` is active, every query run on any connection
+is captured per request together with where it came from: the innermost
+frame in project code and, when the query runs while a serializer field
+is rendered, that field (``RecipeSerializer.cuisine_types``). Queries are
+grouped by fingerprint, their SQL with literals, placeholders and ``IN``
+lists normalized, so the same lookup for different rows falls into one
+group. A request has a problem when one fingerprint runs
+``REPEAT_THRESHOLD`` times or more (the classic N+1 of serializing a
+relation per row) or when it runs more than ``MAX_QUERIES`` queries.
+
+Two consumers:
+
+* the test suite: ``conftest.py`` records every request a test makes and
+  fails the test on a problem. ``@pytest.mark.query_check(...)``
+  overrides the thresholds of a test and ``--no-query-check`` turns the
+  check off. ``check_queries()`` does the same inside a block;
+* ``QueryCheckMiddleware``, on with ``DEBUG`` and ``QUERY_CHECK['PANEL']``,
+  logs problems and reports them in ``X-Query-*`` headers and, on HTML
+  pages such as the browsable API, in a panel at the bottom.
+"""
+import contextvars
+import html
+import logging
+import re
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPEAT_THRESHOLD': 3,
+    'MAX_QUERIES': 25,
+    'PANEL': False,
+}
+
+# Middleware and database plumbing that sits on every query's stack.
+IGNORED_MODULES = {
+    'recipe_api.querycheck', 'recipe_api.instrumentation', 'recipe_api.replicas', 'recipe_sharing.db.base',
+}
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|%\(\w+\)s|\?|\$\d+')
+IN_LIST = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+# Savepoint names are unique per use, and their statements are not N+1s.
+SAVEPOINT = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+
+
+def check_setting(name):
+    return getattr(settings, 'QUERY_CHECK', {}).get(name, DEFAULTS[name])
+
+
+def fingerprint(sql):
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = ' '.join(sql.split())
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def origin(frame):
+    """Where a query came from: the serializer field being rendered and the innermost project frame."""
+    root = f'{Path(settings.BASE_DIR)}/'
+    field = location = None
+    while frame is not None and not (field and location):
+        code = frame.f_code
+        if field is None and code.co_name in ('to_representation', 'get_attribute'):
+            owner = frame.f_locals.get('self')
+            if isinstance(owner, Field) and owner.parent is not None and owner.field_name:
+                field = f'{type(owner.parent).__name__}.{owner.field_name}'
+        if (
+            location is None and code.co_filename.startswith(root) and 'site-packages' not in code.co_filename
+            and frame.f_globals.get('__name__') not in IGNORED_MODULES
+        ):
+            location = f'{code.co_filename[len(root):]}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ' at '.join(part for part in (field, location) if part) or 'unknown'
+
+
+class CapturedQuery:
+    __slots__ = ('sql', 'params', 'origin')
+
+    def __init__(self, sql, params, origin):
+        self.sql = sql
+        self.params = params
+        self.origin = origin
+
+
+class RequestQueries:
+    """The queries of one request, labelled ``'GET /recipes/'``."""
+    def __init__(self, label):
+        self.label = label
+        self.queries = []
+
+    def repeated(self, threshold):
+        """``(fingerprint, queries)`` run ``threshold`` times or more, most frequent first."""
+        groups = defaultdict(list)
+        for query in self.queries:
+            if not SAVEPOINT.match(query.sql):
+                groups[fingerprint(query.sql)].append(query)
+        return sorted(
+            ((key, queries) for key, queries in groups.items() if len(queries) >= threshold),
+            key=lambda group: -len(group[1]),
+        )
+
+    def problems(self, max_queries=None, repeat_threshold=None):
+        max_queries = check_setting('MAX_QUERIES') if max_queries is None else max_queries
+        repeat_threshold = check_setting('REPEAT_THRESHOLD') if repeat_threshold is None else repeat_threshold
+        problems = []
+        if len(self.queries) > max_queries:
+            problems.append(f'{len(self.queries)} queries, more than {max_queries}')
+        for key, queries in self.repeated(repeat_threshold):
+            identical = len({(query.sql, repr(query.params)) for query in queries}) == 1
+            origins = sorted({query.origin for query in queries})
+            problems.append(
+                f'{len(queries)}x {"identical " if identical else ""}{key}\n'
+                + '\n'.join(f'    from {where}' for where in origins)
+            )
+        return problems
+
+    def report(self, problems):
+        return f'{self.label}: {len(self.queries)} queries\n' + '\n'.join(f'  {problem}' for problem in problems)
+
+
+class QueryRecorder:
+    """
+    Records queries run in this context while active, per request. With
+    ``follow_requests`` the requests are delimited by the request_started
+    and request_finished signals, as in tests; otherwise by ``start()``.
+    """
+    def __init__(self, follow_requests=True):
+        self.follow_requests = follow_requests
+        self.requests = []
+        self.current = None
+
+    def start(self, label):
+        self.current = RequestQueries(label)
+        self.requests.append(self.current)
+        return self.current
+
+    def stop(self):
+        self.current = None
+
+    def request_started(self, sender, environ=None, scope=None, **kwargs):
+        if environ is not None:
+            self.start(f"{environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')}")
+        else:
+            self.start(f"{(scope or {}).get('method')} {(scope or {}).get('path')}")
+
+    def request_finished(self, sender, **kwargs):
+        self.stop()
+
+    def __enter__(self):
+        for connection in connections.all():
+            install_execute_wrapper(None, connection)
+        self._token = _recorder.set(self)
+        if self.follow_requests:
+            request_started.connect(self.request_started)
+            request_finished.connect(self.request_finished)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.follow_requests:
+            request_started.disconnect(self.request_started)
+            request_finished.disconnect(self.request_finished)
+        _recorder.reset(self._token)
+
+    def problems(self, max_queries=None, repeat_threshold=None):
+        """One report per request with a problem."""
+        reports = []
+        for request in self.requests:
+            problems = request.problems(max_queries, repeat_threshold)
+            if problems:
+                reports.append(request.report(problems))
+        return reports
+
+
+_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is not None and recorder.current is not None:
+        recorder.current.queries.append(CapturedQuery(sql, params, origin(sys._getframe(1))))
+    return execute(sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """``connection_created`` receiver; reconnecting the same wrapper keeps a single copy."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def check_queries(max_queries=None, repeat_threshold=None):
+    """Fails with the report when a request made in the block has a problem."""
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = recorder.problems(max_queries, repeat_threshold)
+    if problems:
+        raise AssertionError('Query problems:\n' + '\n'.join(problems))
+
+
+def panel(report):
+    return (
+        '<div id="query-check" style="position:fixed;bottom:0;left:0;right:0;max-height:40%;overflow:auto;'
+        'background:#fff3cd;border-top:2px solid #d39e00;padding:8px;z-index:10000">'
+        f'<strong>Query check</strong><pre>{html.escape(report)}</pre></div>'
+    )
+
+
+class QueryCheckMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (settings.DEBUG and check_setting('PANEL')):
+            return self.get_response(request)
+        with QueryRecorder(follow_requests=False) as recorder:
+            captured = recorder.start(f'{request.method} {request.path}')
+            response = self.get_response(request)
+        return self.annotate(response, captured)
+
+    async def __acall__(self, request):
+        if not (settings.DEBUG and check_setting('PANEL')):
+            return await self.get_response(request)
+        with QueryRecorder(follow_requests=False) as recorder:
+            captured = recorder.start(f'{request.method} {request.path}')
+            response = await self.get_response(request)
+        return self.annotate(response, captured)
+
+    def annotate(self, response, captured):
+        response['X-Query-Count'] = str(len(captured.queries))
+        problems = captured.problems()
+        if not problems:
+            return response
+        report = captured.report(problems)
+        logger.warning("Query problems in %s", report)
+        response['X-Query-Warnings'] = ' | '.join(problem.splitlines()[0][:200] for problem in problems)
+        if (
+            not response.streaming and response.get('Content-Type', '').startswith('text/html')
+            and b'</body>' in response.content
+        ):
+            response.content = response.content.replace(b'</body>', panel(report).encode() + b'</body>', 1)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        return response
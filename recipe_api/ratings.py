@@ -0,0 +1,55 @@
+"""
+Denormalized rating aggregates on ``Recipe``.
+
+``rating_count`` and ``rating_sum`` are adjusted with F-expressions in a
+single UPDATE whenever a ``Rating`` is created, changed or deleted, and
+``rating_score`` holds a Bayesian average that shrinks recipes with few
+ratings towards ``RATING_PRIOR_MEAN``.
+"""
+from django.conf import settings
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Rating, Recipe
+
+
+def rating_prior():
+    return (
+        float(getattr(settings, 'RATING_PRIOR_MEAN', 3.0)),
+        float(getattr(settings, 'RATING_PRIOR_WEIGHT', 5)),
+    )
+
+
+def bayesian_score(rating_sum, rating_count):
+    """Expression (or value) for the weighted score of the given sum and count."""
+    mean, weight = rating_prior()
+    return (Value(mean * weight) + rating_sum) / (Value(weight) + rating_count)
+
+
+def apply_rating_delta(recipe_id, count_delta, sum_delta):
+    new_count = F('rating_count') + count_delta
+    new_sum = F('rating_sum') + sum_delta
+    Recipe.objects.filter(pk=recipe_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        rating_score=bayesian_score(Cast(new_sum, FloatField()), Cast(new_count, FloatField())),
+    )
+
+
+def reconcile_rating_aggregates(recipes=None):
+    """Recompute the aggregates of ``recipes`` (default: all) from the ``Rating`` table."""
+    if recipes is None:
+        recipes = Recipe.objects.all()
+    ratings = Rating.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    updated = recipes.update(
+        rating_count=Coalesce(
+            Subquery(ratings.annotate(total=Count('pk')).values('total'), output_field=IntegerField()), 0
+        ),
+        rating_sum=Coalesce(
+            Subquery(ratings.annotate(total=Sum('score')).values('total'), output_field=IntegerField()), 0
+        ),
+    )
+    recipes.update(rating_score=bayesian_score(
+        Cast(F('rating_sum'), FloatField()), Cast(F('rating_count'), FloatField())
+    ))
+    return updated
@@ -0,0 +1,218 @@
+"""
+Read replicas.
+
+``ReplicaRouter`` sends ORM reads to the aliases in
+``DATABASE_REPLICATION['REPLICAS']`` (alias -> weight), picked by weighted
+random choice once per request, and every write to ``default``. Reads
+stay on the primary:
+
+* inside a transaction on the primary;
+* for requests with an unsafe method, which read what they are about to
+  change, and for the rest of any request once it has written;
+* for ``STICKY_SECONDS`` after a user's last write, so users read their
+  own ratings, comments, saves, follows, shares and recipes while the
+  replicas catch up. ``ReplicaPinningMiddleware`` records the pin in the
+  ``ALIAS`` cache and reads the user id from the JWT without a query. The
+  cache must be shared by all workers (``REDIS_URL``); with locmem a pin
+  only holds on the worker that served the write, and ``manage.py check``
+  warns about it.
+
+A replica is checked at most every ``HEALTH_CHECK_INTERVAL`` seconds per
+process, inside the request that finds the check due, so the replica
+aliases set a ``connect_timeout``. A replica is skipped while it cannot be reached or while its replay
+lag (PostgreSQL) exceeds ``MAX_LAG`` seconds. With no healthy replica,
+reads fall back to the primary.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .throttling import token_user_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'REPLICAS': {},
+    'STICKY_SECONDS': 10,
+    'MAX_LAG': 5,
+    'HEALTH_CHECK_INTERVAL': 10,
+}
+
+# Seconds a PostgreSQL standby is behind; 0 when it has replayed everything received.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replication_setting(name):
+    return getattr(settings, 'DATABASE_REPLICATION', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[replication_setting('ALIAS')]
+
+
+def pin_key(user_id):
+    return f'replication:pinned:{user_id}'
+
+
+def pin(user_id):
+    get_cache().set(pin_key(user_id), True, replication_setting('STICKY_SECONDS'))
+
+
+def is_pinned(user_id):
+    return get_cache().get(pin_key(user_id)) is not None
+
+
+class RoutingState:
+    """Routing decisions of one request."""
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._checked.get(alias, (True, None))
+            due = checked_at is None or now - checked_at >= replication_setting('HEALTH_CHECK_INTERVAL')
+            if due:
+                # Other threads keep the previous verdict while this one checks.
+                self._checked[alias] = (healthy, now)
+        if due:
+            healthy = self.check(alias)
+            with self._lock:
+                self._checked[alias] = (healthy, now)
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 1')
+                lag = cursor.fetchone()[0] if connection.vendor == 'postgresql' else 0
+        except DatabaseError as exc:
+            logger.warning("Replica %s is unavailable: %s", alias, exc)
+            return False
+        if lag is not None and lag > replication_setting('MAX_LAG'):
+            logger.warning("Replica %s is %.1fs behind", alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+health = ReplicaHealth()
+
+
+def choose_replica():
+    replicas = [
+        (alias, weight) for alias, weight in replication_setting('REPLICAS').items()
+        if weight > 0 and health.is_healthy(alias)
+    ]
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    aliases, weights = zip(*replicas)
+    return random.choices(aliases, weights)[0]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replication_setting('REPLICAS') or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None:
+            return choose_replica()
+        if state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = choose_replica()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replication_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replication_setting('REPLICAS'):
+            return self.get_response(request)
+        user_id = token_user_id(request)
+        state = self.start(request, user_id is not None and is_pinned(user_id))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                user_id = user.pk
+            if user_id is not None:
+                pin(user_id)
+        return response
+
+    async def __acall__(self, request):
+        if not replication_setting('REPLICAS'):
+            return await self.get_response(request)
+        user_id = token_user_id(request)
+        pinned = user_id is not None and await get_cache().aget(pin_key(user_id)) is not None
+        state = self.start(request, pinned)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            if user_id is None and hasattr(request, 'auser'):
+                user = await request.auser()
+                user_id = user.pk if user.is_authenticated else None
+            if user_id is not None:
+                await get_cache().aset(pin_key(user_id), True, replication_setting('STICKY_SECONDS'))
+        return response
+
+    @staticmethod
+    def start(request, pinned):
+        return RoutingState(pinned=request.method not in SAFE_METHODS or pinned)
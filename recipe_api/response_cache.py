@@ -0,0 +1,185 @@
+"""
+Cache of serialized public recipe payloads.
+
+Recipe detail payloads are cached per recipe and the public recipe list per
+query string. Keys carry a version number: invalidating a recipe bumps its
+own version and the list version instead of deleting keys, so stale entries
+are never read and simply expire. Responses carry an ETag of the payload
+and ``If-None-Match`` requests are answered with 304 Not Modified. There is
+no Last-Modified: counters change through ``update()`` without touching
+``Recipe.updated_at`` and lists change when recipes leave them, so no
+timestamp tracks the payload.
+
+Configured with ``RESPONSE_CACHE`` (``ALIAS``, ``TIMEOUT``, ``ENABLED``);
+the alias is locmem in tests and Redis in production (see ``CACHES``).
+Invalidations only reach other workers through a shared cache, so
+``manage.py check`` warns when the alias is process-local.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 15,
+    'ENABLED': True,
+}
+
+LIST_NAMESPACE = 'recipes:list'
+STAT_KEYS = {'hit': 'response_cache:stats:hits', 'miss': 'response_cache:stats:misses'}
+
+
+def cache_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def is_enabled():
+    return cache_setting('ENABLED')
+
+
+def get_cache():
+    return caches[cache_setting('ALIAS')]
+
+
+def recipe_namespace(recipe_id):
+    return f'recipes:detail:{recipe_id}'
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+async def aget_version(namespace):
+    cache = get_cache()
+    key = f'{namespace}:version'
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, 1, None)
+        version = await cache.aget(key, 1)
+    return version
+
+
+def bump_version(namespace):
+    cache = get_cache()
+    key = f'{namespace}:version'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, None)
+
+
+def _invalidate(recipe_ids, lists):
+    for recipe_id in recipe_ids:
+        bump_version(recipe_namespace(recipe_id))
+    if lists:
+        bump_version(LIST_NAMESPACE)
+
+
+def invalidate(recipe_ids=(), lists=True):
+    """
+    Invalidate the payloads of ``recipe_ids`` (and the list pages).
+
+    Versions are bumped immediately and again on commit, so a reader that
+    re-caches the old row before the writing transaction commits cannot
+    leave a stale entry behind.
+    """
+    recipe_ids = list(recipe_ids)
+    _invalidate(recipe_ids, lists)
+    transaction.on_commit(lambda: _invalidate(recipe_ids, lists))
+
+
+def record(outcome):
+    cache = get_cache()
+    try:
+        cache.incr(STAT_KEYS[outcome])
+    except ValueError:
+        cache.add(STAT_KEYS[outcome], 1, None)
+
+
+async def arecord(outcome):
+    cache = get_cache()
+    try:
+        await cache.aincr(STAT_KEYS[outcome])
+    except ValueError:
+        await cache.aadd(STAT_KEYS[outcome], 1, None)
+
+
+def stats():
+    values = get_cache().get_many(STAT_KEYS.values())
+    hits = values.get(STAT_KEYS['hit'], 0)
+    misses = values.get(STAT_KEYS['miss'], 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else None}
+
+
+def detail_key(recipe_id):
+    namespace = recipe_namespace(recipe_id)
+    return f'{namespace}:v{get_version(namespace)}'
+
+
+async def adetail_key(recipe_id):
+    namespace = recipe_namespace(recipe_id)
+    return f'{namespace}:v{await aget_version(namespace)}'
+
+
+def list_key(request):
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    return f'{LIST_NAMESPACE}:v{get_version(LIST_NAMESPACE)}:{query}'
+
+
+async def alist_key(request):
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    return f'{LIST_NAMESPACE}:v{await aget_version(LIST_NAMESPACE)}:{query}'
+
+
+def make_entry(data):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return {
+        'data': json.loads(body),
+        'etag': '"%s"' % hashlib.md5(body.encode()).hexdigest(),
+    }
+
+
+def cached_response(request, key, build):
+    """
+    Respond from the cache entry under ``key``, or from the data ``build()``
+    returns on a miss, honouring ``If-None-Match``.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    record('hit' if entry is not None else 'miss')
+    if entry is None:
+        entry = make_entry(build())
+        cache.set(key, entry, cache_setting('TIMEOUT'))
+    return entry_response(request, entry)
+
+
+async def acached_response(request, key, build):
+    """``cached_response`` for async views, where ``build`` is a coroutine function."""
+    cache = get_cache()
+    entry = await cache.aget(key)
+    await arecord('hit' if entry is not None else 'miss')
+    if entry is None:
+        entry = make_entry(await build())
+        await cache.aset(key, entry, cache_setting('TIMEOUT'))
+    return entry_response(request, entry)
+
+
+def entry_response(request, entry):
+    not_modified = get_conditional_response(request, etag=entry['etag'])
+    response = Response(entry['data']) if not_modified is None else Response(status=not_modified.status_code)
+    response['ETag'] = entry['etag']
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,240 @@
+"""
+Recipe search backends.
+
+Recipes are indexed over their title, description, ingredients and tag
+names. On PostgreSQL the index lives in ``RecipeSearchDocument`` (a GIN
+indexed tsvector); on other databases (SQLite in tests and local
+development) an in-process inverted index is kept instead.
+
+Both backends expose the same interface and ``search()`` returns a
+sequence of recipe ids ordered by rank, so callers can paginate the ids
+and only load the recipes for the current page.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .models import Recipe
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Relative weight of each indexed field (tsvector weights A-D on PostgreSQL).
+FIELD_WEIGHTS = {
+    'title': 1.0,
+    'tags': 0.6,
+    'ingredients': 0.4,
+    'description': 0.2,
+}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def recipe_fields(recipe, tag_names=None):
+    """Return the indexed text of a recipe keyed by field name."""
+    if tag_names is None:
+        tag_names = [tag.name for tag in recipe.tags.all()]
+    return {
+        'title': recipe.title,
+        'tags': ' '.join(tag_names),
+        'ingredients': recipe.ingredients,
+        'description': recipe.description,
+    }
+
+
+def public_recipe_ids():
+    return Recipe.objects.filter(is_public=True).order_by('-created_at', '-id').values_list('id', flat=True)
+
+
+class InMemorySearchBackend:
+    """
+    Inverted index held in process memory.
+
+    The index is built lazily from the database on first use and then kept
+    up to date by the signal handlers in ``recipe_api.signals``. Updates are
+    applied on transaction commit so rolled back writes never reach it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._postings = defaultdict(dict)  # term -> {recipe_id: weighted tf}
+            self._documents = {}  # recipe_id -> set of terms
+            self._sorted_terms = None
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            recipes = Recipe.objects.filter(is_public=True).prefetch_related('tags')
+            for recipe in recipes.iterator(chunk_size=2000):
+                self._add(recipe.id, recipe_fields(recipe))
+            self._built = True
+
+    def _add(self, recipe_id, fields):
+        self._remove(recipe_id)
+        terms = defaultdict(float)
+        for field, text in fields.items():
+            for token in tokenize(text):
+                terms[token] += FIELD_WEIGHTS[field]
+        for term, weight in terms.items():
+            self._postings[term][recipe_id] = weight
+        self._documents[recipe_id] = set(terms)
+        self._sorted_terms = None
+
+    def _remove(self, recipe_id):
+        for term in self._documents.pop(recipe_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(recipe_id, None)
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def index_recipe(self, recipe, tag_names=None):
+        if not self._built:
+            return
+        if not recipe.is_public:
+            self.remove_recipe(recipe.pk)
+            return
+        fields = recipe_fields(recipe, tag_names)
+
+        def apply():
+            with self._lock:
+                self._add(recipe.pk, fields)
+        transaction.on_commit(apply)
+
+    def remove_recipe(self, recipe_id):
+        if not self._built:
+            return
+
+        def apply():
+            with self._lock:
+                self._remove(recipe_id)
+        transaction.on_commit(apply)
+
+    def rebuild(self):
+        self.reset()
+        self._ensure_built()
+
+    def _expand_prefix(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        matches = []
+        i = bisect_left(terms, prefix)
+        while i < len(terms) and terms[i].startswith(prefix):
+            matches.append(terms[i])
+            i += 1
+        return matches
+
+    def search(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return public_recipe_ids()
+        self._ensure_built()
+        with self._lock:
+            total = len(self._documents) or 1
+            scores = None
+            for position, token in enumerate(tokens):
+                # The last token is matched as a prefix for search-as-you-type.
+                if position == len(tokens) - 1:
+                    terms = self._expand_prefix(token)
+                else:
+                    terms = [token] if token in self._postings else []
+                token_scores = defaultdict(float)
+                for term in terms:
+                    postings = self._postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for recipe_id, weight in postings.items():
+                        token_scores[recipe_id] += weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        recipe_id: score + token_scores[recipe_id]
+                        for recipe_id, score in scores.items()
+                        if recipe_id in token_scores
+                    }
+                if not scores:
+                    return []
+        return [recipe_id for recipe_id, _ in sorted(scores.items(), key=lambda item: (-item[1], -item[0]))]
+
+
+class PostgresSearchBackend:
+    """Full-text search over ``RecipeSearchDocument`` using a GIN index."""
+
+    def _vector(self, fields):
+        from django.contrib.postgres.search import SearchVector
+        from django.db.models import Value
+
+        return (
+            SearchVector(Value(fields['title']), weight='A')
+            + SearchVector(Value(fields['tags']), weight='B')
+            + SearchVector(Value(fields['ingredients']), weight='C')
+            + SearchVector(Value(fields['description']), weight='D')
+        )
+
+    def index_recipe(self, recipe, tag_names=None):
+        from .models import RecipeSearchDocument
+
+        if not recipe.is_public:
+            self.remove_recipe(recipe.pk)
+            return
+        RecipeSearchDocument.objects.update_or_create(
+            recipe_id=recipe.pk,
+            defaults={'vector': self._vector(recipe_fields(recipe, tag_names))},
+        )
+
+    def remove_recipe(self, recipe_id):
+        from .models import RecipeSearchDocument
+
+        RecipeSearchDocument.objects.filter(recipe_id=recipe_id).delete()
+
+    def rebuild(self, chunk_size=2000):
+        from .models import RecipeSearchDocument
+
+        RecipeSearchDocument.objects.all().delete()
+        recipes = Recipe.objects.filter(is_public=True).prefetch_related('tags')
+        for recipe in recipes.iterator(chunk_size=chunk_size):
+            self.index_recipe(recipe)
+
+    def reset(self):
+        pass
+
+    def search(self, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from django.db.models import F
+        from .models import RecipeSearchDocument
+
+        if not tokenize(query):
+            return public_recipe_ids()
+        search_query = SearchQuery(query, search_type='websearch')
+        return (
+            RecipeSearchDocument.objects.filter(vector=search_query)
+            .annotate(rank=SearchRank(F('vector'), search_query))
+            .order_by('-rank', '-recipe_id')
+            .values_list('recipe_id', flat=True)
+        )
+
+
+_memory_backend = InMemorySearchBackend()
+_postgres_backend = PostgresSearchBackend()
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return _postgres_backend
+    return _memory_backend
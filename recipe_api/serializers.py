@@ -1,39 +1,95 @@
 # serializers.py
 from rest_framework import serializers
 from .models import *
+from .images import srcset
+from .instrumentation import TimedSerializerMixin
 from users.models import CustomUser
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = CustomUser
-        fields = ['id', 'username', 'email', 'bio']
+        fields = ['id', 'username', 'email', 'bio', 'profile_picture_srcset']
+
+    def get_profile_picture_srcset(self, obj):
+        return srcset(obj.profile_picture, obj.profile_picture_variants, self.context.get('request'))
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    photo_srcset = serializers.SerializerMethodField()
 
-class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = [
             'id', 'title', 'description', 'ingredients', 'instructions',
             'prep_time', 'cook_time', 'servings', 'created_at', 'updated_at',
-            'photo', 'meal_type', 'cuisine_types', 'dietary_preferences', 'is_public'
+            'photo', 'photo_srcset', 'meal_type', 'cuisine_types', 'dietary_preferences', 'is_public',
+            'rating_count', 'average_rating', 'rating_score', 'comment_count'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'rating_count', 'rating_score', 'comment_count']
+
+    def get_photo_srcset(self, obj):
+        return srcset(obj.photo, obj.photo_variants, self.context.get('request'))
+
+class PantryRecipeSerializer(RecipeSerializer):
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['matched_ingredients', 'missing_ingredients', 'coverage']
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Looks primary keys up in ``context['preloaded'][model]`` instead of issuing a query per value."""
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context['preloaded'][self.queryset.model][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
-class RatingSerializer(serializers.ModelSerializer):
+class RecipeImportSerializer(RecipeSerializer):
+    """Validates one row of a bulk import; photos cannot be sent in JSON Lines."""
+    cuisine_types = PreloadedPrimaryKeyRelatedField(queryset=CuisineType.objects.all(), many=True, required=False)
+    dietary_preferences = PreloadedPrimaryKeyRelatedField(queryset=DietaryPreference.objects.all(), many=True, required=False)
+
+    class Meta(RecipeSerializer.Meta):
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + ['photo']
+
+class RatingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Rating
         fields = ['score', 'feedback']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentAuthorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username']
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = CommentAuthorSerializer(read_only=True)
+
     class Meta:
         model = Comment
-        fields = ['content']
+        fields = ['id', 'user', 'content', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
-class RecipeShareSerializer(serializers.ModelSerializer):
+class RecipeShareSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = RecipeShare
         fields = ['share_type', 'recipient_email']
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['notification_type', 'message', 'created_at', 'is_read']
+        fields = ['id', 'notification_type', 'message', 'actor_count', 'created_at', 'is_read']
+
+class MarkReadSerializer(serializers.Serializer):
+    up_to_id = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Only mark notifications with an id up to and including this one."
+    )
@@ -0,0 +1,206 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import ClaimsUser, CustomUser
+from . import comments
+from . import facets
+from . import feed
+from . import images
+from . import response_cache
+from .ingredients import sync_recipe_ingredients
+from .models import Comment, FeedEntry, Follow, Notification, Rating, Recipe, Tag
+from .notifications import adjust_unread_count
+from .ratings import apply_rating_delta, reconcile_rating_aggregates
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_search_backend().index_recipe(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def parse_recipe_ingredients(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'ingredients' not in update_fields):
+        return
+    sync_recipe_ingredients(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not instance.is_public:
+        if not created:
+            feed.unpublish_recipe(instance.pk)
+    elif created or not FeedEntry.objects.filter(recipe_id=instance.pk).exists():
+        feed.publish_recipe(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_photo(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'photo' not in update_fields):
+        return
+    images.schedule(instance, 'photo')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=ClaimsUser)
+def process_profile_picture(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'profile_picture' not in update_fields):
+        return
+    images.schedule(instance, 'profile_picture')
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_index(sender, instance, **kwargs):
+    get_search_backend().remove_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_cached_recipe(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_facets_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or instance.has_changed(facets.FIELDS)):
+        facets.invalidate()
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_facets_on_delete(sender, instance, **kwargs):
+    facets.invalidate()
+
+
+@receiver(m2m_changed, sender=Recipe.cuisine_types.through)
+@receiver(m2m_changed, sender=Recipe.dietary_preferences.through)
+def invalidate_on_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        recipe_ids = getattr(instance, '_cleared_recipe_ids', [])
+    else:
+        recipe_ids = list(pk_set)
+    if action == 'pre_clear':
+        return
+    # Taxonomy edits count as changes of the recipe.
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    response_cache.invalidate(recipe_ids)
+    facets.invalidate()
+
+
+@receiver(m2m_changed, sender=Tag.recipes.through)
+def reindex_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if isinstance(instance, Recipe):
+        if action != 'pre_clear':
+            get_search_backend().index_recipe(instance)
+            response_cache.invalidate([instance.pk])
+        return
+    # Changed from the tag side: pk_set holds recipe ids, except on clear.
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipes.values_list('pk', flat=True))
+        return
+    recipe_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_recipe_ids', [])
+    _reindex_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_on_tag_rename(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    _reindex_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def reindex_on_tag_delete(sender, instance, **kwargs):
+    instance._deleted_recipe_ids = list(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_after_tag_delete(sender, instance, **kwargs):
+    _reindex_recipes(getattr(instance, '_deleted_recipe_ids', []))
+
+
+def _reindex_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    response_cache.invalidate(recipe_ids)
+    backend = get_search_backend()
+    for recipe in Recipe.objects.filter(pk__in=list(recipe_ids)).prefetch_related('tags'):
+        backend.index_recipe(recipe)
+
+
+@receiver(post_save, sender=Rating)
+def update_rating_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_rating_delta(instance.recipe_id, 1, instance.score)
+    elif getattr(instance, '_loaded_score', None) is not None:
+        if instance.score != instance._loaded_score:
+            apply_rating_delta(instance.recipe_id, 0, instance.score - instance._loaded_score)
+    else:
+        reconcile_rating_aggregates(Recipe.objects.filter(pk=instance.recipe_id))
+    instance._loaded_score = instance.score
+    response_cache.invalidate([instance.recipe_id])
+
+
+@receiver(post_delete, sender=Rating)
+def update_rating_aggregates_on_delete(sender, instance, **kwargs):
+    score = getattr(instance, '_loaded_score', None)
+    apply_rating_delta(instance.recipe_id, -1, -(instance.score if score is None else score))
+    response_cache.invalidate([instance.recipe_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        comments.apply_comment_delta(instance.recipe_id, 1)
+        response_cache.invalidate([instance.recipe_id])
+    comments.invalidate(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    comments.apply_comment_delta(instance.recipe_id, -1)
+    response_cache.invalidate([instance.recipe_id])
+    comments.invalidate(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    CustomUser.objects.filter(pk=instance.following_id).update(follower_count=F('follower_count') + 1)
+    feed.follow_added(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    # Follows older than the counter were never counted; reconcile_follower_counts fixes those.
+    CustomUser.objects.filter(pk=instance.following_id, follower_count__gt=0).update(
+        follower_count=F('follower_count') - 1
+    )
+    feed.follow_removed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_read:
+        transaction.on_commit(lambda: adjust_unread_count(instance.recipient_id, 1))
@@ -0,0 +1,278 @@
+"""
+Precomputed "similar recipes".
+
+``build_similar_recipes`` turns every public recipe into a NumPy feature
+vector made of three blocks, each L2-normalized:
+
+* taxonomy: one-hot meal type, cuisine types and dietary preferences, plus
+  tags hashed into ``TAG_DIMENSIONS`` columns;
+* ingredients: TF-IDF over the parsed ``RecipeIngredient`` rows, hashed into
+  ``INGREDIENT_DIMENSIONS`` columns;
+* favorites: the users who saved the recipe, weighted by 1/sqrt(number of
+  recipes the user saved) and hashed into ``FAVORITE_DIMENSIONS`` columns,
+  so recipes that are favorited together end up close.
+
+Hashed columns use a random sign per key so that collisions cancel out in
+expectation instead of inflating similarities. Each block is scaled by the
+square root of its weight in ``WEIGHTS`` before the row is normalized again,
+which makes the dot product of two rows their weighted cosine similarity.
+The best ``K`` neighbours of each recipe are written to ``SimilarRecipe``,
+so ``/recipes/<pk>/similar/`` is a single indexed read. Scores are computed
+for ``CHUNK_SIZE`` rows against as many columns as fit in
+``SCORE_BLOCK_BYTES``, keeping a running top ``K`` per row, so memory does
+not grow with the number of recipes squared.
+
+Incremental runs recompute only the rows that can have changed since the
+last finished run: recipes edited or favorited since then, recipes whose
+list contains one of those, and recipes for which one of those now scores
+above their current Kth neighbour. Removed favorites, tag edits and IDF
+drift are picked up by the next ``--full`` run.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import FavoriteRecipe, Recipe, RecipeIngredient, SimilarRecipe, SimilarityJob, Tag
+
+DEFAULTS = {
+    'K': 10,
+    'WEIGHTS': {'taxonomy': 1.0, 'ingredients': 1.0, 'favorites': 0.5},
+    'TAG_DIMENSIONS': 64,
+    'INGREDIENT_DIMENSIONS': 512,
+    'FAVORITE_DIMENSIONS': 256,
+    # Neighbours scoring at or below this are not stored.
+    'MIN_SCORE': 0.01,
+    # Rows whose neighbours are computed and written together.
+    'CHUNK_SIZE': 1000,
+    # Bytes of float32 scores computed at once: rows x columns x 4.
+    'SCORE_BLOCK_BYTES': 128 * 2 ** 20,
+}
+
+
+def similarity_setting(name):
+    return getattr(settings, 'SIMILAR_RECIPES', {}).get(name, DEFAULTS[name])
+
+
+def _pairs(queryset, *fields):
+    values = np.array(list(queryset.values_list(*fields)), dtype=np.int64)
+    return values.reshape(-1, len(fields)).T
+
+
+def _rows_of(ids, recipe_ids):
+    """Row of each of ``recipe_ids`` in the sorted ``ids``, and which of them were found."""
+    if not len(ids):
+        return np.zeros(len(recipe_ids), dtype=np.intp), np.zeros(len(recipe_ids), dtype=bool)
+    rows = np.minimum(np.searchsorted(ids, recipe_ids), len(ids) - 1)
+    return rows, ids[rows] == recipe_ids
+
+
+def _hash(keys, dimensions):
+    """Stable column and sign of each integer key (Knuth's multiplicative hash)."""
+    mixed = (keys.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    columns = (mixed % np.uint64(dimensions)).astype(np.intp)
+    signs = np.where(mixed >> np.uint64(31), -1.0, 1.0).astype(np.float32)
+    return columns, signs
+
+
+def _normalize(block):
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    np.divide(block, norms, out=block, where=norms > 0)
+    return block
+
+
+def _one_hot(size, ids, recipe_ids, keys):
+    rows, found = _rows_of(ids, recipe_ids)
+    values, columns = np.unique(keys[found], return_inverse=True)
+    block = np.zeros((size, len(values)), dtype=np.float32)
+    block[rows[found], columns] = 1
+    return block
+
+
+def _hashed(size, ids, recipe_ids, keys, weights, dimensions):
+    rows, found = _rows_of(ids, recipe_ids)
+    columns, signs = _hash(keys[found], dimensions)
+    block = np.zeros((size, dimensions), dtype=np.float32)
+    np.add.at(block, (rows[found], columns), signs * weights[found])
+    return block
+
+
+def _frequencies(keys):
+    """How often the key at each position occurs in ``keys``."""
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return counts[inverse]
+
+
+def build_features():
+    """Return the sorted ids of all public recipes and their float32 feature rows."""
+    public = Recipe.objects.public()
+    ids, meal_types = [], []
+    for pk, meal_type in public.order_by('pk').values_list('pk', 'meal_type').iterator():
+        ids.append(pk)
+        meal_types.append(meal_type)
+    ids = np.array(ids, dtype=np.int64)
+    size = len(ids)
+    meal_index = {value: index for index, (value, _) in enumerate(Recipe.MEAL_TYPES)}
+    meal_block = np.zeros((size, len(meal_index)), dtype=np.float32)
+    meal_block[np.arange(size), [meal_index[value] for value in meal_types]] = 1
+
+    cuisines = _pairs(Recipe.cuisine_types.through.objects.filter(recipe__is_public=True), 'recipe_id', 'cuisinetype_id')
+    diets = _pairs(
+        Recipe.dietary_preferences.through.objects.filter(recipe__is_public=True), 'recipe_id', 'dietarypreference_id'
+    )
+    tags = _pairs(Tag.recipes.through.objects.filter(recipe__is_public=True), 'recipe_id', 'tag_id')
+    taxonomy = _normalize(np.hstack([
+        meal_block,
+        _one_hot(size, ids, *cuisines),
+        _one_hot(size, ids, *diets),
+        _hashed(size, ids, *tags, np.ones(len(tags[1]), dtype=np.float32), similarity_setting('TAG_DIMENSIONS')),
+    ]))
+
+    # Every ingredient appears at most once per recipe, so TF-IDF is the IDF alone.
+    recipe_ids, ingredient_ids = _pairs(
+        RecipeIngredient.objects.filter(recipe__is_public=True), 'recipe_id', 'ingredient_id'
+    )
+    idf = (np.log((1 + size) / (1 + _frequencies(ingredient_ids))) + 1).astype(np.float32)
+    ingredients = _normalize(
+        _hashed(size, ids, recipe_ids, ingredient_ids, idf, similarity_setting('INGREDIENT_DIMENSIONS'))
+    )
+
+    recipe_ids, user_ids = _pairs(FavoriteRecipe.objects.filter(recipe__is_public=True), 'recipe_id', 'user_id')
+    # Users who save everything say little about any two recipes.
+    user_weights = (1 / np.sqrt(_frequencies(user_ids))).astype(np.float32)
+    favorites = _normalize(
+        _hashed(size, ids, recipe_ids, user_ids, user_weights, similarity_setting('FAVORITE_DIMENSIONS'))
+    )
+
+    weights = similarity_setting('WEIGHTS')
+    matrix = np.hstack([
+        taxonomy * np.sqrt(weights['taxonomy']),
+        ingredients * np.sqrt(weights['ingredients']),
+        favorites * np.sqrt(weights['favorites']),
+    ]).astype(np.float32)
+    return ids, _normalize(matrix)
+
+
+def score_blocks(matrix, rows):
+    """Yield ``(start, scores)``: the scores of ``rows`` against columns ``start:start + width``."""
+    queries = matrix[rows]
+    width = max(1, similarity_setting('SCORE_BLOCK_BYTES') // (4 * max(len(rows), 1)))
+    for start in range(0, matrix.shape[0], width):
+        yield start, queries @ matrix[start:start + width].T
+
+
+def _top(candidates, scores, k):
+    """The ``k`` best ``(candidates, scores)`` of each row, unordered."""
+    if scores.shape[1] <= k:
+        return candidates, scores
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(candidates, top, axis=1), np.take_along_axis(scores, top, axis=1)
+
+
+def nearest(matrix, rows, k):
+    """Yield ``(neighbour_rows, scores)`` for each of ``rows``, best first."""
+    if not len(rows):
+        return
+    k = min(k, matrix.shape[0] - 1)
+    if k <= 0:
+        yield from ((np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in rows)
+        return
+    best = np.empty((len(rows), 0), dtype=np.intp)
+    best_scores = np.empty((len(rows), 0), dtype=np.float32)
+    for start, scores in score_blocks(matrix, rows):
+        own = np.flatnonzero((rows >= start) & (rows < start + scores.shape[1]))
+        scores[own, rows[own] - start] = -np.inf
+        columns = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        columns, scores = _top(columns, scores, k)
+        best, best_scores = _top(np.hstack([best, columns]), np.hstack([best_scores, scores]), k)
+    min_score = similarity_setting('MIN_SCORE')
+    for candidates, row_scores in zip(best, best_scores):
+        order = np.lexsort((candidates, -row_scores))
+        candidates, row_scores = candidates[order], row_scores[order]
+        keep = row_scores > min_score
+        yield candidates[keep], row_scores[keep]
+
+
+def changed_recipe_ids(since):
+    """Recipes edited or favorited since ``since``, including ones that are no longer public."""
+    changed = set(Recipe.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+    changed.update(FavoriteRecipe.objects.filter(saved_at__gte=since).values_list('recipe_id', flat=True))
+    return changed
+
+
+def affected_rows(ids, matrix, changed_ids, k, chunk_size):
+    """Rows whose neighbour list may differ once ``changed_ids`` are taken into account."""
+    affected = np.zeros(len(ids), dtype=bool)
+    changed_ids = np.array(sorted(changed_ids), dtype=np.int64)
+    rows, found = _rows_of(ids, changed_ids)
+    changed_rows = rows[found]
+    affected[changed_rows] = True
+
+    containing = np.array(
+        list(SimilarRecipe.objects.filter(similar_id__in=changed_ids.tolist()).values_list('recipe_id', flat=True)),
+        dtype=np.int64,
+    )
+    rows, found = _rows_of(ids, containing)
+    affected[rows[found]] = True
+
+    # Score a changed recipe has to beat to enter each list; anything positive for short lists.
+    floor = np.full(len(ids), similarity_setting('MIN_SCORE'), dtype=np.float32)
+    full_lists = (
+        SimilarRecipe.objects.values('recipe_id')
+        .annotate(entries=Count('id'), lowest=Min('score'))
+        .filter(entries__gte=k)
+        .values_list('recipe_id', 'lowest')
+    )
+    recipe_ids, lowest = [], []
+    for recipe_id, score in full_lists.iterator():
+        recipe_ids.append(recipe_id)
+        lowest.append(score)
+    rows, found = _rows_of(ids, np.array(recipe_ids, dtype=np.int64))
+    floor[rows[found]] = np.array(lowest, dtype=np.float32)[found]
+    for start in range(0, len(changed_rows), chunk_size):
+        for column, scores in score_blocks(matrix, changed_rows[start:start + chunk_size]):
+            affected[column:column + scores.shape[1]] |= (scores > floor[column:column + scores.shape[1]]).any(axis=0)
+    return np.flatnonzero(affected)
+
+
+def write_neighbours(ids, rows, neighbours):
+    recipe_ids = ids[rows].tolist()
+    entries = [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=int(ids[row]), score=float(score), rank=rank)
+        for recipe_id, (candidates, scores) in zip(recipe_ids, neighbours)
+        for rank, (row, score) in enumerate(zip(candidates, scores), start=1)
+    ]
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(entries)
+
+
+def build_similar_recipes(full=False, k=None, chunk_size=None):
+    """
+    Refresh ``SimilarRecipe`` and return the finished ``SimilarityJob``.
+    The first run is always a full one.
+    """
+    k = k or similarity_setting('K')
+    chunk_size = chunk_size or similarity_setting('CHUNK_SIZE')
+    last_run = SimilarityJob.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+    full = full or last_run is None
+    job = SimilarityJob.objects.create(full=full)
+
+    ids, matrix = build_features()
+    if full:
+        SimilarRecipe.objects.exclude(recipe__is_public=True).delete()
+        rows = np.arange(len(ids))
+    else:
+        changed_ids = changed_recipe_ids(last_run.started_at)
+        SimilarRecipe.objects.filter(recipe_id__in=changed_ids).exclude(recipe__is_public=True).delete()
+        rows = affected_rows(ids, matrix, changed_ids, k, chunk_size)
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        write_neighbours(ids, chunk, nearest(matrix, chunk, k))
+
+    job.finished_at = timezone.now()
+    job.recipes_updated = len(rows)
+    job.save(update_fields=['finished_at', 'recipes_updated'])
+    return job
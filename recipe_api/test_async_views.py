@@ -0,0 +1,110 @@
+import asyncio
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import resolve, reverse
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from .models import CuisineType, Notification, Recipe
+from .search import get_search_backend
+
+ASGI_URLS = override_settings(ROOT_URLCONF='recipe_sharing.asgi_urls')
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        thai = CuisineType.objects.create(name='Thai')
+        for i in range(12):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Curry {i}', description='', ingredients='rice, curry paste',
+                instructions='Cook', prep_time=10 + i, servings=2, meal_type='dinner' if i % 2 else 'lunch',
+            )
+            recipe.cuisine_types.set([thai])
+        get_search_backend().reset()
+        self.recipe = recipe
+        Notification.objects.create(
+            recipient=self.user, sender=self.user, notification_type='like', message='Someone liked Curry 0'
+        )
+
+    def urls(self):
+        return [
+            reverse('recipe-list'),
+            reverse('recipe-list') + '?ordering=top_rated&meal_type=dinner&facets=true',
+            reverse('recipe-detail', args=[self.recipe.id]),
+            reverse('recipe-search') + '?q=curr',
+            reverse('user-recipes', args=[self.user.id]) + '?count=exact',
+            reverse('notifications') + '?is_read=false',
+        ]
+
+    def test_endpoints_are_async_under_the_asgi_urlconf(self):
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('recipe-list')).func))
+        with ASGI_URLS:
+            for url in self.urls():
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(url.split('?')[0]).func), url)
+
+    def test_middleware_is_async_capable(self):
+        # A sync-only middleware makes Django run the async views in a thread.
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': False})
+    def test_async_responses_match_the_sync_views(self):
+        for url in self.urls():
+            expected = self.client.get(url)
+            with ASGI_URLS:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(response.json(), expected.json(), url)
+
+        # Following the next link walks the same keyset pages.
+        with ASGI_URLS:
+            second = self.client.get(self.client.get(reverse('recipe-list')).json()['next'])
+        self.assertEqual([item['title'] for item in second.json()['results']], ['Curry 1', 'Curry 0'])
+
+    def test_list_page_queries_and_conditional_requests(self):
+        with ASGI_URLS:
+            # The user state, the recipes and their two prefetched relations;
+            # the second request is answered from the caches.
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('recipe-list'))
+            with self.assertNumQueries(0):
+                cached = self.client.get(reverse('recipe-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_authentication_and_errors_match_drf(self):
+        with ASGI_URLS:
+            self.assertEqual(
+                self.client.get(reverse('recipe-detail', args=[0])).json(),
+                {'detail': 'No Recipe matches the given query.'},
+            )
+            self.assertEqual(self.client.get(reverse('recipe-list') + '?meal_type=brunch').status_code, 400)
+
+            self.client.credentials()
+            self.assertEqual(self.client.get(reverse('recipe-list')).status_code, status.HTTP_200_OK)
+            response = self.client.get(reverse('notifications'))
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertIn('Bearer', response['WWW-Authenticate'])
+
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+            self.assertEqual(self.client.get(reverse('notifications')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_fall_back_to_the_sync_view(self):
+        with ASGI_URLS:
+            response = self.client.post(reverse('recipe-list'), {
+                'title': 'Laksa', 'description': 'Spicy', 'ingredients': 'noodles', 'instructions': 'Cook',
+                'prep_time': 20, 'servings': 2, 'meal_type': 'dinner',
+            })
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(
+                self.client.delete(reverse('recipe-detail', args=[self.recipe.id])).status_code,
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
@@ -0,0 +1,103 @@
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import CuisineType, DietaryPreference, FeedEntry, Follow, Recipe, RecipeIngredient
+from .search import get_search_backend
+
+
+def recipe_row(title, **extra):
+    row = {
+        'title': title,
+        'description': 'Imported',
+        'ingredients': '2 cups rice\n1 tbsp soy sauce',
+        'instructions': 'Cook',
+        'prep_time': 10,
+        'servings': 2,
+        'meal_type': 'dinner',
+    }
+    row.update(extra)
+    return json.dumps(row)
+
+
+class BulkImportTests(APITestCase):
+    def setUp(self):
+        get_search_backend().reset()
+        self.user = CustomUser.objects.create_user(
+            username='partner',
+            email='partner@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.korean = CuisineType.objects.create(name='Korean')
+        self.vegan = DietaryPreference.objects.create(name='Vegan')
+        self.url = reverse('recipe-bulk-import')
+
+    def post_lines(self, lines):
+        return self.client.generic('POST', self.url, '\n'.join(lines), content_type='application/x-ndjson')
+
+    def test_import_creates_recipes_and_relations(self):
+        follower = CustomUser.objects.create_user(
+            username='follower', email='follower@example.com', password='testpass123'
+        )
+        Follow.objects.create(follower=follower, following=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_lines([
+                recipe_row('Bibimbap', cuisine_types=[self.korean.id], dietary_preferences=[self.vegan.id]),
+                '',
+                recipe_row('Kimchi fried rice', cuisine_types=[self.korean.id]),
+            ])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        bibimbap = Recipe.objects.get(title='Bibimbap')
+        self.assertEqual(bibimbap.user, self.user)
+        self.assertEqual(list(bibimbap.cuisine_types.all()), [self.korean])
+        self.assertEqual(list(bibimbap.dietary_preferences.all()), [self.vegan])
+        self.assertEqual(bibimbap.ingredient_count, 2)
+        self.assertEqual(RecipeIngredient.objects.filter(recipe=bibimbap).count(), 2)
+        self.assertEqual(FeedEntry.objects.filter(owner=follower).count(), 2)
+        self.assertEqual(list(get_search_backend().search('kimchi')), [Recipe.objects.get(title='Kimchi fried rice').id])
+
+    def test_import_reports_errors_per_line(self):
+        response = self.post_lines([
+            recipe_row('Good'),
+            '{not json',
+            recipe_row('Unknown cuisine', cuisine_types=[9999]),
+            recipe_row('', prep_time=-1),
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 1)
+        errors = {error['line']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {2, 3, 4})
+        self.assertIn('non_field_errors', errors[2])
+        self.assertIn('cuisine_types', errors[3])
+        self.assertEqual(set(errors[4]), {'title', 'prep_time'})
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Good'])
+
+    @override_settings(RECIPE_BULK_CHUNK_SIZE=10)
+    def test_import_queries_do_not_grow_with_rows(self):
+        rows = [recipe_row(f'Recipe {i}', cuisine_types=[self.korean.id]) for i in range(10)]
+        with self.assertNumQueries(14):
+            response = self.post_lines(rows)
+        self.assertEqual(response.data['created'], 10)
+
+    def test_export_streams_own_recipes(self):
+        self.post_lines([recipe_row('Bibimbap', cuisine_types=[self.korean.id]), recipe_row('Japchae')])
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        Recipe.objects.create(
+            user=other, title='Not mine', description='', ingredients='salt',
+            instructions='Cook', prep_time=5, servings=1, meal_type='dinner',
+        )
+
+        response = self.client.get(reverse('recipe-export'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Bibimbap', 'Japchae'])
+        self.assertEqual(rows[0]['cuisine_types'], [self.korean.id])
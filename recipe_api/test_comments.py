@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Comment, Recipe
+from .pagination import KeysetPagination
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 2)
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Ramen', description='', ingredients='noodles',
+            instructions='Cook', prep_time=10, servings=2, meal_type='dinner',
+        )
+        self.url = reverse('recipe-comment', args=[self.recipe.id])
+        self.comments = [self.comment(f'Comment {i}') for i in range(5)]
+
+    def comment(self, content, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Comment.objects.create(user=user or self.user, recipe=self.recipe, content=content)
+
+    def page(self, url=None, queries=None):
+        if queries is None:
+            response = self.client.get(url or self.url)
+        else:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['content'] for item in response.data['results']], response.data['next']
+
+    def test_thread_is_paged_newest_first_with_slim_authors(self):
+        # The recipe's visibility, then one query per page: comments joined with their author, no COUNT.
+        first, next_url = self.page(queries=2)
+        self.assertEqual(first, ['Comment 4', 'Comment 3'])
+        self.assertEqual(self.page(next_url)[0], ['Comment 2', 'Comment 1'])
+
+        item = self.client.get(self.url).data['results'][0]
+        self.assertEqual(item['user'], {'id': self.user.id, 'username': 'cook'})
+        self.assertEqual(set(item), {'id', 'user', 'content', 'created_at', 'updated_at'})
+
+    def test_comment_count_follows_creates_and_deletes(self):
+        self.client.post(self.url, {'content': 'Posted'})
+        self.comments[0].delete()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.comment_count, 5)
+        self.assertEqual(self.client.get(reverse('recipe-detail', args=[self.recipe.id])).data['comment_count'], 5)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(comment_count=0)
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.comment_count, 5)
+
+    def test_edit_invalidates_only_the_page_showing_the_comment(self):
+        _, second_url = self.page()
+        _, third_url = self.page(second_url)
+        self.page(third_url)
+
+        response = self.client.patch(
+            reverse('comment-detail', args=[self.comments[2].id]), {'content': 'Edited'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.page(queries=1)
+        self.page(third_url, queries=1)
+        self.assertEqual(self.page(second_url, queries=2)[0], ['Edited', 'Comment 1'])
+
+    def test_new_comment_only_invalidates_the_first_page(self):
+        _, second_url = self.page()
+        self.page(second_url)
+
+        self.comment('Newest')
+
+        self.page(second_url, queries=1)
+        self.assertEqual(self.page(queries=2)[0], ['Newest', 'Comment 4'])
+
+    def test_delete_invalidates_the_page(self):
+        _, second_url = self.page()
+        self.page(second_url)
+
+        response = self.client.delete(reverse('comment-detail', args=[self.comments[1].id]))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.page(queries=1)
+        self.assertEqual(self.page(second_url, queries=2)[0], ['Comment 2', 'Comment 0'])
+
+    def test_only_the_author_can_edit_or_delete(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+        url = reverse('comment-detail', args=[self.comments[0].id])
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.patch(url, {'content': 'Hijacked'}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Comment.objects.get(pk=self.comments[0].id).content, 'Comment 0')
+
+    def test_comments_of_private_recipes_are_hidden_from_others(self):
+        self.page()
+        Recipe.objects.filter(pk=self.recipe.pk).update(is_public=False)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+
+        # The cached page is not served either.
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        detail_url = reverse('comment-detail', args=[self.comments[0].id])
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(self.url, {'content': 'Hi'}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            self.client.get(reverse('recipe-comment', args=[self.recipe.id + 100])).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.page()[0], ['Comment 4', 'Comment 3'])
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,100 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .facets import facet_counts
+from .models import CuisineType, DietaryPreference, Rating, Recipe
+
+
+class FacetedListTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.thai = CuisineType.objects.create(name='Thai')
+        self.indian = CuisineType.objects.create(name='Indian')
+        self.vegan = DietaryPreference.objects.create(name='Vegan')
+        self.make_recipe('Green curry', 'dinner', 20, cuisines=[self.thai], diets=[self.vegan])
+        self.make_recipe('Fusion curry', 'dinner', 45, cuisines=[self.thai, self.indian])
+        self.make_recipe('Dal', 'lunch', 30, cuisines=[self.indian], diets=[self.vegan])
+        self.make_recipe('Mango sticky rice', 'dessert', 10, cuisines=[self.thai], diets=[self.vegan])
+        self.make_recipe('Secret curry', 'dinner', 5, cuisines=[self.thai], is_public=False)
+        self.url = reverse('recipe-list')
+
+    def make_recipe(self, title, meal_type, prep_time, cuisines=(), diets=(), **kwargs):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, description='', ingredients='rice',
+            instructions='Cook', prep_time=prep_time, servings=2, meal_type=meal_type, **kwargs
+        )
+        recipe.cuisine_types.set(cuisines)
+        recipe.dietary_preferences.set(diets)
+        return recipe
+
+    def titles(self, query):
+        response = self.client.get(self.url + '?' + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(recipe['title'] for recipe in response.data['results'])
+
+    def test_or_within_a_parameter_and_across_repeats(self):
+        self.assertEqual(
+            self.titles(f'cuisine_types={self.thai.id},{self.indian.id}'),
+            ['Dal', 'Fusion curry', 'Green curry', 'Mango sticky rice'],
+        )
+        self.assertEqual(self.titles(f'cuisine_types={self.thai.id}&cuisine_types={self.indian.id}'), ['Fusion curry'])
+        self.assertEqual(
+            self.titles(f'cuisine_types={self.thai.id}&dietary_preferences={self.vegan.id}&meal_type=dinner,dessert'),
+            ['Green curry', 'Mango sticky rice'],
+        )
+        self.assertEqual(self.titles('max_prep_time=30&meal_type=dinner'), ['Green curry'])
+
+    def test_facet_counts_ignore_their_own_filter(self):
+        response = self.client.get(self.url, {'meal_type': 'dinner', 'facets': 'true'})
+
+        facets = response.data['facets']
+        self.assertEqual(facets['meal_type'], [
+            {'value': 'dinner', 'count': 2}, {'value': 'dessert', 'count': 1}, {'value': 'lunch', 'count': 1},
+        ])
+        self.assertEqual(facets['cuisine_types'], [
+            {'value': self.thai.id, 'count': 2}, {'value': self.indian.id, 'count': 1},
+        ])
+        self.assertEqual(facets['dietary_preferences'], [{'value': self.vegan.id, 'count': 1}])
+        self.assertEqual(
+            [(row['value'], row['count']) for row in facets['max_prep_time']],
+            [(15, 0), (30, 1), (60, 2), (120, 2)],
+        )
+        self.assertNotIn('facets', self.client.get(self.url).data)
+
+    def test_counts_are_cached_until_a_recipe_changes(self):
+        filters = {'meal_type': ['dinner']}
+        facet_counts(filters)
+        with self.assertNumQueries(0):
+            counts = facet_counts(filters)
+        self.assertEqual(counts['cuisine_types'][0]['count'], 2)
+
+        self.make_recipe('Massaman curry', 'dinner', 60, cuisines=[self.thai])
+        self.assertEqual(facet_counts(filters)['cuisine_types'][0]['count'], 3)
+
+    def test_counts_survive_changes_they_do_not_depend_on(self):
+        filters = {'meal_type': ['dinner']}
+        recipe = Recipe.objects.get(title='Green curry')
+        facet_counts(filters)
+
+        Rating.objects.create(user=self.user, recipe=recipe, score=5)
+        recipe.refresh_from_db()
+        recipe.title = 'Thai green curry'
+        recipe.save()
+        with self.assertNumQueries(0):
+            facet_counts(filters)
+
+        recipe.meal_type = 'lunch'
+        recipe.save()
+        self.assertEqual(facet_counts(filters)['dietary_preferences'], [])
+        Recipe.objects.get(title='Fusion curry').dietary_preferences.add(self.vegan)
+        self.assertEqual(facet_counts(filters)['dietary_preferences'], [{'value': self.vegan.id, 'count': 1}])
+
+    def test_invalid_filters_are_rejected(self):
+        for query in ('meal_type=brunch', 'cuisine_types=thai', 'max_prep_time=-5'):
+            response = self.client.get(self.url + '?' + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
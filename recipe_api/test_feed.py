@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import FeedEntry, Follow, Recipe
+
+
+@override_settings(FEED_FANOUT_MAX_FOLLOWERS=2, FEED_MAX_ENTRIES=3, FEED_BACKFILL_ON_FOLLOW=2)
+class HomeFeedTests(APITestCase):
+    def setUp(self):
+        self.reader = self.make_user('reader')
+        self.chef = self.make_user('chef')
+        self.client.force_authenticate(user=self.reader)
+        self.url = reverse('home-feed')
+
+    def make_user(self, name):
+        return CustomUser.objects.create_user(
+            username=name,
+            email=f'{name}@example.com',
+            password='testpass123'
+        )
+
+    def make_recipe(self, user, title, **kwargs):
+        return Recipe.objects.create(
+            user=user,
+            title=title,
+            description='',
+            ingredients='salt',
+            instructions='Cook',
+            prep_time=10,
+            servings=2,
+            meal_type='dinner',
+            **kwargs
+        )
+
+    def feed_titles(self, url=None):
+        response = self.client.get(url or self.url)
+        return [recipe['title'] for recipe in response.data['results']], response.data['next']
+
+    def test_publishing_fans_out_to_followers(self):
+        Follow.objects.create(follower=self.reader, following=self.chef)
+        self.make_recipe(self.chef, 'Paella')
+        self.make_recipe(self.chef, 'Secret', is_public=False)
+        self.make_recipe(self.make_user('stranger'), 'Unrelated')
+
+        self.assertEqual(FeedEntry.objects.filter(owner=self.reader).count(), 1)
+        self.assertEqual(self.feed_titles(), (['Paella'], None))
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        for title in ('One', 'Two', 'Three'):
+            self.make_recipe(self.chef, title)
+        follow = Follow.objects.create(follower=self.reader, following=self.chef)
+        self.assertEqual(self.feed_titles()[0], ['Three', 'Two'])
+
+        follow.delete()
+        self.assertEqual(self.feed_titles()[0], [])
+        self.chef.refresh_from_db()
+        self.assertEqual(self.chef.follower_count, 0)
+
+    def test_follows_from_before_the_counter_are_reconciled(self):
+        self.make_recipe(self.chef, 'Paella')
+        # bulk_create skips the signals, like rows written before the feed existed.
+        fan, other = self.make_user('fan'), self.make_user('other')
+        Follow.objects.bulk_create([
+            Follow(follower=self.reader, following=self.chef), Follow(follower=fan, following=self.chef),
+            Follow(follower=other, following=self.chef),
+        ])
+        Follow.objects.get(follower=other).delete()
+        self.chef.refresh_from_db()
+        self.assertEqual(self.chef.follower_count, 0)
+
+        call_command('reconcile_follower_counts', '--backfill-feeds', stdout=StringIO())
+        self.chef.refresh_from_db()
+        self.assertEqual(self.chef.follower_count, 2)
+        self.assertEqual(self.feed_titles()[0], ['Paella'])
+        self.assertTrue(FeedEntry.objects.filter(owner=fan).exists())
+
+    def test_making_a_recipe_private_removes_it(self):
+        Follow.objects.create(follower=self.reader, following=self.chef)
+        recipe = self.make_recipe(self.chef, 'Paella')
+        recipe.is_public = False
+        recipe.save()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_popular_authors_are_merged_on_read(self):
+        star = self.make_user('star')
+        for name in ('fan1', 'fan2'):
+            Follow.objects.create(follower=self.make_user(name), following=star)
+        Follow.objects.create(follower=self.reader, following=star)
+        Follow.objects.create(follower=self.reader, following=self.chef)
+
+        self.make_recipe(self.chef, 'Chef 1')
+        self.make_recipe(star, 'Star 1')
+        self.make_recipe(self.chef, 'Chef 2')
+
+        self.assertFalse(FeedEntry.objects.filter(author=star).exists())
+        self.assertEqual(self.feed_titles()[0], ['Chef 2', 'Star 1', 'Chef 1'])
+
+    def test_cursor_pagination_and_trimming(self):
+        Follow.objects.create(follower=self.reader, following=self.chef)
+        for i in range(12):
+            self.make_recipe(self.chef, f'Recipe {i}')
+        # Timelines are trimmed back to FEED_MAX_ENTRIES once they overflow.
+        self.assertEqual(FeedEntry.objects.filter(owner=self.reader).count(), 3)
+
+        with self.settings(FEED_MAX_ENTRIES=100):
+            for i in range(12, 24):
+                self.make_recipe(self.chef, f'Recipe {i}')
+            first_page, next_url = self.feed_titles()
+            second_page, last_url = self.feed_titles(next_url)
+        self.assertEqual(first_page, [f'Recipe {i}' for i in range(23, 13, -1)])
+        self.assertEqual(second_page, [f'Recipe {i}' for i in range(13, 8, -1)])
+        self.assertIsNone(last_url)
@@ -3,6 +3,7 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 from users.models import CustomUser
 from .models import Recipe, Rating, Comment, Follow, Notification, RecipeShare
+from .search import get_search_backend
 
 class APITests(APITestCase):
     def setUp(self):
@@ -12,6 +13,7 @@ class APITests(APITestCase):
             password='testpass123'
         )
         self.client.force_authenticate(user=self.user)
+        get_search_backend().reset()
         self.recipe = Recipe.objects.create(
             user=self.user,
             title='Test Recipe',
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Recipe
+from .thumbnails import content_hash
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def camera_jpeg(size=(120, 80)):
+    image = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'Phone maker'  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE={'EAGER': True, 'WIDTHS': (16, 40, 500)})
+class ImagePipelineTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='photographer',
+            email='photographer@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_recipe(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Tomato soup', description='', ingredients='tomato',
+                instructions='Cook', prep_time=5, servings=1, meal_type='dinner',
+                photo=SimpleUploadedFile('IMG_0001.jpg', data, content_type='image/jpeg'),
+            )
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_upload_is_replaced_by_hashed_variants(self):
+        data = camera_jpeg()
+        raw_name = 'recipe_photos/IMG_0001.jpg'
+        recipe = self.create_recipe(data)
+
+        digest = content_hash(data, (16, 40, 500), 2048, 'WEBP', 80)
+        self.assertEqual(recipe.photo.name, f'recipe_photos/{digest}.webp')
+        self.assertEqual(recipe.photo_variants['sizes'], {
+            '16w': f'recipe_photos/{digest}_16w.webp',
+            '40w': f'recipe_photos/{digest}_40w.webp',
+        })
+        self.assertFalse(recipe.photo.storage.exists(raw_name))
+
+        with Image.open(recipe.photo.path) as original:
+            self.assertEqual(original.format, 'WEBP')
+            # The orientation tag was applied to the pixels before it was dropped.
+            self.assertEqual(original.size, (80, 120))
+            self.assertEqual(len(original.getexif()), 0)
+        with Image.open(recipe.photo.storage.path(recipe.photo_variants['sizes']['16w'])) as thumbnail:
+            self.assertEqual(thumbnail.size, (16, 24))
+
+    def test_new_render_settings_get_new_names(self):
+        data = camera_jpeg()
+        first = self.create_recipe(data)
+        with self.settings(IMAGE_PIPELINE={'EAGER': True, 'WIDTHS': (16, 40, 500), 'QUALITY': 60}):
+            second = self.create_recipe(data)
+        self.assertNotEqual(first.photo.name, second.photo.name)
+
+    def test_stale_instance_keeps_the_processed_photo(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = Recipe.objects.create(
+                user=self.user, title='Salad', description='', ingredients='lettuce',
+                instructions='Toss', prep_time=5, servings=1, meal_type='lunch',
+                photo=SimpleUploadedFile('salad.jpg', camera_jpeg(), content_type='image/jpeg'),
+            )
+        stale = Recipe.objects.get(pk=recipe.pk)
+        for callback in callbacks:
+            callback()
+        processed = Recipe.objects.get(pk=recipe.pk).photo.name
+
+        stale.title = 'Green salad'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.title, recipe.photo.name), ('Green salad', processed))
+        self.assertTrue(recipe.photo.storage.exists(processed))
+
+        # A new upload is still written.
+        recipe.photo = SimpleUploadedFile('other.jpg', camera_jpeg((60, 60)), content_type='image/jpeg')
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).photo.name, 'recipe_photos/other.jpg')
+
+    def test_serializers_expose_srcset(self):
+        recipe = self.create_recipe(camera_jpeg())
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        srcset = response.data['photo_srcset']
+        self.assertEqual(set(srcset), {'16w', '40w', 'original'})
+        self.assertTrue(srcset['original'].endswith(f'/media/{recipe.photo.name}'))
+
+    def test_unprocessed_photo_has_no_srcset(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', description='', ingredients='lettuce',
+            instructions='Toss', prep_time=5, servings=1, meal_type='lunch',
+            photo=SimpleUploadedFile('salad.jpg', camera_jpeg(), content_type='image/jpeg'),
+        )
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+        self.assertIsNone(response.data['photo_srcset'])
+
+    def test_profile_picture_is_processed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_picture = SimpleUploadedFile('me.jpg', camera_jpeg(), content_type='image/jpeg')
+            self.user.save()
+        self.user.refresh_from_db()
+
+        self.assertTrue(self.user.profile_picture.name.endswith('.webp'))
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(set(response.data['profile_picture_srcset']), {'16w', '40w', 'original'})
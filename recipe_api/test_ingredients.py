@@ -0,0 +1,94 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .ingredients import parse_ingredient_line, parse_ingredients
+from .models import Ingredient, Recipe, RecipeIngredient
+
+
+class IngredientParsingTests(SimpleTestCase):
+    def test_parses_quantity_unit_and_name(self):
+        item = parse_ingredient_line('1 1/2 cups rolled oats')
+        self.assertEqual(item.quantity, Decimal('1.5'))
+        self.assertEqual(item.unit, 'cup')
+        self.assertEqual(item.name, 'rolled oat')
+
+    def test_normalizes_plurals_and_descriptors(self):
+        self.assertEqual(parse_ingredient_line('3 Eggs, beaten').name, 'egg')
+        self.assertEqual(parse_ingredient_line('2 tbsp. olive oil (extra virgin)').unit, 'tbsp')
+        self.assertEqual(parse_ingredient_line('½ cup crumbled feta').quantity, Decimal('0.5'))
+        self.assertEqual(parse_ingredient_line('handful of fresh spinach').name, 'spinach')
+
+    def test_skips_blank_lines(self):
+        self.assertEqual([item.name for item in parse_ingredients('- 2 eggs\n\n- salt; pepper')], ['egg', 'salt', 'pepper'])
+
+
+class PantryTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def make_recipe(self, title, ingredients, **kwargs):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            description='',
+            ingredients=ingredients,
+            instructions='Cook',
+            prep_time=10,
+            servings=2,
+            meal_type='dinner',
+            **kwargs
+        )
+
+    def test_saving_a_recipe_parses_its_ingredients(self):
+        recipe = self.make_recipe('Omelette', '3 eggs\n50 g feta\n1 handful spinach')
+        self.assertEqual(recipe.ingredient_count, 3)
+        self.assertEqual(
+            list(recipe.recipe_ingredients.values_list('ingredient__name', 'unit')),
+            [('egg', ''), ('feta', 'g'), ('spinach', 'handful')]
+        )
+        recipe.ingredients = '3 eggs'
+        recipe.save()
+        self.assertEqual(recipe.recipe_ingredients.count(), 1)
+
+    def test_ranks_recipes_by_pantry_coverage(self):
+        self.make_recipe('Omelette', '3 eggs\nfeta\nspinach')
+        self.make_recipe('Spanakopita', 'spinach\nfeta\nfilo pastry\nbutter')
+        self.make_recipe('Toast', 'bread\nbutter')
+        self.make_recipe('Private eggs', 'eggs', is_public=False)
+
+        response = self.client.get(reverse('recipe-pantry'), {'ingredients': 'Eggs, spinach, feta'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([recipe['title'] for recipe in results], ['Omelette', 'Spanakopita'])
+        self.assertEqual(results[0]['coverage'], 1.0)
+        self.assertEqual(results[1]['matched_ingredients'], 2)
+        self.assertEqual(results[1]['missing_ingredients'], 2)
+
+    def test_unknown_ingredients_return_no_recipes(self):
+        self.make_recipe('Toast', 'bread')
+        response = self.client.get(reverse('recipe-pantry'), {'ingredients': 'saffron'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_backfill_command(self):
+        recipe = self.make_recipe('Toast', 'bread\nbutter')
+        RecipeIngredient.objects.all().delete()
+        Ingredient.objects.all().delete()
+        Recipe.objects.update(ingredient_count=0)
+
+        call_command('backfill_ingredients', chunk_size=1, stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_count, 2)
+        self.assertEqual(RecipeIngredient.objects.filter(recipe=recipe).count(), 2)
@@ -0,0 +1,113 @@
+import re
+from unittest import mock
+
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from .instrumentation import SERIES_KEY, RequestMetrics, registry
+from .models import Notification, Recipe
+
+INSTRUMENTATION = {'FLUSH_INTERVAL': 0, 'TOKEN': 'scrape-secret'}
+
+
+@override_settings(INSTRUMENTATION=INSTRUMENTATION, RESPONSE_CACHE={'ENABLED': False})
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = CustomUser.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'Soup {i}', description='', ingredients='water',
+                instructions='Boil', prep_time=5, servings=1, meal_type='lunch',
+            )
+        Notification.objects.create(recipient=self.user, sender=self.user, notification_type='like', message='Hi')
+
+    def scrape(self):
+        scraper = APIClient()
+        scraper.credentials(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        response = scraper.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def sample(self, text, series):
+        match = re.search(rf'^recipe_sharing_{re.escape(series)} (\S+)$', text, re.MULTILINE)
+        self.assertIsNotNone(match, series)
+        return float(match.group(1))
+
+    def test_requests_are_recorded_per_url_name(self):
+        counted = 0
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('recipe-list'))
+            counted += len(queries)
+        self.client.get(reverse('notifications'))
+        self.client.get('/no-such-page/')
+
+        text = self.scrape()
+        self.assertEqual(self.sample(text, 'request_duration_seconds_count{view="recipe-list"}'), 2)
+        self.assertEqual(self.sample(text, 'request_duration_seconds_bucket{view="recipe-list",le="+Inf"}'), 2)
+        self.assertEqual(self.sample(text, 'request_queries_sum{view="recipe-list"}'), counted)
+        self.assertGreater(self.sample(text, 'request_sql_seconds_sum{view="recipe-list"}'), 0)
+        self.assertGreater(self.sample(text, 'request_serialize_seconds_sum{view="recipe-list"}'), 0)
+        self.assertEqual(self.sample(text, 'request_queries_count{view="notifications"}'), 1)
+        self.assertEqual(self.sample(text, 'responses_total{view="recipe-list",status="2xx"}'), 2)
+        self.assertEqual(self.sample(text, 'responses_total{view="unresolved",status="4xx"}'), 1)
+
+    def test_metrics_require_the_token_or_an_admin(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        self.scrape()
+
+    def test_server_timing_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('recipe-list')))
+        with override_settings(INSTRUMENTATION={**INSTRUMENTATION, 'SERVER_TIMING': True}):
+            response = self.client.get(reverse('recipe-list'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+$',
+        )
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        slow = {**INSTRUMENTATION, 'SLOW_REQUEST_MS': 0, 'SLOW_SAMPLE_RATE': 1}
+        with override_settings(INSTRUMENTATION=slow), self.assertLogs('recipe_api.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('notifications'))
+        self.assertIn('Slow request GET /notifications/ (notifications)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        self.assertIn('recipe_api_notification', logs.output[0])
+
+    def test_failed_flush_is_logged_and_the_request_served(self):
+        with mock.patch('recipe_api.instrumentation.incr_many', side_effect=ConnectionError), \
+                self.assertLogs('recipe_api.instrumentation', 'ERROR') as logs:
+            response = self.client.get(reverse('notifications'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Could not flush', logs.output[0])
+
+    def test_redis_counters_are_flushed_in_one_pipeline(self):
+        redis = RedisCache('redis://metrics', {})
+        client = mock.Mock()
+        redis.__dict__['_cache'] = mock.Mock(**{'get_client.return_value': client, 'get.return_value': set()})
+        registry.observe('recipe-list', 200, 0.002, RequestMetrics())
+        registry.observe('recipe-list', 200, 0.003, RequestMetrics())
+
+        with mock.patch('recipe_api.instrumentation.get_cache', return_value=redis):
+            registry.flush()
+        pipeline = client.pipeline.return_value
+        self.assertEqual(pipeline.execute.call_count, 1)
+        increments = dict(call.args for call in pipeline.incrby.call_args_list)
+        self.assertEqual(increments[':1:metrics:request_duration_seconds:recipe-list:count'], 2)
+        self.assertEqual(increments[':1:metrics:request_duration_seconds:recipe-list:sum'], 5000)
+        self.assertEqual(increments[':1:metrics:responses_total:recipe-list:2xx'], 2)
+        redis._cache.set.assert_called_once_with(':1:' + SERIES_KEY, {'recipe-list'}, None)
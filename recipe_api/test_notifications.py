@@ -0,0 +1,228 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Notification, NotificationEvent, Recipe
+from . import notifications
+from .notifications import get_queue, mark_read
+
+
+class NotificationPipelineTests(APITestCase):
+    def setUp(self):
+        self.chef = self.make_user('chef')
+        self.recipe = Recipe.objects.create(
+            user=self.chef,
+            title='Ramen',
+            description='',
+            ingredients='noodles',
+            instructions='Cook',
+            prep_time=10,
+            servings=2,
+            meal_type='dinner',
+        )
+
+    def make_user(self, name):
+        return CustomUser.objects.create_user(
+            username=name,
+            email=f'{name}@example.com',
+            password='testpass123'
+        )
+
+    def rate_as(self, user, score=5):
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('recipe-rate', args=[self.recipe.id]), {'score': score})
+
+    def test_interactions_only_enqueue_events(self):
+        self.rate_as(self.make_user('fan'))
+        self.assertEqual(NotificationEvent.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_bursts_are_coalesced(self):
+        fans = [self.make_user(f'fan{i}') for i in range(12)]
+        for fan in fans:
+            self.rate_as(fan)
+        self.rate_as(fans[0], score=3)  # re-rating does not notify again
+        self.rate_as(self.chef)  # nor does rating your own recipe
+
+        call_command('run_notification_worker', once=True, stdout=StringIO())
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.chef)
+        self.assertEqual(notification.actor_count, 12)
+        self.assertEqual(notification.message, '12 people liked your recipe "Ramen"')
+        self.assertFalse(NotificationEvent.objects.exists())
+
+    def test_later_events_merge_into_unread_notification(self):
+        self.rate_as(self.make_user('early'))
+        get_queue().drain()
+        self.rate_as(self.make_user('late'))
+        get_queue().drain()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.sender.username, 'late')
+
+        notification.is_read = True
+        notification.save()
+        self.rate_as(self.make_user('after_read'))
+        get_queue().drain()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_repeat_senders_are_counted_once_and_keep_the_inbox_order(self):
+        fan = self.make_user('fan')
+        self.client.force_authenticate(user=fan)
+        self.client.post(reverse('recipe-comment', args=[self.recipe.id]), {'content': 'Yum'})
+        get_queue().drain()
+        first = Notification.objects.get()
+        other = Notification.objects.create(
+            recipient=self.chef, sender=fan, notification_type='follow', message='fan started following you'
+        )
+        for text in ('Again', 'And again'):
+            self.client.post(reverse('recipe-comment', args=[self.recipe.id]), {'content': text})
+            get_queue().drain()
+
+        notification = Notification.objects.get(pk=first.pk)
+        self.assertEqual(notification.actor_count, 1)
+        self.assertEqual(notification.message, 'fan commented on your recipe "Ramen"')
+        self.assertEqual(notification.created_at, first.created_at)
+
+        # Marking read up to the top of the inbox covers everything below it.
+        self.client.force_authenticate(user=self.chef)
+        inbox = self.client.get(reverse('notifications')).data['results']
+        self.assertEqual([item['id'] for item in inbox], [other.pk, first.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_read(self.chef.id, up_to_id=inbox[0]['id']), 2)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_comment_and_follow_notifications(self):
+        fan = self.make_user('fan')
+        self.client.force_authenticate(user=fan)
+        self.client.post(reverse('recipe-comment', args=[self.recipe.id]), {'content': 'Yum'})
+        self.client.post(reverse('user-follow', args=[self.chef.id]))
+        get_queue().drain()
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)),
+            ['fan commented on your recipe "Ramen"', 'fan started following you']
+        )
+
+    @override_settings(NOTIFICATIONS={
+        'QUEUE': 'recipe_api.notifications.LocalQueue',
+        'QUEUE_OPTIONS': {'autostart': False},
+    })
+    def test_local_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate_as(self.make_user('fan1'))
+            self.rate_as(self.make_user('fan2'))
+        self.assertFalse(NotificationEvent.objects.exists())
+
+        self.assertEqual(get_queue().drain(), 2)
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+
+class NotificationInboxTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_notifications(self, count, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Notification.objects.create(
+                    recipient=self.user,
+                    sender=self.user,
+                    notification_type='follow',
+                    message=f'Message {i}',
+                    **kwargs
+                )
+                for i in range(count)
+            ]
+
+    def unread_count(self):
+        return self.client.get(reverse('notifications-unread-count')).data['unread_count']
+
+    def test_unread_count_is_served_from_cache(self):
+        self.create_notifications(3)
+        self.assertEqual(self.unread_count(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 3)
+        self.create_notifications(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 5)
+
+    def test_mark_up_to_id_and_mark_all(self):
+        notifications = self.create_notifications(4)
+        self.assertEqual(self.unread_count(), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notifications-mark-read'), {'up_to_id': notifications[1].id})
+        self.assertEqual(response.data['marked_read'], 2)
+        self.assertEqual(self.unread_count(), 2)
+        unread = self.client.get(reverse('notifications'), {'is_read': 'false'}).data['results']
+        self.assertEqual([item['message'] for item in unread], ['Message 3', 'Message 2'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notifications-mark-read'))
+        self.assertEqual(response.data['marked_read'], 2)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_insert_during_a_recount_is_not_lost(self):
+        self.create_notifications(3)
+        real_cache = notifications.cache
+
+        def add_after_insert(*args, **kwargs):
+            self.create_notifications(1)
+            return real_cache.add(*args, **kwargs)
+
+        racing_cache = mock.Mock(wraps=real_cache)
+        racing_cache.add.side_effect = add_after_insert
+        with mock.patch.object(notifications, 'cache', racing_cache):
+            self.assertEqual(self.unread_count(), 3)
+        self.assertEqual(self.unread_count(), 4)
+
+    def test_insert_committed_before_mark_all_commits_is_kept(self):
+        self.create_notifications(2)
+        self.assertEqual(self.unread_count(), 2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            mark_read(self.user.id)
+        self.create_notifications(1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_worker_inserts_update_the_counter(self):
+        self.assertEqual(self.unread_count(), 0)
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', description='', ingredients='water',
+            instructions='Boil', prep_time=1, servings=1, meal_type='lunch',
+        )
+        for i in range(3):
+            fan = CustomUser.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='x')
+            self.client.force_authenticate(user=fan)
+            self.client.post(reverse('recipe-rate', args=[recipe.id]), {'score': 5})
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            get_queue().drain()
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_purge_old_read_notifications(self):
+        old_read = self.create_notifications(3, is_read=True)
+        self.create_notifications(1)
+        Notification.objects.filter(pk__in=[n.pk for n in old_read]).update(
+            created_at=timezone.now() - timedelta(days=120)
+        )
+        call_command('purge_notifications', days=90, batch_size=2, stdout=StringIO())
+        self.assertEqual(list(Notification.objects.values_list('is_read', flat=True)), [False])
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Notification, Recipe
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='pager',
+            email='pager@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for i in range(25):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                description='',
+                ingredients='salt',
+                instructions='Cook',
+                prep_time=10,
+                servings=2,
+                meal_type='dinner',
+            )
+        # Identical timestamps must still paginate deterministically on id.
+        Recipe.objects.update(created_at=timezone.now())
+
+    def titles(self, response):
+        return [recipe['title'] for recipe in response.data['results']]
+
+    def test_walks_forward_and_back(self):
+        first = self.client.get(reverse('recipe-list'))
+        self.assertNotIn('count', first.data)
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(self.titles(first), [f'Recipe {i}' for i in range(24, 14, -1)])
+
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        self.assertEqual(self.titles(second), [f'Recipe {i}' for i in range(14, 4, -1)])
+        self.assertEqual(self.titles(third), [f'Recipe {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(third.data['next'])
+
+        back = self.client.get(third.data['previous'])
+        self.assertEqual(self.titles(back), self.titles(second))
+        self.assertEqual(self.titles(self.client.get(back.data['previous'])), self.titles(first))
+
+    def test_optional_count(self):
+        url = reverse('recipe-list')
+        self.assertEqual(self.client.get(url, {'count': 'exact'}).data['count'], 25)
+        # Planner estimates are PostgreSQL only; other databases count exactly.
+        self.assertEqual(self.client.get(url, {'count': 'estimate'}).data['count'], 25)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('recipe-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_top_rated_ordering_paginates(self):
+        Recipe.objects.filter(title='Recipe 3').update(rating_score=5)
+        first = self.client.get(reverse('recipe-list'), {'ordering': 'top_rated'})
+        second = self.client.get(first.data['next'])
+        titles = self.titles(first) + self.titles(second)
+        self.assertEqual(titles[0], 'Recipe 3')
+        self.assertEqual(len(set(titles)), 20)
+
+    def test_notifications(self):
+        now = timezone.now()
+        for i in range(12):
+            Notification.objects.create(
+                recipient=self.user,
+                sender=self.user,
+                notification_type='follow',
+                message=f'Message {i}',
+            )
+        Notification.objects.update(created_at=now - timedelta(minutes=1))
+        first = self.client.get(reverse('notifications'))
+        second = self.client.get(first.data['next'])
+        messages = [item['message'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(messages, [f'Message {i}' for i in range(11, -1, -1)])
@@ -0,0 +1,61 @@
+import asyncio
+from unittest import mock
+
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db.backends.postgresql import base
+from django.test import SimpleTestCase
+from recipe_sharing.db import prepared_statements
+from recipe_sharing.db.base import DatabaseWrapper
+
+SETTINGS = {
+    'ENGINE': 'recipe_sharing.db', 'NAME': 'recipes', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+    'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+    'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TEST': {},
+}
+
+
+class PreparedStatementBackendTests(SimpleTestCase):
+    """The backend runs against a mocked psycopg connection; the suite itself may use another database."""
+
+    def make_wrapper(self, alias='default'):
+        wrapper = DatabaseWrapper(dict(SETTINGS), alias)
+        wrapper.connection = mock.Mock(cursor_factory=base.Cursor)
+        wrapper.connection.adapters.get_loader.return_value.timezone = None
+        # Record the factory psycopg would build the cursor from.
+        wrapper.connection.cursor.side_effect = lambda *args: wrapper.connection.cursor_factory
+        return wrapper
+
+    def test_prepared_cursor_binds_on_the_server(self):
+        wrapper = self.make_wrapper()
+        with mock.patch.object(base, 'register_tzloader') as register_tzloader:
+            self.assertIs(wrapper.create_cursor(), base.Cursor)
+            wrapper.prepare_queries = True
+            self.assertIs(wrapper.create_cursor(), base.ServerBindingCursor)
+
+        self.assertIs(wrapper.connection.cursor_factory, base.Cursor)
+        self.assertEqual(register_tzloader.call_count, 2)
+
+    def test_prepared_cursor_refuses_async_callers(self):
+        wrapper = self.make_wrapper()
+        wrapper.prepare_queries = True
+
+        async def create_cursor():
+            return wrapper.create_cursor()
+
+        with mock.patch.object(base, 'register_tzloader'), self.assertRaises(SynchronousOnlyOperation):
+            asyncio.run(create_cursor())
+        wrapper.connection.cursor.assert_not_called()
+        self.assertIs(wrapper.connection.cursor_factory, base.Cursor)
+
+    def test_block_restores_every_alias_after_an_exception(self):
+        primary, replica = self.make_wrapper(), self.make_wrapper('replica_1')
+        replica.prepare_queries = True
+        with mock.patch('recipe_sharing.db.connections') as connections:
+            connections.all.return_value = [primary, replica]
+            with self.assertRaises(ValueError), prepared_statements():
+                self.assertTrue(primary.prepare_queries)
+                self.assertTrue(replica.prepare_queries)
+                raise ValueError
+
+        self.assertFalse(primary.prepare_queries)
+        self.assertTrue(replica.prepare_queries)
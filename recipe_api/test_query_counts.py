@@ -0,0 +1,84 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import CuisineType, DietaryPreference, Notification, Recipe
+from .search import get_search_backend
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class RecipeQueryCountTests(APITestCase):
+    """
+    Every list endpoint must issue a fixed number of queries no matter how
+    many recipes end up on the page.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='counter',
+            email='counter@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.cuisines = [CuisineType.objects.create(name=name) for name in ('Greek', 'Thai')]
+        self.diets = [DietaryPreference.objects.create(name=name) for name in ('Vegan', 'Keto')]
+
+    def create_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Pie {i}',
+                description='Flaky pie',
+                ingredients='flour\nbutter',
+                instructions='Bake',
+                prep_time=10,
+                servings=2,
+                meal_type='dinner',
+            )
+            recipe.cuisine_types.set(self.cuisines)
+            recipe.dietary_preferences.set(self.diets)
+        Notification.objects.bulk_create([
+            Notification(
+                recipient=self.user,
+                sender=self.user,
+                notification_type='recipe_update',
+                message='Updated',
+            )
+            for _ in range(count)
+        ])
+
+    def assert_constant_queries(self, expected, url, params=None, sizes=(1, 10)):
+        created = 0
+        for size in sizes:
+            self.create_recipes(size - created)
+            created = size
+            # Warm up lazily built state (e.g. the in-process search index).
+            get_search_backend().reset()
+            self.client.get(url, params)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url, params)
+            self.assertEqual(len(response.data['results']), size)
+
+    def test_recipe_list(self):
+        # recipes, cuisine_types, dietary_preferences; keyset pages skip the COUNT
+        self.assert_constant_queries(3, reverse('recipe-list'))
+
+    def test_user_recipes(self):
+        self.assert_constant_queries(3, reverse('user-recipes', args=[self.user.id]))
+
+    def test_recipe_search(self):
+        # Ranking happens in the index; only the page of recipes is loaded.
+        self.assert_constant_queries(3, reverse('recipe-search'), {'q': 'pie'})
+
+    def test_recipe_pantry(self):
+        # ingredient ids, COUNT, recipes, cuisine_types, dietary_preferences
+        self.assert_constant_queries(5, reverse('recipe-pantry'), {'ingredients': 'flour'})
+
+    def test_notifications(self):
+        self.assert_constant_queries(1, reverse('notifications'))
+
+    def test_recipe_detail(self):
+        self.create_recipes(1)
+        recipe = Recipe.objects.get()
+        with self.assertNumQueries(3):
+            self.client.get(reverse('recipe-detail', args=[recipe.id]))
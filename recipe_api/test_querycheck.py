@@ -0,0 +1,83 @@
+import pytest
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+from rest_framework import generics, permissions
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import CuisineType, Recipe
+from .querycheck import check_queries, fingerprint
+from .serializers import RecipeSerializer
+
+
+class NaiveRecipeListView(generics.ListAPIView):
+    """Serializes every recipe's cuisines and diets with a query each."""
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    serializer_class = RecipeSerializer
+
+    def get_queryset(self):
+        queryset = Recipe.objects.order_by('id')
+        if self.request.query_params.get('prefetch'):
+            queryset = queryset.prefetch_related('cuisine_types', 'dietary_preferences')
+        return queryset
+
+
+urlpatterns = [path('naive/', NaiveRecipeListView.as_view())]
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_values_are_normalized(self):
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s, %s, %s) AND "a"."n" = \'x\'  LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) AND "a"."n" = ? LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT 1 FROM "t2" WHERE "t2"."id" IN (%s)'), 'SELECT ? FROM "t2" WHERE "t2"."id" IN (...)')
+
+
+@pytest.mark.query_check(enabled=False)
+@override_settings(ROOT_URLCONF=__name__)
+class QueryCheckTests(APITestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        thai = CuisineType.objects.create(name='Thai')
+        for i in range(4):
+            recipe = Recipe.objects.create(
+                user=user, title=f'Curry {i}', description='', ingredients='rice',
+                instructions='Cook', prep_time=10, servings=2, meal_type='dinner',
+            )
+            recipe.cuisine_types.set([thai])
+
+    def test_relation_serialized_per_row_is_reported(self):
+        with self.assertRaises(AssertionError) as raised, check_queries():
+            self.client.get('/naive/')
+        report = str(raised.exception)
+        self.assertIn('GET /naive/: 9 queries', report)
+        self.assertIn('4x SELECT "recipe_api_cuisinetype"."id", "recipe_api_cuisinetype"."name" FROM', report)
+        self.assertIn('from RecipeSerializer.cuisine_types', report)
+        self.assertIn('from RecipeSerializer.dietary_preferences', report)
+
+    def test_prefetched_relations_pass(self):
+        with check_queries() as recorder:
+            self.client.get('/naive/?prefetch=1')
+        self.assertEqual(len(recorder.requests), 1)
+        self.assertEqual(len(recorder.requests[0].queries), 3)
+
+    def test_thresholds(self):
+        with self.assertRaisesRegex(AssertionError, '3 queries, more than 2'), check_queries(max_queries=2):
+            self.client.get('/naive/?prefetch=1')
+        with check_queries(repeat_threshold=5):
+            self.client.get('/naive/')
+
+    @override_settings(DEBUG=True, QUERY_CHECK={'PANEL': True})
+    def test_dev_panel(self):
+        response = self.client.get('/naive/')
+        self.assertEqual(response['X-Query-Count'], '9')
+        self.assertIn('4x SELECT', response['X-Query-Warnings'])
+
+        response = self.client.get('/naive/', HTTP_ACCEPT='text/html')
+        self.assertContains(response, '<div id="query-check"')
+        self.assertContains(response, 'from RecipeSerializer.cuisine_types')
+
+        response = self.client.get('/naive/?prefetch=1')
+        self.assertEqual(response['X-Query-Count'], '3')
+        self.assertNotIn('X-Query-Warnings', response)
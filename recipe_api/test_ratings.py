@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Rating, Recipe
+
+
+@override_settings(RATING_PRIOR_MEAN=3.0, RATING_PRIOR_WEIGHT=2)
+class RatingAggregateTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='rater',
+            email='rater@example.com',
+            password='testpass123'
+        )
+        self.other = CustomUser.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = self.make_recipe('Flan')
+
+    def make_recipe(self, title):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            description='',
+            ingredients='milk',
+            instructions='Bake',
+            prep_time=10,
+            servings=2,
+            meal_type='dessert',
+        )
+
+    def assert_aggregates(self, recipe, count, total):
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.rating_count, recipe.rating_sum), (count, total))
+        self.assertAlmostEqual(recipe.rating_score, (3.0 * 2 + total) / (2 + count))
+
+    def test_create_update_and_delete_keep_aggregates_in_sync(self):
+        url = reverse('recipe-rate', args=[self.recipe.id])
+        self.client.post(url, {'score': 4})
+        self.assert_aggregates(self.recipe, 1, 4)
+
+        # Re-rating goes through update_or_create and must not add a vote.
+        self.client.post(url, {'score': 2})
+        self.assert_aggregates(self.recipe, 1, 2)
+
+        Rating.objects.create(user=self.other, recipe=self.recipe, score=5)
+        self.assert_aggregates(self.recipe, 2, 7)
+
+        Rating.objects.get(user=self.user).delete()
+        self.assert_aggregates(self.recipe, 1, 5)
+
+    def test_saving_a_stale_recipe_keeps_aggregates(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Rating.objects.create(user=self.other, recipe=self.recipe, score=5)
+        stale.title = 'Creme caramel'
+        stale.save()
+        self.assert_aggregates(self.recipe, 1, 5)
+
+    def test_reconcile_command(self):
+        Rating.objects.create(user=self.user, recipe=self.recipe, score=4)
+        Rating.objects.create(user=self.other, recipe=self.recipe, score=2)
+        Recipe.objects.update(rating_count=0, rating_sum=0, rating_score=0)
+
+        call_command('reconcile_ratings', chunk_size=1, stdout=StringIO())
+
+        self.assert_aggregates(self.recipe, 2, 6)
+
+    def test_top_rated_ordering(self):
+        loved = self.make_recipe('Tiramisu')
+        Rating.objects.create(user=self.user, recipe=loved, score=5)
+        Rating.objects.create(user=self.user, recipe=self.recipe, score=1)
+        self.make_recipe('Unrated')
+
+        response = self.client.get(reverse('recipe-list'), {'ordering': 'top_rated'})
+
+        self.assertEqual(
+            [recipe['title'] for recipe in response.data['results']],
+            ['Tiramisu', 'Unrated', 'Flan']
+        )
+        self.assertEqual(response.data['results'][0]['average_rating'], 5.0)
@@ -0,0 +1,109 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import FavoriteRecipe, Rating, Recipe, RecommendedRecipe
+from .recommendations import Interactions, evaluate, split_holdout, synthetic_interactions, train_recommendations
+
+
+class RecommendationEvaluationTests(SimpleTestCase):
+    def test_from_pairs_sums_repeated_entries(self):
+        interactions = Interactions.from_pairs([7, 3, 7], [10, 20, 10], [1.0, 2.0, 3.0])
+
+        self.assertEqual(interactions.shape, (2, 2))
+        self.assertEqual(interactions.user_ids.tolist(), [3, 7])
+        self.assertEqual(list(zip(interactions.rows, interactions.columns, interactions.values)), [(0, 1, 2.0), (1, 0, 4.0)])
+
+    def test_holdout_keeps_one_entry_users_in_training(self):
+        interactions = Interactions.from_pairs([1, 2, 2, 2, 2, 2], [1, 1, 2, 3, 4, 5], np.ones(6))
+
+        train, test = split_holdout(interactions, fraction=0.4)
+
+        self.assertEqual(test.rows.tolist(), [1, 1])
+        self.assertEqual(len(train), 4)
+        self.assertEqual(sorted(train.columns[train.rows == 1].tolist() + test.columns.tolist()), [0, 1, 2, 3, 4])
+
+    def test_model_beats_popularity_on_taste_groups(self):
+        result = evaluate(synthetic_interactions(300, 200, 10, clusters=5), k=5, iterations=5)
+
+        self.assertEqual(result['users'], 300)
+        self.assertGreater(result['precision'], 2 * result['popularity_precision'])
+
+
+class ForYouTests(APITestCase):
+    def setUp(self):
+        self.chef = self.make_user('chef')
+        self.sweet = [self.make_recipe(f'Cake {i}', 'dessert') for i in range(3)]
+        self.savory = [self.make_recipe(f'Stew {i}', 'dinner') for i in range(3)]
+        # Two taste groups that each favorite their own recipes.
+        self.sweet_fans = [self.make_user(f'sweet{i}') for i in range(4)]
+        savory_fans = [self.make_user(f'savory{i}') for i in range(4)]
+        for fans, recipes in ((self.sweet_fans, self.sweet), (savory_fans, self.savory)):
+            for fan in fans:
+                for recipe in recipes:
+                    FavoriteRecipe.objects.create(user=fan, recipe=recipe)
+        self.reader = self.make_user('reader')
+        self.client.force_authenticate(user=self.reader)
+        self.url = reverse('recipe-for-you')
+
+    def make_user(self, name):
+        return CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+
+    def make_recipe(self, title, meal_type, user=None, **kwargs):
+        return Recipe.objects.create(
+            user=user or self.chef, title=title, description='', ingredients='salt',
+            instructions='Cook', prep_time=10, servings=2, meal_type=meal_type, **kwargs
+        )
+
+    def titles(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data]
+
+    def test_candidates_follow_the_users_taste(self):
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.sweet[0])
+        Rating.objects.create(user=self.reader, recipe=self.sweet[1], score=5)
+        train_recommendations(factors=4, iterations=10)
+
+        titles = self.titles()
+        self.assertEqual(titles[0], 'Cake 2')
+        self.assertNotIn('Cake 0', titles)
+        self.assertNotIn('Cake 1', titles)
+
+    def test_cold_start_users_get_popular_recipes(self):
+        popular = self.make_recipe('Crowd pleaser', 'snack')
+        for name in ('fan1', 'fan2', 'fan3', 'fan4', 'fan5'):
+            FavoriteRecipe.objects.create(user=self.make_user(name), recipe=popular)
+        train_recommendations(factors=4, iterations=2, candidates=3)
+
+        self.assertFalse(RecommendedRecipe.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.titles()[0], 'Crowd pleaser')
+        self.assertEqual(len(self.titles()), 3)
+
+    def test_own_and_private_recipes_are_never_candidates(self):
+        own = self.make_recipe('My cake', 'dessert', user=self.reader)
+        secret = self.make_recipe('Secret cake', 'dessert', is_public=False)
+        for fan in self.sweet_fans:
+            FavoriteRecipe.objects.create(user=fan, recipe=own)
+            FavoriteRecipe.objects.create(user=fan, recipe=secret)
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.sweet[0])
+        train_recommendations(factors=4, iterations=10)
+
+        candidates = set(RecommendedRecipe.objects.filter(user__isnull=False).values_list('recipe__title', flat=True))
+        self.assertNotIn('Secret cake', candidates)
+        self.assertNotIn('My cake', self.titles())
+
+    def test_trainer_command_and_single_read(self):
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.savory[0])
+        out = StringIO()
+        call_command('train_recommendations', '--factors', '4', stdout=out)
+
+        self.assertIn('25 interactions from 9 users on 6 recipes', out.getvalue())
+        # The candidates join plus the two taxonomy prefetches.
+        with self.assertNumQueries(3):
+            self.titles()
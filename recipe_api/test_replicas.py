@@ -0,0 +1,95 @@
+import random
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.db import OperationalError, connections, transaction
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from .checks import check_shared_caches
+from .models import Recipe
+from .replicas import ReplicaRouter, health, pin
+
+REPLICATION = {'REPLICAS': {'replica_1': 3, 'replica_2': 1}, 'STICKY_SECONDS': 60}
+
+
+@override_settings(DATABASE_REPLICATION=REPLICATION, RESPONSE_CACHE={'ENABLED': False})
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica_1', 'replica_2'}
+
+    def setUp(self):
+        health.reset()
+        self.user = CustomUser.objects.create_user(
+            username='cook', email='cook@example.com', password='testpass123'
+        )
+        # Each database gets its own copy, so the titles show where a read went.
+        # bulk_create goes to the given database and skips the signals, which
+        # write derived rows to the primary.
+        for alias in self.databases:
+            if alias != 'default':
+                CustomUser.objects.using(alias).bulk_create([CustomUser(
+                    pk=self.user.pk, username='cook', email='cook@example.com', password=self.user.password,
+                )])
+            Recipe.objects.using(alias).bulk_create([Recipe(
+                user_id=self.user.pk, title=f'Stew from {alias}', description='', ingredients='beans',
+                instructions='Cook', prep_time=10, servings=2, meal_type='dinner',
+            )])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def listed_from(self, client=None):
+        response = (client or self.client).get(reverse('recipe-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results'][0]['title'].removeprefix('Stew from ')
+
+    def test_reads_are_spread_by_weight(self):
+        random.seed(7)
+        router = ReplicaRouter()
+        picks = [router.db_for_read(Recipe) for _ in range(4000)]
+        self.assertEqual(set(picks), {'replica_1', 'replica_2'})
+        self.assertAlmostEqual(picks.count('replica_1') / len(picks), 0.75, delta=0.03)
+
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self.assertIn(self.listed_from(), ('replica_1', 'replica_2'))
+
+        recipe = Recipe.objects.get()
+        response = self.client.post(reverse('recipe-rate', args=[recipe.id]), {'score': 5})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.listed_from(), 'default')
+        # Anonymous readers and other users still use the replicas.
+        self.assertIn(self.listed_from(APIClient()), ('replica_1', 'replica_2'))
+
+    @override_settings(ROOT_URLCONF='recipe_sharing.asgi_urls')
+    async def test_async_views_follow_the_pin(self):
+        client, headers = AsyncClient(), {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        response = await client.get(reverse('recipe-list'), headers=headers)
+        self.assertIn(response.json()['results'][0]['title'], ('Stew from replica_1', 'Stew from replica_2'))
+
+        await sync_to_async(pin)(self.user.pk)
+        response = await client.get(reverse('recipe-list'), headers=headers)
+        self.assertEqual(response.json()['results'][0]['title'], 'Stew from default')
+
+    def test_unhealthy_replica_falls_back(self):
+        with mock.patch.object(connections['replica_1'], 'ensure_connection', side_effect=OperationalError):
+            self.assertEqual({self.listed_from() for _ in range(10)}, {'replica_2'})
+
+        health.reset()
+        with override_settings(DATABASE_REPLICATION={**REPLICATION, 'REPLICAS': {'replica_1': 1}}):
+            with mock.patch.object(connections['replica_1'], 'ensure_connection', side_effect=OperationalError):
+                self.assertEqual(self.listed_from(), 'default')
+
+    def test_process_local_pin_cache_is_reported(self):
+        warnings = [warning.msg for warning in check_shared_caches(None)]
+        self.assertTrue(any(message.startswith("DATABASE_REPLICATION['ALIAS']") for message in warnings))
+        with override_settings(DATABASE_REPLICATION={**REPLICATION, 'REPLICAS': {}}):
+            warnings = [warning.msg for warning in check_shared_caches(None)]
+        self.assertFalse(any(message.startswith("DATABASE_REPLICATION['ALIAS']") for message in warnings))
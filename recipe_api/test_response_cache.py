@@ -0,0 +1,89 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .checks import check_shared_caches
+from .models import CuisineType, Rating, Recipe
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cached',
+            email='cached@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Bibimbap',
+            description='',
+            ingredients='rice',
+            instructions='Cook',
+            prep_time=10,
+            servings=2,
+            meal_type='dinner',
+        )
+        self.detail_url = reverse('recipe-detail', args=[self.recipe.id])
+
+    def test_detail_is_served_from_cache(self):
+        first = self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertNotIn('Last-Modified', second)
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        etag = self.client.get(reverse('recipe-list'))['ETag']
+        response = self.client.get(reverse('recipe-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # If-Modified-Since alone is never answered from the cache with a 304.
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_recipe_changes_invalidate(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.get(reverse('recipe-list'))
+
+        self.recipe.title = 'Dolsot bibimbap'
+        self.recipe.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Dolsot bibimbap')
+        titles = [recipe['title'] for recipe in self.client.get(reverse('recipe-list')).data['results']]
+        self.assertEqual(titles, ['Dolsot bibimbap'])
+
+    def test_m2m_and_rating_changes_invalidate(self):
+        self.client.get(self.detail_url)
+        korean = CuisineType.objects.create(name='Korean')
+        korean.recipe_set.add(self.recipe)
+        self.assertEqual(self.client.get(self.detail_url).data['cuisine_types'], [korean.id])
+
+        Rating.objects.create(user=self.user, recipe=self.recipe, score=5)
+        self.assertEqual(self.client.get(self.detail_url).data['rating_count'], 1)
+
+    def test_stats_require_admin(self):
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        self.assertEqual(self.client.get(reverse('response-cache-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get(reverse('response-cache-stats')).data
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_process_local_cache_is_reported(self):
+        def reported():
+            return any(warning.msg.startswith("RESPONSE_CACHE['ALIAS']") for warning in check_shared_caches(None))
+
+        self.assertTrue(reported())
+        with override_settings(RESPONSE_CACHE={'ENABLED': False}):
+            self.assertFalse(reported())
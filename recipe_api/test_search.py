@@ -0,0 +1,80 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Recipe, Tag
+from .search import get_search_backend
+
+
+class RecipeSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='searcher',
+            email='searcher@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        get_search_backend().reset()
+        self.url = reverse('recipe-search')
+
+    def make_recipe(self, title, description='', ingredients='', **kwargs):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            description=description,
+            ingredients=ingredients,
+            instructions='Cook',
+            prep_time=10,
+            servings=2,
+            meal_type='dinner',
+            **kwargs
+        )
+
+    def search(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in response.data['results']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.make_recipe('Weeknight dinner', description='A quick garlic pasta')
+        self.make_recipe('Garlic Pasta')
+        self.assertEqual(self.search('garlic pasta'), ['Garlic Pasta', 'Weeknight dinner'])
+
+    def test_searches_ingredients_and_tags(self):
+        recipe = self.make_recipe('Shakshuka', ingredients='eggs\ntomatoes\nfeta')
+        tag = Tag.objects.create(name='brunch')
+        tag.recipes.add(recipe)
+        self.assertEqual(self.search('feta'), ['Shakshuka'])
+        self.assertEqual(self.search('brunch'), ['Shakshuka'])
+
+    def test_last_term_matches_as_prefix(self):
+        self.make_recipe('Chocolate cake')
+        self.assertEqual(self.search('choc'), ['Chocolate cake'])
+
+    def test_private_recipes_are_not_returned(self):
+        self.make_recipe('Secret stew', is_public=False)
+        self.assertEqual(self.search('stew'), [])
+
+    def test_index_is_updated_incrementally(self):
+        self.assertEqual(self.search('lasagna'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.make_recipe('Lasagna')
+        self.assertEqual(self.search('lasagna'), ['Lasagna'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.title = 'Moussaka'
+            recipe.save()
+        self.assertEqual(self.search('lasagna'), [])
+        self.assertEqual(self.search('moussaka'), ['Moussaka'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.search('moussaka'), [])
+
+    def test_results_are_paginated(self):
+        for i in range(12):
+            self.make_recipe(f'Soup {i}')
+        response = self.client.get(self.url, {'q': 'soup'})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import CuisineType, FavoriteRecipe, Recipe, SimilarRecipe, SimilarityJob
+from .similarity import build_similar_recipes
+
+
+class SimilarRecipesTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.italian = CuisineType.objects.create(name='Italian')
+        self.pomodoro = self.make_recipe('Pomodoro', 'spaghetti\ntomato\nbasil\ngarlic', cuisine=self.italian)
+        self.arrabbiata = self.make_recipe('Arrabbiata', 'spaghetti\ntomato\nchili\ngarlic', cuisine=self.italian)
+        self.brownies = self.make_recipe('Brownies', 'chocolate\nsugar\nbutter\negg', meal_type='dessert')
+        self.cookies = self.make_recipe('Cookies', 'flour\nsugar\nbutter\negg', meal_type='dessert')
+
+    def make_recipe(self, title, ingredients, meal_type='dinner', cuisine=None, **kwargs):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, description='', ingredients=ingredients,
+            instructions='Cook', prep_time=10, servings=2, meal_type=meal_type, **kwargs
+        )
+        if cuisine:
+            recipe.cuisine_types.add(cuisine)
+        return recipe
+
+    def similar_titles(self, recipe):
+        response = self.client.get(reverse('recipe-similar', args=[recipe.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data]
+
+    def test_neighbours_are_ranked_by_shared_features(self):
+        self.make_recipe('Secret sauce', 'spaghetti\ntomato\nbasil\ngarlic', cuisine=self.italian, is_public=False)
+        out = StringIO()
+        call_command('build_similar_recipes', stdout=out)
+
+        self.assertIn('Full run updated similar recipes of 4 recipes', out.getvalue())
+        self.assertEqual(self.similar_titles(self.pomodoro)[0], 'Arrabbiata')
+        self.assertEqual(self.similar_titles(self.brownies)[0], 'Cookies')
+        self.assertNotIn('Secret sauce', self.similar_titles(self.pomodoro))
+        scores = list(SimilarRecipe.objects.filter(recipe=self.pomodoro).order_by('rank').values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_scores_are_computed_in_column_blocks(self):
+        def neighbours():
+            return list(SimilarRecipe.objects.order_by('recipe_id', 'rank').values_list('recipe_id', 'similar_id'))
+
+        build_similar_recipes(full=True)
+        whole = neighbours()
+        # One column per block.
+        with override_settings(SIMILAR_RECIPES={'SCORE_BLOCK_BYTES': 4}):
+            build_similar_recipes(full=True)
+        self.assertEqual(neighbours(), whole)
+
+    def test_lookup_is_a_single_indexed_read(self):
+        build_similar_recipes()
+        # The neighbours join plus the two taxonomy prefetches.
+        with self.assertNumQueries(3):
+            self.similar_titles(self.pomodoro)
+
+    def test_co_favorites_pull_recipes_together(self):
+        build_similar_recipes(k=1)
+        self.assertEqual(self.similar_titles(self.brownies), ['Cookies'])
+
+        for name in ('fan1', 'fan2', 'fan3'):
+            fan = CustomUser.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+            FavoriteRecipe.objects.create(user=fan, recipe=self.brownies)
+            FavoriteRecipe.objects.create(user=fan, recipe=self.arrabbiata)
+
+        with self.settings(SIMILAR_RECIPES={'WEIGHTS': {'taxonomy': 0.2, 'ingredients': 0.2, 'favorites': 1.0}}):
+            job = build_similar_recipes(k=1, full=True)
+        self.assertEqual(job.recipes_updated, 4)
+        self.assertEqual(self.similar_titles(self.brownies), ['Arrabbiata'])
+
+    def test_incremental_run_only_recomputes_affected_recipes(self):
+        build_similar_recipes(k=1)
+        untouched = SimilarRecipe.objects.get(recipe=self.brownies).pk
+
+        carbonara = self.make_recipe('Carbonara', 'spaghetti\ntomato\nbasil\ngarlic\nchili', cuisine=self.italian)
+        job = build_similar_recipes(k=1)
+
+        self.assertFalse(job.full)
+        # Carbonara itself plus the two pastas it displaced.
+        self.assertEqual(job.recipes_updated, 3)
+        self.assertEqual(self.similar_titles(self.pomodoro), ['Carbonara'])
+        self.assertEqual(self.similar_titles(carbonara)[0], 'Pomodoro')
+        self.assertEqual(SimilarRecipe.objects.get(recipe=self.brownies).pk, untouched)
+        self.assertEqual(SimilarityJob.objects.filter(finished_at__isnull=False).count(), 2)
+
+    def test_recipes_made_private_leave_neighbour_lists(self):
+        build_similar_recipes(k=1)
+        self.cookies.is_public = False
+        self.cookies.save()
+
+        build_similar_recipes(k=1)
+
+        self.assertFalse(SimilarRecipe.objects.filter(recipe=self.cookies).exists())
+        self.assertFalse(SimilarRecipe.objects.filter(similar=self.cookies).exists())
+        self.assertNotIn('Cookies', self.similar_titles(self.brownies))
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from .checks import check_shared_caches
+from .models import Recipe
+from .throttling import SlidingWindowLimiter, client_ip
+
+
+class ClientAddressTests(SimpleTestCase):
+    def test_forwarded_for_needs_trusted_proxies(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.1')
+        self.assertEqual(client_ip(request), '10.0.0.9')
+        with override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1}):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+        with override_settings(REST_FRAMEWORK={'NUM_PROXIES': 2}):
+            self.assertEqual(client_ip(request), '1.2.3.4')
+
+    def test_process_local_cache_is_reported(self):
+        warnings = check_shared_caches(None)
+        self.assertEqual({warning.id for warning in warnings}, {'recipe_api.W001'})
+        self.assertTrue(any(warning.msg.startswith("RATE_LIMITS['ALIAS']") for warning in warnings))
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(check_shared_caches(None), [])
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowLimiter(cache)
+
+    def test_previous_window_fades_out(self):
+        for _ in range(4):
+            self.assertIsNone(self.limiter.hit([('k', 4, 60)], now=10))
+        self.assertEqual(self.limiter.hit([('k', 4, 60)], now=20), ('k', 64))
+
+        # 21s into the next window, 5 * 0.65 earlier requests still count.
+        self.assertEqual(self.limiter.hit([('k', 4, 60)], now=81), ('k', 15))
+        # After Retry-After, 5 * 0.4 + 2 fits exactly.
+        self.assertIsNone(self.limiter.hit([('k', 4, 60)], now=96))
+        self.assertIsNotNone(self.limiter.hit([('k', 4, 60)], now=96))
+
+
+RULES = {
+    'recipe-save': {'user': '2/min', 'ip': '3/min'},
+    'login': {'ip': '2/min'},
+    'recipe-comment': {'endpoint': '1/min'},
+}
+
+
+@override_settings(RATE_LIMITS={'RULES': RULES})
+class RateLimitMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.cook = CustomUser.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.guest = CustomUser.objects.create_user(username='guest', email='guest@example.com', password='testpass123')
+        self.recipe = Recipe.objects.create(
+            user=self.cook, title='Ramen', description='', ingredients='noodles',
+            instructions='Cook', prep_time=10, servings=2, meal_type='dinner',
+        )
+        self.save_url = reverse('recipe-save', args=[self.recipe.id])
+
+    def post(self, url, user=None, ip='10.0.0.1', **data):
+        headers = {'REMOTE_ADDR': ip}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        return self.client.post(url, data, **headers)
+
+    def test_user_scope_comes_from_the_access_token(self):
+        self.assertEqual(self.post(self.save_url, self.cook).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post(self.save_url, self.cook).status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.post(self.save_url, self.cook)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Another user from the same address still has budget until the IP limit.
+        self.assertEqual(self.post(self.save_url, self.guest).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post(self.save_url, self.guest, ip='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_login_is_limited_per_ip_before_checking_credentials(self):
+        credentials = {'email': 'cook@example.com', 'password': 'wrong'}
+        self.post(reverse('login'), **credentials)
+        self.post(reverse('login'), **credentials)
+
+        with self.assertNumQueries(0):
+            response = self.post(reverse('login'), **credentials)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotEqual(self.post(reverse('login'), ip='10.0.0.2', **credentials).status_code, 429)
+        # A made-up X-Forwarded-For does not buy a fresh budget.
+        response = self.client.post(
+            reverse('login'), credentials, REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.7',
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_endpoint_scope_is_shared_and_reads_are_not_limited(self):
+        url = reverse('recipe-comment', args=[self.recipe.id])
+        self.assertEqual(self.post(url, self.cook, content='First').status_code, status.HTTP_201_CREATED)
+        response = self.post(url, self.guest, ip='10.0.0.2', content='Second')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.client.force_authenticate(user=self.guest)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_rejections_are_counted(self):
+        for _ in range(3):
+            self.post(reverse('login'))
+        self.post(reverse('recipe-comment', args=[self.recipe.id]), self.cook, content='First')
+
+        url = reverse('rate-limit-stats')
+        self.client.force_authenticate(user=self.cook)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_authenticate(user=admin)
+        self.assertEqual(self.client.get(url).data, {
+            'recipe-save': {'user': 0, 'ip': 0},
+            'login': {'ip': 1},
+            'recipe-comment': {'endpoint': 0},
+        })
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from .models import Recipe, RecipeActivityBucket, TrendingRecipe
+from .trending import bucket_start, refresh_trending
+
+
+@override_settings(TRENDING={
+    'WEIGHTS': {'rating': 1, 'comment': 2, 'favorite': 3, 'share': 4},
+    'HALF_LIFE': timedelta(hours=10),
+    'WINDOW': timedelta(hours=48),
+    'SIZE': 3,
+})
+class TrendingTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cook',
+            email='cook@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = self.make_recipe('Shakshuka')
+        self.now = bucket_start(timezone.now())
+
+    def make_recipe(self, title, **kwargs):
+        return Recipe.objects.create(
+            user=self.user, title=title, description='', ingredients='egg',
+            instructions='Cook', prep_time=5, servings=1, meal_type='breakfast', **kwargs
+        )
+
+    def add_points(self, recipe, hours_ago, points):
+        RecipeActivityBucket.objects.create(recipe=recipe, hour=self.now - timedelta(hours=hours_ago), points=points)
+
+    def test_interactions_increment_the_current_bucket(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('recipe-rate', args=[self.recipe.id]), {'score': 5})
+            self.client.post(reverse('recipe-rate', args=[self.recipe.id]), {'score': 4})
+            self.client.post(reverse('recipe-comment', args=[self.recipe.id]), {'content': 'Lovely'})
+            self.client.post(reverse('recipe-save', args=[self.recipe.id]))
+            self.client.post(reverse('recipe-save', args=[self.recipe.id]))
+            self.client.post(reverse('recipe-share', args=[self.recipe.id]), {'share_type': 'email'})
+
+        bucket = RecipeActivityBucket.objects.get(recipe=self.recipe)
+        self.assertEqual(bucket.hour, bucket_start(timezone.now()))
+        # Re-rating and re-saving do not count again.
+        self.assertEqual(bucket.points, 1 + 2 + 3 + 4)
+
+    def test_older_activity_decays(self):
+        steady = self.make_recipe('Steady')
+        self.add_points(self.recipe, 0, 10)
+        self.add_points(steady, 0, 4)
+        self.add_points(steady, 10, 20)  # one half-life ago: worth 10
+
+        refresh_trending(self.now)
+
+        trending = list(TrendingRecipe.objects.order_by('rank').values_list('recipe_id', 'score'))
+        self.assertEqual([recipe_id for recipe_id, _ in trending], [steady.id, self.recipe.id])
+        self.assertAlmostEqual(trending[0][1], 14.0)
+
+    def test_refresh_keeps_size_public_recipes_and_prunes_old_buckets(self):
+        hidden = self.make_recipe('Hidden', is_public=False)
+        self.add_points(hidden, 0, 100)
+        for i in range(4):
+            self.add_points(self.make_recipe(f'Dish {i}'), 0, i + 1)
+        self.add_points(self.recipe, 48, 1000)
+
+        out = StringIO()
+        with self.settings(TRENDING={'SIZE': 3, 'WINDOW': timedelta(hours=48)}):
+            call_command('refresh_trending', stdout=out)
+
+        self.assertIn('Trending list rebuilt with 3 recipes', out.getvalue())
+        self.assertEqual(
+            list(TrendingRecipe.objects.order_by('rank').values_list('recipe__title', flat=True)),
+            ['Dish 3', 'Dish 2', 'Dish 1'],
+        )
+        self.assertFalse(RecipeActivityBucket.objects.filter(recipe=self.recipe).exists())
+
+    def test_endpoint_reads_one_page_of_the_materialized_list(self):
+        for i in range(3):
+            self.add_points(self.make_recipe(f'Dish {i}'), 0, i + 1)
+        refresh_trending(self.now)
+        Recipe.objects.filter(title='Dish 1').update(is_public=False)
+
+        # Count, page and the two taxonomy prefetches.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('recipe-trending'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Dish 2', 'Dish 0'])
@@ -0,0 +1,189 @@
+"""
+Rate limiting of write endpoints.
+
+``RateLimitMiddleware`` checks requests in ``process_view``, which runs
+after URL resolution but before the view authenticates the user or
+touches the database. ``RATE_LIMITS['RULES']`` maps URL names to a rate
+(``'30/min'``) per scope:
+
+* ``user``: the ``user_id`` claim of a valid JWT access token. The
+  signature is checked here, without a database lookup, so a forged token
+  cannot spend someone else's budget. Requests without a token skip this
+  scope and are still limited per IP.
+* ``ip``: ``REMOTE_ADDR``. Only when DRF's ``NUM_PROXIES`` says how many
+  trusted proxies append to ``X-Forwarded-For`` is the address taken from
+  that header, as the one the outermost proxy saw; a client can put
+  anything in it.
+* ``endpoint``: every client together, to cap the write load of a view.
+
+Each scope is a sliding window counter. Requests are counted in fixed
+windows with an atomic ``incr`` on the shared cache, and the previous window is weighted by how much of it
+still overlaps the sliding window. Only ``incr`` is atomic through
+Django's cache API, so a token bucket would need a read-modify-write
+race or backend-specific scripting. Rejected requests also count, which
+keeps a bot that retries in a tight loop locked out. The limits only hold
+across workers with a shared cache (``REDIS_URL``): with locmem every
+worker counts on its own, and ``manage.py check`` warns about it.
+
+A rejection returns 429 with ``Retry-After`` and increments a per-endpoint
+and per-scope counter reported by ``/ratelimit/stats/``.
+"""
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'ENABLED': True,
+    'METHODS': ('POST', 'PUT', 'PATCH', 'DELETE'),
+    'RULES': {},
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+REJECTED_KEY = 'ratelimit:rejected:{name}:{scope}'
+
+
+def limit_setting(name):
+    return getattr(settings, 'RATE_LIMITS', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[limit_setting('ALIAS')]
+
+
+def parse_rate(rate):
+    """``'30/min'`` -> ``(30, 60)``; the period is read from its first letter."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def client_ip(request):
+    remote = request.META.get('REMOTE_ADDR')
+    proxies = api_settings.NUM_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not proxies or not forwarded:
+        return remote
+    addresses = [address.strip() for address in forwarded.split(',')]
+    return addresses[-min(proxies, len(addresses))]
+
+
+def token_user_id(request):
+    """User id of a valid access token in the Authorization header, checked without the database."""
+    parts = request.META.get(jwt_settings.AUTH_HEADER_NAME, '').split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(parts[1]).get(jwt_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class SlidingWindowLimiter:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _incr(self, key, timeout):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            if self.cache.add(key, 1, timeout):
+                return 1
+            return self.cache.incr(key)
+
+    def hit(self, checks, now=None):
+        """
+        Count one request against each ``(key, limit, window)`` and return
+        ``(key, retry_after)`` for the first one over its limit, or ``None``.
+        """
+        now = time.time() if now is None else now
+        slots = [(key, limit, window, int(now // window)) for key, limit, window in checks]
+        previous = self.cache.get_many([f'{key}:{slot - 1}' for key, _, _, slot in slots])
+        for key, limit, window, slot in slots:
+            count = self._incr(f'{key}:{slot}', 2 * window)
+            earlier = previous.get(f'{key}:{slot - 1}', 0)
+            elapsed = now - slot * window
+            if earlier * (1 - elapsed / window) + count > limit:
+                return key, self.retry_after(limit, window, elapsed, earlier, count)
+        return None
+
+    @staticmethod
+    def retry_after(limit, window, elapsed, earlier, count):
+        """Seconds until one more request fits under ``limit`` if none arrive meanwhile."""
+        room = limit - 1
+        if count > room:
+            # Wait for this window to become the previous one and fade enough.
+            wait = (window - elapsed) + window * (1 - room / count)
+        else:
+            wait = window * (1 - (room - count) / earlier) - elapsed
+        return max(1, math.ceil(wait))
+
+
+def record_rejection(name, scope):
+    cache = get_cache()
+    key = REJECTED_KEY.format(name=name, scope=scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def rejection_stats():
+    """Rejected requests per URL name and scope, for the configured rules."""
+    rules = limit_setting('RULES')
+    keys = {
+        (name, scope): REJECTED_KEY.format(name=name, scope=scope)
+        for name, scopes in rules.items() for scope in scopes
+    }
+    counts = get_cache().get_many(keys.values())
+    stats = {}
+    for (name, scope), key in keys.items():
+        stats.setdefault(name, {})[scope] = counts.get(key, 0)
+    return stats
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not limit_setting('ENABLED') or request.method not in limit_setting('METHODS'):
+            return None
+        name = request.resolver_match.url_name if request.resolver_match else None
+        rules = limit_setting('RULES').get(name)
+        if not rules:
+            return None
+
+        identities = {'endpoint': 'all'}
+        if 'ip' in rules:
+            identities['ip'] = client_ip(request)
+        if 'user' in rules:
+            identities['user'] = token_user_id(request)
+        checks, scopes = [], {}
+        for scope, rate in rules.items():
+            identity = identities[scope]
+            if identity is None:
+                continue
+            limit, window = parse_rate(rate)
+            key = f'ratelimit:{name}:{scope}:{identity}'
+            checks.append((key, limit, window))
+            scopes[key] = scope
+
+        rejected = SlidingWindowLimiter(get_cache()).hit(checks)
+        if rejected is None:
+            return None
+        key, retry_after = rejected
+        record_rejection(name, scopes[key])
+        logger.info("Rate limited %s on %s (%s scope)", identities.get(scopes[key]), name, scopes[key])
+        response = JsonResponse(
+            {'detail': f'Request was throttled. Expected available in {retry_after} seconds.'}, status=429
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
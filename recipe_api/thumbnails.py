@@ -0,0 +1,52 @@
+"""
+Pillow rendering for the image pipeline in ``recipe_api.images``.
+
+This module deliberately imports nothing from Django so it can run in
+``ProcessPoolExecutor`` workers: ``render_variants`` takes and returns
+plain bytes.
+"""
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+def content_hash(data, *params):
+    """Name of what ``data`` renders to with ``params``: new settings must not reuse an immutable name."""
+    digest = hashlib.sha256(data)
+    digest.update(repr(params).encode())
+    return digest.hexdigest()[:32]
+
+
+def _encode(image, image_format, quality):
+    buffer = BytesIO()
+    # A fresh image carries no EXIF/XMP/ICC metadata unless it is passed to save().
+    options = {'method': 4} if image_format == 'WEBP' else {}
+    image.save(buffer, format=image_format, quality=quality, **options)
+    return buffer.getvalue()
+
+
+def render_variants(data, widths, max_dimension, image_format='WEBP', quality=80):
+    """
+    Decode ``data`` once and return ``(digest, {label: bytes})``, the digest
+    covering ``data`` and the rendering arguments, where the labels are ``'original'`` (capped at ``max_dimension``) and ``'<width>w'``
+    for each thumbnail width no larger than the image. Orientation from EXIF
+    is applied to the pixels and all metadata is dropped.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    variants = {'original': _encode(image, image_format, quality)}
+    # Each thumbnail is resized from the next larger one, largest first.
+    for width in sorted(widths, reverse=True):
+        if width >= image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        variants[f'{width}w'] = _encode(image, image_format, quality)
+    return content_hash(data, tuple(sorted(widths)), max_dimension, image_format, quality), variants
@@ -0,0 +1,93 @@
+"""
+"Trending now" from time-decayed interaction counters.
+
+The rate, comment, save and share views call ``record()``, which adds the
+event's weight from ``TRENDING['WEIGHTS']`` to the recipe's bucket for the
+current hour once the transaction commits. That is a single-row UPDATE
+(an INSERT for the first event of the hour), so the write paths never
+aggregate anything.
+
+``manage.py refresh_trending`` runs periodically. It sums the buckets of
+the last ``WINDOW`` in one grouped query, multiplying every bucket by
+``0.5 ** (age / HALF_LIFE)``. The best ``SIZE`` public recipes replace
+the rows of ``TrendingRecipe`` and buckets that left the window are
+deleted. ``/recipes/trending/`` then reads one page of that table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .models import RecipeActivityBucket, TrendingRecipe
+
+DEFAULTS = {
+    'WEIGHTS': {'rating': 1, 'comment': 2, 'favorite': 3, 'share': 4},
+    'HALF_LIFE': timedelta(hours=24),
+    'WINDOW': timedelta(days=7),
+    'SIZE': 100,
+}
+
+BUCKET = timedelta(hours=1)
+
+
+def trending_setting(name):
+    return getattr(settings, 'TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record(recipe_id, event):
+    """Count ``event`` (a key of ``WEIGHTS``) for the recipe once the transaction commits."""
+    points = trending_setting('WEIGHTS')[event]
+    hour = bucket_start(timezone.now())
+    transaction.on_commit(lambda: increment(recipe_id, hour, points))
+
+
+def increment(recipe_id, hour, points):
+    buckets = RecipeActivityBucket.objects.filter(recipe_id=recipe_id, hour=hour)
+    if buckets.update(points=F('points') + points):
+        return
+    try:
+        with transaction.atomic():
+            RecipeActivityBucket.objects.create(recipe_id=recipe_id, hour=hour, points=points)
+    except IntegrityError:
+        # Another request created the bucket first (or the recipe is gone).
+        buckets.update(points=F('points') + points)
+
+
+def decayed_scores(now=None):
+    """``{'recipe_id', 'score'}`` rows of public recipes active in the window, best first."""
+    current = bucket_start(now or timezone.now())
+    hours = int(trending_setting('WINDOW') / BUCKET)
+    half_life = trending_setting('HALF_LIFE') / BUCKET
+    decay = Case(
+        *[When(hour=current - age * BUCKET, then=Value(0.5 ** (age / half_life))) for age in range(hours)],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return (
+        RecipeActivityBucket.objects
+        .filter(hour__gt=current - hours * BUCKET, hour__lte=current, recipe__is_public=True)
+        .values('recipe_id')
+        .annotate(score=Sum(F('points') * decay, output_field=FloatField()))
+        .order_by('-score', '-recipe_id')
+    )
+
+
+def refresh_trending(now=None):
+    """Rebuild ``TrendingRecipe`` and drop buckets older than the window; returns the number of rows."""
+    now = now or timezone.now()
+    rows = list(decayed_scores(now)[:trending_setting('SIZE')])
+    with transaction.atomic():
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create([
+            TrendingRecipe(recipe_id=row['recipe_id'], score=row['score'], rank=rank, computed_at=now)
+            for rank, row in enumerate(rows, start=1)
+        ])
+    expired = bucket_start(now) - trending_setting('WINDOW')
+    RecipeActivityBucket.objects.filter(hour__lte=expired).delete()
+    return len(rows)
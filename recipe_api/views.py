@@ -1,11 +1,23 @@
 # views.py
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Count, ExpressionWrapper, F, FloatField
 from rest_framework.authtoken.models import Token
+from recipe_sharing.db import prepared_statements
 from .models import *
 from .serializers import *
+from .bulk import export_recipes, import_recipes
+from .feed import read_feed
+from .ingredients import normalize_name
+from .notifications import mark_read, notify, unread_count
+from .pagination import KeysetPagination, decode_timestamp_cursor, encode_cursor
+from .search import get_search_backend
+from . import comments, facets, instrumentation, response_cache, throttling, trending
 
 class ProfileView(APIView):
     def get(self, request):
@@ -20,50 +32,221 @@ class ProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class RecipeListCreateView(generics.ListCreateAPIView):
-    queryset = Recipe.objects.filter(is_public=True)
+    queryset = Recipe.objects.public().for_list()
     serializer_class = RecipeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        # Served by the recipe_top_rated index on the denormalized score.
+        'top_rated': ('-rating_score', '-id'),
+    }
+    
+    def get_queryset(self):
+        ordering = self.orderings.get(self.request.query_params.get('ordering'), self.orderings['newest'])
+        return super().get_queryset().order_by(*ordering)
+    
+    def filter_queryset(self, queryset):
+        return facets.apply_filters(queryset, facets.parse_filters(self.request.query_params))
+    
+    @prepared_statements()
+    def list(self, request, *args, **kwargs):
+        def build():
+            page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            serializer = self.get_serializer(page, many=True)
+            data = self.get_paginated_response(serializer.data).data
+            if request.query_params.get('facets') == 'true':
+                data['facets'] = facets.facet_counts(facets.parse_filters(request.query_params))
+            return data
+        
+        if not response_cache.is_enabled():
+            return Response(build())
+        return response_cache.cached_response(request, response_cache.list_key(request), build)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 class RecipeDetailView(generics.RetrieveAPIView):
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.with_relations()
     serializer_class = RecipeSerializer
+    
+    @prepared_statements()
+    def retrieve(self, request, *args, **kwargs):
+        if not response_cache.is_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        
+        def build():
+            instance = self.get_object()
+            return self.get_serializer(instance).data
+        
+        return response_cache.cached_response(request, response_cache.detail_key(kwargs['pk']), build)
+
+class RecipeBulkImportView(APIView):
+    """
+    Create recipes from a JSON Lines request body (one recipe object per
+    line), reporting the errors of rejected rows by line number.
+    """
+    def post(self, request):
+        created_ids, errors = import_recipes(request.stream or [], request.user, {'request': request})
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created_ids:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(created_ids), 'ids': created_ids, 'errors': errors}, status=response_status)
 
-class RecipeSearchView(APIView):
+class RecipeExportView(APIView):
+    """Stream the requesting user's recipes as JSON Lines."""
     def get(self, request):
-        query = request.query_params.get('q', '')
-        recipes = Recipe.objects.filter(
-            title__icontains=query, is_public=True
-        ) | Recipe.objects.filter(
-            description__icontains=query, is_public=True
+        recipes = Recipe.objects.filter(user=request.user)
+        response = StreamingHttpResponse(
+            export_recipes(recipes, {'request': request}), content_type='application/x-ndjson'
         )
-        serializer = RecipeSerializer(recipes, many=True)
+        response['Content-Disposition'] = 'attachment; filename="recipes.jsonl"'
+        return response
+
+class RecipeSearchView(generics.ListAPIView):
+    serializer_class = RecipeSerializer
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        ranked_ids = get_search_backend().search(query)
+        page = self.paginate_queryset(ranked_ids)
+        recipe_ids = page if page is not None else list(ranked_ids)
+        recipes = Recipe.objects.for_list().in_bulk(recipe_ids)
+        ranked = [recipes[pk] for pk in recipe_ids if pk in recipes and recipes[pk].is_public]
+        serializer = self.get_serializer(ranked, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
+class RecipePantryView(generics.ListAPIView):
+    """
+    Rank public recipes by how much of their ingredient list is covered by
+    the ``ingredients`` query parameter (comma separated).
+    """
+    serializer_class = PantryRecipeSerializer
+
+    def get_queryset(self):
+        names = {
+            normalize_name(name)
+            for name in self.request.query_params.get('ingredients', '').split(',')
+        }
+        pantry_ids = list(Ingredient.objects.filter(name__in=names - {''}).values_list('id', flat=True))
+        if not pantry_ids:
+            return Recipe.objects.none()
+        return (
+            Recipe.objects.public().for_list()
+            .filter(recipe_ingredients__ingredient_id__in=pantry_ids)
+            .annotate(matched_ingredients=Count('recipe_ingredients'))
+            .annotate(
+                missing_ingredients=F('ingredient_count') - F('matched_ingredients'),
+                coverage=ExpressionWrapper(
+                    F('matched_ingredients') * 1.0 / F('ingredient_count'), output_field=FloatField()
+                ),
+            )
+            .order_by('-coverage', 'missing_ingredients', '-created_at', '-id')
+        )
+
+class RecipeSimilarView(generics.ListAPIView):
+    """Neighbours of a recipe precomputed by ``manage.py build_similar_recipes``."""
+    serializer_class = RecipeSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return (
+            Recipe.objects.public().for_list()
+            .filter(similar_to__recipe_id=self.kwargs['pk'])
+            .order_by('similar_to__rank')
+        )
+
+class RecipeForYouView(generics.ListAPIView):
+    """
+    Personalized candidates written by ``manage.py train_recommendations``,
+    or the most popular recipes for users the model has not seen yet.
+    """
+    serializer_class = RecipeSerializer
+    pagination_class = None
+
+    def candidates(self, user_id):
+        return (
+            Recipe.objects.public().for_list()
+            .filter(recommended_to__user_id=user_id, recommended_to__rank__gte=1)
+            .order_by('recommended_to__rank')
+        )
+
+    def list(self, request, *args, **kwargs):
+        recipes = list(self.candidates(request.user.id))
+        if not recipes:
+            recipes = list(self.candidates(None).exclude(user=request.user))
+        return Response(self.get_serializer(recipes, many=True).data)
+
+class RecipeTrendingView(generics.ListAPIView):
+    """Public recipes of the trending list materialized by ``manage.py refresh_trending``."""
+    serializer_class = RecipeSerializer
+
+    def get_queryset(self):
+        return Recipe.objects.public().for_list().filter(trending__rank__gte=1).order_by('trending__rank')
+
 class RecipeRateView(APIView):
     def post(self, request, pk):
         recipe = Recipe.objects.get(pk=pk)
         serializer = RatingSerializer(data=request.data)
         if serializer.is_valid():
-            Rating.objects.update_or_create(
+            rating, created = Rating.objects.update_or_create(
                 user=request.user,
                 recipe=recipe,
                 defaults=serializer.validated_data
             )
+            if created:
+                notify(recipe.user_id, request.user.id, 'like', recipe.id)
+                trending.record(recipe.id, 'rating')
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class RecipeCommentView(APIView):
+class RecipeCommentView(generics.GenericAPIView):
+    """Comments of a recipe, newest first, in cached keyset pages."""
+    serializer_class = CommentSerializer
+    pagination_class = KeysetPagination
+
+    def get_recipe(self):
+        """The recipe if the user may see it; checked before the page cache, which is shared by all users."""
+        recipes = Recipe.objects.visible_to(self.request.user).only('id', 'user_id')
+        return generics.get_object_or_404(recipes, pk=self.kwargs['pk'])
+
+    def get(self, request, pk):
+        self.get_recipe()
+
+        def build():
+            page = self.paginate_queryset(comments.thread(pk))
+            data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+            return data, comments.page_window(self.paginator)
+
+        return Response(comments.cached_page(request, pk, build))
+
     def post(self, request, pk):
-        recipe = Recipe.objects.get(pk=pk)
+        recipe = self.get_recipe()
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user, recipe=recipe)
+            notify(recipe.user_id, request.user.id, 'comment', recipe.id)
+            trending.record(recipe.id, 'comment')
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Read a comment; only its author may edit or delete it."""
+    serializer_class = CommentSerializer
+
+    def get_queryset(self):
+        queryset = Comment.objects.select_related('user').filter(
+            recipe__in=Recipe.objects.visible_to(self.request.user)
+        )
+        if self.request.method not in permissions.SAFE_METHODS:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
 class RecipeSaveView(APIView):
     def post(self, request, pk):
         recipe = Recipe.objects.get(pk=pk)
@@ -71,6 +254,8 @@ class RecipeSaveView(APIView):
             user=request.user,
             recipe=recipe
         )
+        if created:
+            trending.record(recipe.id, 'favorite')
         return Response(status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 class UserFollowView(APIView):
@@ -80,6 +265,8 @@ class UserFollowView(APIView):
             follower=request.user,
             following=following
         )
+        if created:
+            notify(following.id, request.user.id, 'follow')
         return Response(status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 class RecipeShareView(APIView):
@@ -88,18 +275,84 @@ class RecipeShareView(APIView):
         serializer = RecipeShareSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user, recipe=recipe)
+            trending.record(recipe.id, 'share')
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserRecipesView(generics.ListAPIView):
     serializer_class = RecipeSerializer
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user_id = self.kwargs['user_id']
-        return Recipe.objects.filter(user_id=user_id, is_public=True).order_by('-created_at')
+        return Recipe.objects.public().for_list().filter(user_id=user_id).order_by('-created_at', '-id')
+
+    @prepared_statements()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class HomeFeedView(generics.GenericAPIView):
+    """Recipes from followed users, newest first, paginated with an opaque cursor."""
+    serializer_class = RecipeSerializer
+
+    def get(self, request):
+        page_size = api_settings.PAGE_SIZE
+        cursor = request.query_params.get('cursor')
+        after = decode_timestamp_cursor(cursor) if cursor else None
+        recipes, last_key, has_more = read_feed(request.user, page_size, after)
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(*last_key))
+        serializer = self.get_serializer(recipes, many=True)
+        return Response({'next': next_url, 'previous': None, 'results': serializer.data})
 
 class NotificationView(generics.ListAPIView):
     serializer_class = NotificationSerializer
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
\ No newline at end of file
+        notifications = Notification.objects.filter(recipient=self.request.user)
+        is_read = self.request.query_params.get('is_read')
+        if is_read in ('true', 'false'):
+            notifications = notifications.filter(is_read=is_read == 'true')
+        return notifications.order_by('-created_at', '-id')
+
+    @prepared_statements()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class NotificationUnreadCountView(APIView):
+    @prepared_statements()
+    def get(self, request):
+        return Response({'unread_count': unread_count(request.user.id)})
+
+class NotificationMarkReadView(APIView):
+    def post(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        if serializer.is_valid():
+            updated = mark_read(request.user.id, serializer.validated_data.get('up_to_id'))
+            return Response({'marked_read': updated})
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class RateLimitStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(throttling.rejection_stats())
+
+
+class MetricsView(APIView):
+    authentication_classes = [
+        instrumentation.MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]
+    permission_classes = [permissions.IsAdminUser | instrumentation.HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(instrumentation.render(), content_type=instrumentation.CONTENT_TYPE)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_sharing.settings')
+# Serve the read-heavy endpoints with async views (see recipe_sharing.asgi_urls).
+os.environ.setdefault('ROOT_URLCONF', 'recipe_sharing.asgi_urls')
 
 application = get_asgi_application()
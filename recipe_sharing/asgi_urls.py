@@ -0,0 +1,15 @@
+"""
+URLconf for ASGI deployments: the routes of ``recipe_sharing.urls`` with
+the read-heavy endpoints served by their async variants
+(``recipe_api.async_views``). Selected by ``recipe_sharing.asgi``.
+"""
+from django.urls import path
+
+from recipe_api.async_views import ASYNC_VIEWS
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+    if getattr(pattern, 'name', None) in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,35 @@
+"""
+Helpers for features that coordinate worker processes through a cache.
+
+Such a feature only works when the cache alias it uses is shared by every
+worker. The in-process backends are not: each worker gets its own
+``LocMemCache`` and ``DummyCache`` stores nothing.
+"""
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(cache):
+    """Whether ``cache`` (a backend, not the ``django.core.cache.cache`` proxy) is seen by every process."""
+    return not isinstance(cache, PROCESS_LOCAL_BACKENDS)
+
+
+def incr_many(cache, amounts):
+    """Add ``amounts`` (key -> integer) to counters in ``cache``, creating missing ones without expiry."""
+    if isinstance(cache, RedisCache):
+        # One round trip: INCRBY creates missing keys, and integers are stored unpickled.
+        client = cache._cache.get_client(write=True)
+        pipeline = client.pipeline(transaction=False)
+        for key, amount in amounts.items():
+            pipeline.incrby(cache.make_and_validate_key(key), amount)
+        pipeline.execute()
+        return
+    for key, amount in amounts.items():
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            if not cache.add(key, amount, None):
+                cache.incr(key, amount)
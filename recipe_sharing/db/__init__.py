@@ -0,0 +1,31 @@
+"""
+PostgreSQL backend with opt-in prepared statements (``ENGINE:
+'recipe_sharing.db'``).
+
+Django binds parameters on the client, which psycopg cannot prepare.
+Queries run inside ``prepared_statements()`` use a server-side binding
+cursor instead, so psycopg prepares a statement the
+``OPTIONS['prepare_threshold']``-th time the same SQL runs on a
+connection and reuses the plan after that. Persistent or pooled
+connections keep the plans across requests. The hot recipe and
+notification reads opt in. The rest of the ORM keeps client-side
+binding, which avoids the server-side binding problems with parameters
+in GROUP BY expressions. On other backends the block is a no-op.
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def prepared_statements():
+    """Prepare the queries of the block on every alias, so reads routed to a replica qualify too."""
+    wrappers = [connection for connection in connections.all() if hasattr(connection, 'prepare_queries')]
+    previous = [connection.prepare_queries for connection in wrappers]
+    for connection in wrappers:
+        connection.prepare_queries = True
+    try:
+        yield
+    finally:
+        for connection, value in zip(wrappers, previous):
+            connection.prepare_queries = value
@@ -0,0 +1,18 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set by recipe_sharing.db.prepared_statements(); wrappers are per thread.
+    prepare_queries = False
+
+    def create_cursor(self, name=None):
+        if name is None and self.prepare_queries and is_psycopg3:
+            # The parent still registers the timezone loader and guards against async use.
+            factory = self.connection.cursor_factory
+            self.connection.cursor_factory = base.ServerBindingCursor
+            try:
+                return super().create_cursor(name)
+            finally:
+                self.connection.cursor_factory = factory
+        return super().create_cursor(name)
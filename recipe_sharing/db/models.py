@@ -0,0 +1,59 @@
+class DenormalizedFieldsMixin:
+    """
+    Model mixin for columns maintained with UPDATE statements elsewhere
+    (counters, generated variants), listed in ``DENORMALIZED_FIELDS``. A
+    plain ``save()`` of an existing row leaves them out, so a possibly
+    stale instance never writes them back. Fields in ``CHANGED_FIELDS`` are
+    both edited by users and rewritten elsewhere (uploads replaced by their
+    processed version); a plain ``save()`` only writes them when they
+    changed since the instance was loaded. ``has_changed()`` tells whether
+    one of those or of ``TRACKED_FIELDS`` did, e.g. in a post_save receiver.
+    """
+    DENORMALIZED_FIELDS = ()
+    CHANGED_FIELDS = ()
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        tracked = {*cls.CHANGED_FIELDS, *cls.TRACKED_FIELDS}
+        instance._loaded_values = {name: value for name, value in zip(field_names, values) if name in tracked}
+        return instance
+
+    def _current_value(self, name):
+        # As stored: a file field's name rather than its FieldFile, which is changed in place.
+        field = self._meta.get_field(name)
+        return field.get_prep_value(field.value_from_object(self))
+
+    def has_changed(self, names):
+        """Whether any of ``names`` differs from its value when loaded or last saved; true for new instances."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        deferred = self.get_deferred_fields()
+        return any(
+            name not in deferred and (name not in loaded or self._current_value(name) != loaded[name])
+            for name in names
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            loaded = getattr(self, '_loaded_values', {})
+            unchanged = {
+                name for name in self.CHANGED_FIELDS
+                if name in loaded and self._current_value(name) == loaded[name]
+            }
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DENORMALIZED_FIELDS
+                and field.name not in unchanged
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: self._current_value(name)
+            for name in (*self.CHANGED_FIELDS, *self.TRACKED_FIELDS) if name not in deferred
+        }
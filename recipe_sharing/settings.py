@@ -47,9 +47,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recipe_api.instrumentation.InstrumentationMiddleware',
+    'recipe_api.querycheck.QueryCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'recipe_api.replicas.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'recipe_api.throttling.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -88,18 +92,105 @@ WSGI_APPLICATION = 'recipe_sharing.wsgi.application'
 # }
 
 
-from decouple import config
+from decouple import Csv, config
+
+# Connections persist for DATABASE_CONN_MAX_AGE seconds and are pinged before
+# reuse. DATABASE_POOL=true uses a psycopg pool per process instead; size it
+# to at least the worker's threads (or in-flight requests under ASGI).
+# DATABASE_PGBOUNCER=true for pgbouncer in transaction mode: no server-side
+# cursors and no prepared statements. `manage.py bench_db_pool` compares.
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+DATABASE_PGBOUNCER = config('DATABASE_PGBOUNCER', default=False, cast=bool)
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'recipe_sharing.db',
         'NAME': config('DATABASE_NAME'),
         'USER': config('DATABASE_USER'),
         'PASSWORD': config('DATABASE_PASSWORD'),
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'HOST': config('DATABASE_HOST', default='localhost'),
+        'PORT': config('DATABASE_PORT', default='5432'),
+        # Django's pool rejects persistent connections; pooled ones are returned after each request.
+        'CONN_MAX_AGE': 0 if DATABASE_POOL else config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DATABASE_PGBOUNCER,
+        'OPTIONS': {
+            # Executions of the same SQL before it is prepared, see recipe_sharing.db.
+            'prepare_threshold': None if DATABASE_PGBOUNCER else config('DATABASE_PREPARE_THRESHOLD', default=2, cast=int),
+        },
+    }
+}
+
+if DATABASE_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+        # Seconds a request waits for a free connection before failing.
+        'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=float),
+        'max_idle': config('DATABASE_POOL_MAX_IDLE', default=600, cast=float),
     }
+
+# Read replicas: DATABASE_REPLICAS="host[:port][=weight],..." adds aliases
+# replica_1, replica_2, ... with the primary's credentials; see
+# recipe_api.replicas for routing, stickiness after writes and health checks.
+# Write pins live in ALIAS, which must be shared by all workers (REDIS_URL).
+# Replicas are health-checked inside requests, hence their connect_timeout.
+DATABASE_REPLICATION = {
+    'ALIAS': 'default',
+    'REPLICAS': {},
+    'STICKY_SECONDS': config('DATABASE_STICKY_SECONDS', default=10, cast=int),
+    'MAX_LAG': config('DATABASE_MAX_LAG', default=5, cast=float),
+    'HEALTH_CHECK_INTERVAL': 10,
 }
+
+for number, spec in enumerate(config('DATABASE_REPLICAS', default='', cast=Csv()), start=1):
+    address, _, weight = spec.partition('=')
+    host, _, port = address.partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'connect_timeout': config('DATABASE_REPLICA_CONNECT_TIMEOUT', default=2, cast=int),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICATION['REPLICAS'][alias] = int(weight or 1)
+
+DATABASE_ROUTERS = ['recipe_api.replicas.ReplicaRouter']
+# Caches
+# Redis (shared by all workers) when REDIS_URL is set, in-process memory otherwise.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Serialized payloads of public recipe reads, see recipe_api.response_cache.
+# Invalidations only reach other workers when ALIAS is shared (REDIS_URL).
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 15,
+    'ENABLED': True,
+}
+
+# Rows validated and written per transaction by POST /recipes/bulk/ and
+# serialized per chunk by GET /recipes/export/.
+RECIPE_BULK_CHUNK_SIZE = 500
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -136,6 +227,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploaded photos are re-encoded without metadata and thumbnailed in a
+# process pool, see recipe_api.images.
+IMAGE_PIPELINE = {
+    'WIDTHS': (160, 480, 1080),
+    'MAX_DIMENSION': 2048,
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'WORKERS': config('IMAGE_PIPELINE_WORKERS', default=None, cast=lambda value: int(value) if value else None),
+    'EAGER': False,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -145,7 +250,7 @@ AUTH_USER_MODEL = "users.CustomUser"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -153,6 +258,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # Unset, the header is ignored and client IPs are REMOTE_ADDR.
+    'NUM_PROXIES': config('NUM_PROXIES', default='', cast=lambda value: int(value) if value else None),
 }
 
 from datetime import timedelta
@@ -162,11 +270,135 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,  # Issues a new refresh token on refresh
     'BLACKLIST_AFTER_ROTATION': True,  # Blacklists old refresh tokens
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
+}
+
+# Bloom filter of blacklisted refresh-token jtis, see users.blacklist. Only
+# used when ALIAS is shared by all workers (REDIS_URL); otherwise every
+# refresh queries the blacklist table.
+TOKEN_BLACKLIST_CACHE = {
+    'ALIAS': 'default',
+    'CAPACITY': 1_000_000,
+    'ERROR_RATE': 0.001,
+    'MAX_REPLAY': 1000,
 }
 
+# Seconds a user's is_active/is_staff snapshot is trusted by
+# users.authentication.ClaimsJWTAuthentication; saves drop it immediately.
+AUTH_USER_STATE_TIMEOUT = 30
+
+
+# PBKDF2 cost per environment; hashes with another count are re-encoded on login.
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=870000, cast=int)
+
+PASSWORD_HASHERS = [
+    'users.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
 
 AUTHENTICATION_BACKENDS = [
     'users.auth_backends.CustomAuthBackend',
     # Remove 'django.contrib.auth.backends.ModelBackend' if listed
     'django.contrib.auth.backends.ModelBackend',  # Fallback for admin login
 ]
+
+# Bayesian prior for Recipe.rating_score: recipes with few ratings are
+# pulled towards RATING_PRIOR_MEAN as if they had RATING_PRIOR_WEIGHT extra votes.
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 5
+
+# Home feed: authors with more followers than FEED_FANOUT_MAX_FOLLOWERS are
+# read on demand instead of being pushed into every follower's timeline.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_MAX_ENTRIES = 500
+FEED_BACKFILL_ON_FOLLOW = 20
+
+# Notification pipeline: interactions enqueue events that a worker turns into
+# coalesced Notification rows. OutboxQueue is drained by
+# `manage.py run_notification_worker`; LocalQueue uses an in-process thread.
+NOTIFICATIONS = {
+    'QUEUE': 'recipe_api.notifications.OutboxQueue',
+    'BATCH_SIZE': 500,
+    'COALESCE_WINDOW': timedelta(hours=1),
+}
+
+# "Similar recipes": weighted cosine similarity of taxonomy, ingredient
+# TF-IDF and co-favorite vectors, precomputed by
+# `manage.py build_similar_recipes` (incremental unless --full).
+SIMILAR_RECIPES = {
+    'K': 10,
+    'WEIGHTS': {'taxonomy': 1.0, 'ingredients': 1.0, 'favorites': 0.5},
+}
+
+# "For you": implicit ALS over favorites and ratings, trained by
+# `manage.py train_recommendations`; cold-start users get the most popular
+# recipes. `manage.py evaluate_recommendations` reports precision@k.
+RECOMMENDATIONS = {
+    'FACTORS': 32,
+    'ITERATIONS': 10,
+    'CANDIDATES': 50,
+}
+
+# "Trending now": interactions add weighted points to hourly buckets and
+# `manage.py refresh_trending` (run every few minutes) materializes the
+# SIZE recipes with the highest exponentially decayed score.
+TRENDING = {
+    'WEIGHTS': {'rating': 1, 'comment': 2, 'favorite': 3, 'share': 4},
+    'HALF_LIFE': timedelta(hours=24),
+    'WINDOW': timedelta(days=7),
+    'SIZE': 100,
+}
+
+# Cached comment pages (see recipe_api.comments); edits drop only the page
+# that shows the comment. Stored in RESPONSE_CACHE['ALIAS'].
+COMMENT_CACHE = {
+    'TIMEOUT': 60 * 5,
+}
+
+# Rate limits of write endpoints, keyed by URL name, per JWT user, client IP
+# and endpoint (all clients). Checked before authentication and any query;
+# see recipe_api.throttling. Rejections are reported at /ratelimit/stats/.
+# Counters live in ALIAS, which must be shared by all workers (REDIS_URL).
+# Client IPs come from X-Forwarded-For only with REST_FRAMEWORK['NUM_PROXIES'].
+RATE_LIMITS = {
+    'ALIAS': 'default',
+    'RULES': {
+        'recipe-rate': {'user': '30/min', 'ip': '120/min'},
+        'recipe-comment': {'user': '10/min', 'ip': '60/min', 'endpoint': '3000/min'},
+        'recipe-save': {'user': '60/min', 'ip': '240/min'},
+        'recipe-share': {'user': '20/min', 'ip': '120/min'},
+        'user-follow': {'user': '30/min', 'ip': '120/min'},
+        'signup': {'ip': '5/hour', 'endpoint': '300/min'},
+        'login': {'ip': '10/min', 'endpoint': '1200/min'},
+    },
+}
+
+# Per-endpoint latency, query and serializer histograms served to Prometheus
+# at /metrics/ (bearer TOKEN or an admin JWT), an opt-in Server-Timing
+# header and sampled logs of slow requests; see recipe_api.instrumentation.
+# /metrics/ only covers every worker when ALIAS is shared (REDIS_URL).
+INSTRUMENTATION = {
+    'ALIAS': 'default',
+    'TOKEN': config('METRICS_TOKEN', default=None),
+    'SERVER_TIMING': config('SERVER_TIMING', default=False, cast=bool),
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_SAMPLE_RATE': 0.1,
+}
+
+# N+1 and query-count check: the test suite fails requests that repeat a
+# query REPEAT_THRESHOLD times or run more than MAX_QUERIES (see conftest.py);
+# with DEBUG and QUERY_CHECK_PANEL=true responses report them in X-Query-*
+# headers and a panel on HTML pages. See recipe_api.querycheck.
+QUERY_CHECK = {
+    'REPEAT_THRESHOLD': 3,
+    'MAX_QUERIES': 25,
+    'PANEL': config('QUERY_CHECK_PANEL', default=False, cast=bool),
+}
+
+# recipe_sharing.asgi sets ROOT_URLCONF=recipe_sharing.asgi_urls so the
+# read-heavy endpoints use async views under an ASGI server; WSGI keeps the
+# sync ones. `manage.py bench_asgi` compares the two.
+ROOT_URLCONF = config('ROOT_URLCONF', default=ROOT_URLCONF)
@@ -39,19 +39,32 @@ urlpatterns = [
     path('recipes/', RecipeListCreateView.as_view(), name='recipe-list'),
     path('recipes/<int:pk>/', RecipeDetailView.as_view(), name='recipe-detail'),
     path('recipes/search/', RecipeSearchView.as_view(), name='recipe-search'),
+    path('recipes/pantry/', RecipePantryView.as_view(), name='recipe-pantry'),
+    path('recipes/bulk/', RecipeBulkImportView.as_view(), name='recipe-bulk-import'),
+    path('recipes/export/', RecipeExportView.as_view(), name='recipe-export'),
+    path('recipes/<int:pk>/similar/', RecipeSimilarView.as_view(), name='recipe-similar'),
+    path('recipes/for_you/', RecipeForYouView.as_view(), name='recipe-for-you'),
+    path('recipes/trending/', RecipeTrendingView.as_view(), name='recipe-trending'),
     
     # Interaction Features
     path('recipes/<int:pk>/rate/', RecipeRateView.as_view(), name='recipe-rate'),
     path('recipes/<int:pk>/comments/', RecipeCommentView.as_view(), name='recipe-comment'),
+    path('comments/<int:pk>/', CommentDetailView.as_view(), name='comment-detail'),
     path('recipes/<int:pk>/save/', RecipeSaveView.as_view(), name='recipe-save'),
     path('users/<int:user_id>/follow/', UserFollowView.as_view(), name='user-follow'),
     
     # Social Features
     path('recipes/<int:pk>/share/', RecipeShareView.as_view(), name='recipe-share'),
     path('users/<int:user_id>/recipes/', UserRecipesView.as_view(), name='user-recipes'),
+    path('feed/', HomeFeedView.as_view(), name='home-feed'),
     
     # Notifications
     path('notifications/', NotificationView.as_view(), name='notifications'),
+    path('notifications/unread_count/', NotificationUnreadCountView.as_view(), name='notifications-unread-count'),
+    path('notifications/mark_read/', NotificationMarkReadView.as_view(), name='notifications-mark-read'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('ratelimit/stats/', RateLimitStatsView.as_view(), name='rate-limit-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
@@ -1,12 +1,27 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
 
 class CustomAuthBackend(ModelBackend):
+    """
+    Email and password authentication for LoginSerializer.
+
+    A failed email login raises PermissionDenied, which stops
+    ``authenticate()`` from trying ModelBackend with the same credentials
+    (and hashing the password a second time). Unknown emails still run the
+    hasher once so the response time does not reveal which emails exist.
+    A successful check re-encodes the password if the hasher settings
+    changed (see ``users.hashers``).
+    """
     def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
         User = get_user_model()
         try:
             user = User.objects.get(email=email)
-            if user.check_password(password):
-                return user
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            User().set_password(password)
+            raise PermissionDenied
+        if not user.check_password(password):
+            raise PermissionDenied
+        return user
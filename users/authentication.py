@@ -0,0 +1,114 @@
+"""
+JWT authentication without a per-request user SELECT.
+
+simplejwt's ``JWTAuthentication`` loads the whole ``CustomUser`` row on every
+request. ``ClaimsJWTAuthentication`` trusts the verified ``user_id`` claim
+instead and pairs it with a small cached snapshot of the user's state
+(``is_active``, ``is_staff``, ``is_superuser``). The request user is a
+``ClaimsUser`` whose other fields are deferred and loaded together on first
+access, so endpoints that only need ``request.user.id`` never read the
+users table on a cache hit.
+
+The snapshot lives for ``AUTH_USER_STATE_TIMEOUT`` seconds and is dropped
+whenever the user is saved or deleted, so deactivating an account takes
+effect on the next request (or within the timeout for bulk ``update()``
+calls, which bypass signals).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser, CustomUser
+
+STATE_FIELDS = ('id', 'is_active', 'is_staff', 'is_superuser')
+
+
+def state_timeout():
+    return getattr(settings, 'AUTH_USER_STATE_TIMEOUT', 30)
+
+
+def user_state_key(user_id):
+    return f'users:state:{user_id}'
+
+
+def primary_users():
+    # Read from the primary database, so a new or deactivated account is seen
+    # before the read replicas catch up; the state is cached anyway.
+    return CustomUser.objects.db_manager(DEFAULT_DB_ALIAS)
+
+
+def get_user_state(user_id):
+    """Return the cached state fields of a user, or ``None`` if it does not exist."""
+    key = user_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = primary_users().filter(pk=user_id).values(*STATE_FIELDS).first()
+        if state is not None:
+            cache.set(key, state, state_timeout())
+    return state
+
+
+async def aget_user_state(user_id):
+    """``get_user_state`` for async views."""
+    key = user_state_key(user_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await primary_users().filter(pk=user_id).values(*STATE_FIELDS).afirst()
+        if state is not None:
+            await cache.aset(key, state, state_timeout())
+    return state
+
+
+def invalidate_user_state(user_id):
+    """Drop the cached state now and again on commit, like ``response_cache.invalidate``."""
+    key = user_state_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if self.needs_user_row():
+            return super().get_user(validated_token)
+        return self.user_from_state(get_user_state(self.user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; only the user state lookup awaits."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if self.needs_user_row():
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+        state = await aget_user_state(self.user_id(validated_token))
+        return self.user_from_state(state), validated_token
+
+    def needs_user_row(self):
+        # The password hash or a lookup by another column.
+        return api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != 'id'
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def user_from_state(self, state):
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return ClaimsUser.from_state(state)
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    target_class = 'users.authentication.ClaimsJWTAuthentication'
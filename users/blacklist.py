@@ -0,0 +1,186 @@
+"""
+Process-local cache of blacklisted refresh-token jtis.
+
+simplejwt checks every refresh token against ``BlacklistedToken`` joined to
+``OutstandingToken``, a table that grows with every login and rotation.
+``users.tokens.RefreshToken`` asks this cache first: a Bloom filter of the
+jtis of blacklisted, unexpired tokens. A miss is definitive and costs no
+query; a probable hit is confirmed against the database.
+
+Each process builds its filter from the database on first use. To see
+tokens blacklisted by other processes, every blacklisting appends its jti
+to a log in the shared cache (``token_blacklist:log:<n>``, the latest ``n``
+being ``token_blacklist:head``) and a process replays the entries it has
+not seen before each check. When the log has gaps (eviction, or a process
+that fell too far behind) or ``flush_expired_tokens`` bumped
+``token_blacklist:generation``, the filter is rebuilt from the database.
+
+The log only reaches other processes through a shared cache (Redis). With
+a process-local backend (locmem, dummy) there is no filter and every check
+queries ``BlacklistedToken``, as simplejwt does.
+
+Configured with ``TOKEN_BLACKLIST_CACHE`` (``ALIAS``, ``CAPACITY``,
+``ERROR_RATE``, ``MAX_REPLAY``).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from recipe_sharing.cache import is_shared
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'CAPACITY': 1_000_000,
+    'ERROR_RATE': 0.001,
+    # Replaying more log entries than this rebuilds the filter instead.
+    'MAX_REPLAY': 1000,
+}
+
+HEAD_KEY = 'token_blacklist:head'
+GENERATION_KEY = 'token_blacklist:generation'
+
+
+def blacklist_setting(name):
+    return getattr(settings, 'TOKEN_BLACKLIST_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def log_key(position):
+    return f'token_blacklist:log:{position}'
+
+
+def initial_head():
+    # A recreated head starts at the current time in milliseconds, so it
+    # never goes back to a position a process has already replayed.
+    return int(time.time() * 1000)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def get_cache():
+    return caches[blacklist_setting('ALIAS')]
+
+
+class TokenBlacklistCache:
+    def __init__(self, cache=None):
+        # None uses the ALIAS cache of the calling thread.
+        self._cache = cache
+        self._lock = threading.RLock()
+        self._filter = None
+        self._head = None
+        self._generation = None
+
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else get_cache()
+
+    def might_contain(self, jti):
+        if not is_shared(self.cache):
+            # Blacklistings of other processes never reach this one: ask the database.
+            return True
+        self.sync()
+        return jti in self._filter
+
+    def sync(self):
+        cache = self.cache
+        shared = cache.get_many([HEAD_KEY, GENERATION_KEY])
+        head, generation = shared.get(HEAD_KEY), shared.get(GENERATION_KEY)
+        with self._lock:
+            if (
+                self._filter is None
+                or generation != self._generation
+                or head is None
+                or head < self._head
+                or head - self._head > blacklist_setting('MAX_REPLAY')
+            ):
+                self.rebuild()
+            elif head > self._head:
+                keys = [log_key(position) for position in range(self._head + 1, head + 1)]
+                entries = cache.get_many(keys)
+                if len(entries) < len(keys):
+                    self.rebuild()
+                    return
+                for jti in entries.values():
+                    self._filter.add(jti)
+                self._head = head
+
+    def rebuild(self):
+        """Load the jtis of all blacklisted, unexpired tokens into a new filter."""
+        cache = self.cache
+        with self._lock:
+            # Read the log position first: entries written during the load are replayed later.
+            cache.add(HEAD_KEY, initial_head(), None)
+            shared = cache.get_many([HEAD_KEY, GENERATION_KEY])
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+            bloom = BloomFilter(max(blacklist_setting('CAPACITY'), 2 * blacklisted.count()), blacklist_setting('ERROR_RATE'))
+            for jti in blacklisted.values_list('token__jti', flat=True).iterator(chunk_size=10000):
+                bloom.add(jti)
+            self._filter = bloom
+            self._head = shared.get(HEAD_KEY, 0)
+            self._generation = shared.get(GENERATION_KEY)
+
+    def add(self, jti):
+        """Add ``jti`` to this process now and publish it to the others on commit."""
+        if not is_shared(self.cache):
+            return
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        transaction.on_commit(lambda: self.publish(jti))
+
+    def publish(self, jti):
+        cache = self.cache
+        try:
+            head = cache.incr(HEAD_KEY)
+        except ValueError:
+            cache.add(HEAD_KEY, initial_head(), None)
+            head = cache.incr(HEAD_KEY)
+        cache.set(log_key(head), jti, int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()))
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+
+def bump_generation():
+    """Make every process rebuild its filter, e.g. after expired tokens were flushed."""
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, initial_head(), None)
+
+
+_blacklist_cache = TokenBlacklistCache()
+
+
+def get_blacklist_cache():
+    return _blacklist_cache
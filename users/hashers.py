@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from
+    ``PASSWORD_HASH_ITERATIONS``, so each environment can pick its own cost.
+    The algorithm name is unchanged: existing hashes keep verifying and are
+    re-encoded with the configured count on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
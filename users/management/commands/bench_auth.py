@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import ClaimsJWTAuthentication, invalidate_user_state
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request authentication overhead of simplejwt's JWTAuthentication "
+        "and ClaimsJWTAuthentication for an endpoint that only reads request.user.id. "
+        "Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username="bench-auth", email="bench-auth@example.com", password=None
+            )
+            token = AccessToken.for_user(user)
+            request = Request(APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+            invalidate_user_state(user.pk)
+            for name, backend in (("JWTAuthentication", JWTAuthentication()), ("ClaimsJWTAuthentication", ClaimsJWTAuthentication())):
+                elapsed, queries = self.run(backend, request, options["requests"])
+                self.stdout.write(
+                    f"{name:<24} {elapsed / options['requests'] * 1e6:8.1f} us/request  "
+                    f"{queries / options['requests']:.3f} queries/request"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def run(self, backend, request, total):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(total):
+                user, _ = backend.authenticate(request)
+                user.id
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries)
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from users.models import CustomUser
+from users.serializers import LoginSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure single-core LoginSerializer throughput for successful logins, wrong "
+        "passwords and unknown emails at one or more PBKDF2 iteration counts. Runs "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=20)
+        parser.add_argument("--iterations", nargs="+", type=int, default=[settings.PASSWORD_HASH_ITERATIONS])
+
+    def handle(self, *args, **options):
+        cases = {
+            "success": {"email": "bench-login@example.com", "password": "Benchpass123!"},
+            "wrong password": {"email": "bench-login@example.com", "password": "wrong"},
+            "unknown email": {"email": "nobody@example.com", "password": "Benchpass123!"},
+        }
+        for iterations in options["iterations"]:
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations), transaction.atomic():
+                CustomUser.objects.create_user(
+                    username="bench-login", email="bench-login@example.com", password="Benchpass123!"
+                )
+                for name, payload in cases.items():
+                    start = time.perf_counter()
+                    for _ in range(options["logins"]):
+                        LoginSerializer(data=payload).is_valid()
+                    elapsed = (time.perf_counter() - start) / options["logins"]
+                    self.stdout.write(
+                        f"{iterations:>8} iterations  {name:<15} {elapsed * 1000:8.2f} ms/login  "
+                        f"{1 / elapsed:8.1f} logins/s/core"
+                    )
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Done"))
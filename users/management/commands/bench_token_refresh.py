@@ -0,0 +1,71 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from users.blacklist import get_blacklist_cache
+from users.models import CustomUser
+from users.serializers import TokenRefreshSerializer as CachedTokenRefreshSerializer
+from users.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure /api/token/refresh/ throughput with simplejwt's serializer and with the "
+        "blacklist cache, over a large outstanding token table. Runs inside a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--outstanding", type=int, default=1_000_000)
+        parser.add_argument("--blacklisted-ratio", type=float, default=0.5)
+        parser.add_argument("--refreshes", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username="bench-refresh", email="bench-refresh@example.com", password=None
+            )
+            self.populate(user, options["outstanding"], options["blacklisted_ratio"])
+
+            start = time.perf_counter()
+            get_blacklist_cache().rebuild()
+            self.stdout.write(f"blacklist filter built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+            for name, serializer_class in (
+                ("simplejwt", TokenRefreshSerializer),
+                ("blacklist cache", CachedTokenRefreshSerializer),
+            ):
+                view = TokenRefreshView.as_view(_serializer_class=f"{serializer_class.__module__}.{serializer_class.__name__}")
+                elapsed = self.run(view, user, options["refreshes"])
+                self.stdout.write(f"{name:<16} {options['refreshes'] / elapsed:8.1f} refreshes/s")
+            transaction.set_rollback(True)
+        get_blacklist_cache().reset()
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def run(self, view, user, total):
+        factory = APIRequestFactory()
+        refresh = str(RefreshToken.for_user(user))
+        start = time.perf_counter()
+        for _ in range(total):
+            response = view(factory.post("/api/token/refresh/", {"refresh": refresh}, format="json"))
+            refresh = response.data["refresh"]
+        return time.perf_counter() - start
+
+    def populate(self, user, total, blacklisted_ratio):
+        expires_at = aware_utcnow() + timedelta(days=1)
+        for start in range(0, total, 10000):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(user=user, jti=uuid.uuid4().hex, token="", expires_at=expires_at)
+                for _ in range(start, min(total, start + 10000))
+            ])
+            BlacklistedToken.objects.bulk_create([
+                BlacklistedToken(token=token) for token in tokens[:int(len(tokens) * blacklisted_ratio)]
+            ])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from users.blacklist import bump_generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted refresh tokens in batches, then make "
+        "every process rebuild its blacklist filter. Meant to run from cron (e.g. hourly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow()).order_by("pk")
+        total = 0
+        while True:
+            with transaction.atomic():
+                batch = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+                if not batch:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=batch).delete()
+                OutstandingToken.objects.filter(pk__in=batch).delete()
+            total += len(batch)
+        if total:
+            bump_generation()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {total} expired tokens"))
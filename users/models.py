@@ -3,6 +3,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 from django.utils.translation import gettext_lazy as _
+from recipe_sharing.db.models import DenormalizedFieldsMixin
 
 
 class CustomUserManager(BaseUserManager):
@@ -37,21 +38,29 @@ class CustomUserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class CustomUser(AbstractUser):
+class CustomUser(DenormalizedFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True)
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Written by recipe_api.images once the uploaded picture has been processed.
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     mfa_enabled = models.BooleanField(default=False)
     mfa_secret = models.CharField(max_length=32, blank=True, null=True)
     email_verified = models.BooleanField(default=False)
     location = models.CharField(max_length=100, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
+    # Maintained by recipe_api when Follow rows are created or deleted.
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
     
     objects = CustomUserManager()
     
+    # Columns maintained with UPDATE statements elsewhere; see DenormalizedFieldsMixin.
+    DENORMALIZED_FIELDS = ('follower_count', 'profile_picture_variants')
+    CHANGED_FIELDS = ('profile_picture',)
+    
     def __str__(self):
         return self.username
 
@@ -69,3 +78,26 @@ class CustomUser(AbstractUser):
         totp = pyotp.TOTP(self.mfa_secret)
         return totp.verify(code)
 
+
+
+class ClaimsUser(CustomUser):
+    """
+    A ``CustomUser`` built from verified token claims (see
+    ``users.authentication``). Only the primary key and the cached state
+    fields are set; the first access to any other field loads all of them
+    with a single query.
+    """
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_state(cls, state):
+        """Build an instance from a dict of field attnames to values."""
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in state]
+        return cls.from_db(None, field_names, [state[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import get_user_state
 from .models import CustomUser
+from .tokens import RefreshToken
 
 class SignupSerializer(serializers.ModelSerializer):
     """
@@ -48,11 +52,8 @@ class LoginSerializer(serializers.Serializer):
         if not user:
             raise serializers.ValidationError({"non_field_errors": ["Invalid credentials"]})
         if not user.is_active:
-            print("Account is not verified")
             raise serializers.ValidationError({"non_field_errors": ["Account not verified"]})
 
-        print("Account is verified")
-        
         if user.mfa_enabled:
             if not mfa_code:
                 raise serializers.ValidationError({"mfa_code": ["MFA code is required"]})
@@ -88,3 +89,36 @@ class SignoutSerializer(serializers.Serializer):
         except Exception as e:
             raise serializers.ValidationError({"refresh": ["Invalid or expired refresh token"]})
         return data
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Serializer for token refresh.
+    Checks the blacklist through the blacklist cache and the account state
+    through the cached user state instead of loading the user.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            state = get_user_state(user_id)
+            if state is None or not state["is_active"]:
+                raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data["refresh"] = str(refresh)
+
+        return data
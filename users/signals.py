@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_user_state
+from .blacklist import get_blacklist_cache
+from .models import ClaimsUser, CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=ClaimsUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=ClaimsUser)
+def drop_cached_user_state(sender, instance, **kwargs):
+    invalidate_user_state(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_jti(sender, instance, created, **kwargs):
+    if created:
+        get_blacklist_cache().add(instance.token.jti)
@@ -0,0 +1,95 @@
+import pytest
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from recipe_api.models import Rating, Recipe
+from users.authentication import ClaimsJWTAuthentication, user_state_key
+from users.models import ClaimsUser, CustomUser
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def authenticate(user):
+    token = AccessToken.for_user(user)
+    request = Request(APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+    return ClaimsJWTAuthentication().authenticate(request)[0]
+
+
+def test_cached_state_skips_user_query(django_assert_num_queries):
+    """Test a warm state cache authenticates without touching the database."""
+    user = UserFactory()
+    authenticate(user)
+
+    with django_assert_num_queries(0):
+        claims_user = authenticate(user)
+        assert claims_user.id == user.id
+        assert claims_user.is_authenticated
+        assert claims_user.is_active
+
+    assert isinstance(claims_user, CustomUser)
+
+
+def test_other_fields_load_lazily_in_one_query(django_assert_num_queries):
+    """Test the first deferred attribute access loads the whole row once."""
+    user = UserFactory(bio="Home cook")
+    claims_user = authenticate(user)
+
+    with django_assert_num_queries(1):
+        assert claims_user.email == user.email
+        assert claims_user.bio == "Home cook"
+        assert claims_user.username == user.username
+
+
+def test_deactivation_takes_effect_immediately():
+    """Test saving an inactive user drops the cached state."""
+    user = UserFactory()
+    authenticate(user)
+    assert cache.get(user_state_key(user.pk)) is not None
+
+    user.is_active = False
+    user.save()
+
+    with pytest.raises(AuthenticationFailed):
+        authenticate(user)
+
+
+def test_deleted_user_is_rejected():
+    """Test a token for a deleted user is rejected."""
+    user = UserFactory()
+    token_user = CustomUser.objects.get(pk=user.pk)
+    user.delete()
+
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token_user)
+
+
+def test_claims_user_can_be_assigned_to_relations():
+    """Test the lightweight user works as a foreign key value and can be saved."""
+    author = UserFactory()
+    recipe = Recipe.objects.create(
+        user=author, title="Soup", description="Warm", ingredients="water",
+        instructions="Boil", prep_time=5, servings=1, meal_type="dinner",
+    )
+    claims_user = authenticate(UserFactory())
+    assert isinstance(claims_user, ClaimsUser)
+
+    Rating.objects.create(user=claims_user, recipe=recipe, score=4)
+    claims_user.bio = "Updated"
+    claims_user.save()
+
+    assert CustomUser.objects.get(pk=claims_user.pk).bio == "Updated"
+
+
+def test_profile_endpoint_with_claims_user():
+    """Test the profile endpoint serializes the lazily loaded user."""
+    user = UserFactory()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    response = client.get("/profile/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["email"] == user.email
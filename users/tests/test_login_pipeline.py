@@ -0,0 +1,60 @@
+from unittest import mock
+
+import pytest
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import identify_hasher
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+client = APIClient()
+
+
+def stored_iterations(email):
+    encoded = CustomUser.objects.get(email=email).password
+    return identify_hasher(encoded).decode(encoded)["iterations"]
+
+
+@pytest.mark.parametrize("email, password", [
+    ("test@example.com", "wrongpass"),
+    ("nobody@example.com", "testpass123"),
+])
+def test_failed_email_login_stops_after_first_backend(email, password):
+    """Test a failed email login does not fall through to ModelBackend."""
+    UserFactory(email="test@example.com")
+    with mock.patch.object(ModelBackend, "authenticate") as fallback:
+        response = client.post("/api/login/", {"email": email, "password": password}, format="json")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    fallback.assert_not_called()
+
+
+def test_unknown_email_still_runs_the_hasher():
+    """Test a missing user costs one password hash, like an existing one."""
+    with mock.patch("users.hashers.PBKDF2PasswordHasher.encode", autospec=True, return_value="x") as encode:
+        assert authenticate(email="nobody@example.com", password="testpass123") is None
+
+    assert encode.call_count == 1
+
+
+def test_username_login_still_reaches_model_backend():
+    """Test admin-style username logins are left to ModelBackend."""
+    user = UserFactory(email="test@example.com")
+
+    assert authenticate(username="test@example.com", password="testpass123") == user
+
+
+def test_login_rehashes_when_iterations_change(settings):
+    """Test a successful login re-encodes the password with the configured cost."""
+    settings.PASSWORD_HASH_ITERATIONS = 1000
+    UserFactory(email="test@example.com")
+    assert stored_iterations("test@example.com") == 1000
+
+    settings.PASSWORD_HASH_ITERATIONS = 2000
+    response = client.post("/api/login/", {"email": "test@example.com", "password": "testpass123"}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert stored_iterations("test@example.com") == 2000
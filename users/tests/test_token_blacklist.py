@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from users.blacklist import GENERATION_KEY, BloomFilter, TokenBlacklistCache, get_blacklist_cache
+from users.tokens import RefreshToken
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+client = APIClient()
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Treat the locmem test cache as shared by all processes, as Redis is."""
+    monkeypatch.setattr("users.blacklist.is_shared", lambda cache: True)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test every added value is found and unknown values rarely are."""
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_unblacklisted_token_is_checked_without_queries(shared_cache, django_assert_num_queries):
+    """Test a filter miss does not query the blacklist tables."""
+    user = UserFactory()
+    refresh = str(RefreshToken.for_user(user))
+    get_blacklist_cache().sync()
+
+    with django_assert_num_queries(0):
+        RefreshToken(refresh)
+
+
+def test_refresh_rotates_and_rejects_old_token():
+    """Test refreshing returns a new pair and blacklists the old refresh token."""
+    user = UserFactory()
+    refresh = str(RefreshToken.for_user(user))
+    response = client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["refresh"] != refresh
+    assert OutstandingToken.objects.filter(jti=RefreshToken(response.data["refresh"])["jti"]).exists()
+
+    response = client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert "Token is blacklisted" in response.data["detail"]
+
+
+def test_refresh_rejects_inactive_user():
+    """Test a deactivated account cannot refresh its tokens."""
+    user = UserFactory()
+    refresh = str(RefreshToken.for_user(user))
+    user.is_active = False
+    user.save()
+
+    response = client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_blacklisting_reaches_other_processes(shared_cache, django_capture_on_commit_callbacks):
+    """Test a filter built elsewhere replays tokens blacklisted after it was built."""
+    user = UserFactory()
+    token = RefreshToken.for_user(user)
+    other_process = TokenBlacklistCache()
+    other_process.sync()
+    assert token["jti"] not in other_process._filter
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.blacklist()
+
+    assert other_process.might_contain(token["jti"])
+
+
+def test_process_local_caches_check_the_database(django_capture_on_commit_callbacks, monkeypatch):
+    """Test a process whose cache others cannot write to still sees their blacklistings."""
+    user = UserFactory()
+    token = RefreshToken.for_user(user)
+    first_process = TokenBlacklistCache(LocMemCache("first", {}))
+    second_process = TokenBlacklistCache(LocMemCache("second", {}))
+    assert second_process.might_contain(token["jti"])
+
+    monkeypatch.setattr("users.signals.get_blacklist_cache", lambda: first_process)
+    with django_capture_on_commit_callbacks(execute=True):
+        token.blacklist()
+
+    assert second_process._filter is None
+    monkeypatch.setattr("users.tokens.get_blacklist_cache", lambda: second_process)
+    with pytest.raises(TokenError, match="blacklisted"):
+        RefreshToken(str(token))
+
+
+def test_flush_expired_tokens_in_batches():
+    """Test expired tokens are deleted and filters are told to rebuild."""
+    user = UserFactory()
+    expired = OutstandingToken.objects.bulk_create([
+        OutstandingToken(user=user, jti=f"expired-{i}", token="", expires_at=aware_utcnow() - timedelta(minutes=1))
+        for i in range(5)
+    ])
+    BlacklistedToken.objects.create(token=expired[0])
+    live = RefreshToken.for_user(user)
+    get_blacklist_cache().sync()
+    generation = cache.get(GENERATION_KEY)
+
+    call_command("flush_expired_tokens", batch_size=2)
+
+    assert list(OutstandingToken.objects.values_list("jti", flat=True)) == [live["jti"]]
+    assert not BlacklistedToken.objects.exists()
+    assert cache.get(GENERATION_KEY) != generation
@@ -8,7 +8,7 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .serializers import SignupSerializer, LoginSerializer, SignoutSerializer
 from .models import CustomUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import ClaimsJWTAuthentication
 
 
 class SignupView(APIView):
@@ -39,7 +39,7 @@ class LoginView(APIView):
 
 class SignoutView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def post(self, request):
         # Explicitly check if the user is authenticated